@@ -6,14 +6,24 @@ export async function POST(request: NextRequest) {
   try {
     const body = await request.json();
 
+    const ifNoneMatch = request.headers.get('if-none-match');
     const response = await fetch(`${BACKEND_URL}/api/queue/status`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
+        ...(ifNoneMatch ? { 'If-None-Match': ifNoneMatch } : {}),
       },
       body: JSON.stringify(body),
     });
 
+    // Queue unchanged since the client's last poll
+    if (response.status === 304) {
+      return new NextResponse(null, {
+        status: 304,
+        headers: { ETag: response.headers.get('etag') ?? '' },
+      });
+    }
+
     if (!response.ok) {
       // If backend says not found, surface a minimal JSON instead of 500 to the client
       if (response.status === 404) {
@@ -28,7 +38,8 @@ export async function POST(request: NextRequest) {
     }
 
     const data = await response.json();
-    return NextResponse.json(data);
+    const etag = response.headers.get('etag');
+    return NextResponse.json(data, etag ? { headers: { ETag: etag } } : undefined);
   } catch (error) {
     console.error('Error getting queue status:', error);
     return NextResponse.json(
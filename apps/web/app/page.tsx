@@ -40,6 +40,15 @@ export default function Home() {
   const [queuePosition, setQueuePosition] = useState<number | null>(null);
   const [estimatedWaitTime, setEstimatedWaitTime] = useState<number | null>(null);
   const [queuePollInterval, setQueuePollInterval] = useState<NodeJS.Timeout | null>(null);
+  // Last queue status version seen (poll response or queue_position push), echoed back on polls
+  const queueVersionRef = useRef<number | null>(null);
+  // While the notification socket is open it pushes position updates and replays missed
+  // events on reconnect, so HTTP polls only run while it is closed or after a resync
+  const socketOpenRef = useRef(false);
+  const resyncNeededRef = useRef(true);
+  // Replay position on this customer's topic: sent back on reconnect to get missed events
+  const replayEpochRef = useRef<string | null>(null);
+  const replaySeqRef = useRef(0);
   const [currentRoom, setCurrentRoom] = useState(room);
   const [transferRoomToken, setTransferRoomToken] = useState<string | null>(null);
 
@@ -58,6 +67,9 @@ export default function Home() {
 
     console.log('Setting up WebSocket connection for email:', email);
     let ws: WebSocket | null = null;
+    const topic = `customer:${email}`;
+    replayEpochRef.current = null;
+    replaySeqRef.current = 0;
     let reconnectTimeout: NodeJS.Timeout | null = null;
 
     const connectWebSocket = () => {
@@ -71,8 +83,11 @@ export default function Home() {
 
         ws.onopen = () => {
           console.log('Customer WebSocket connected');
+          socketOpenRef.current = true;
           if (ws && ws.readyState === WebSocket.OPEN) {
-            ws.send(JSON.stringify({ email }));
+            // Resume from the last event seen so an assignment sent while disconnected is replayed
+            const epoch = replayEpochRef.current;
+            ws.send(JSON.stringify(epoch ? { email, epoch, last_seq: replaySeqRef.current } : { email }));
           }
         };
 
@@ -80,6 +95,9 @@ export default function Home() {
           try {
             const message = JSON.parse(event.data);
             console.log('Customer WebSocket message:', message);
+            if (message.topic === topic && typeof message.seq === 'number') {
+              replaySeqRef.current = message.seq;
+            }
             
             if (message.type === 'agent_assigned' && message.email === email) {
               console.log('AGENT ASSIGNED! Email:', message.email, 'Room:', message.room_name);
@@ -106,6 +124,19 @@ export default function Home() {
                   setIsConnecting(false);
                   setQueueStatus('idle');
                 });
+            } else if (message.type === 'queue_position' && message.email === email) {
+              setQueuePosition(message.position);
+              setEstimatedWaitTime(message.estimated_wait_time);
+              queueVersionRef.current = message.version;
+            } else if (message.type === 'subscribed' && message.topic === topic) {
+              replayEpochRef.current = message.epoch;
+              replaySeqRef.current = message.seq;
+            } else if (message.type === 'resync' && message.topic === topic) {
+              // Missed events could not be replayed (e.g. backend restart): check status over HTTP once
+              resyncNeededRef.current = true;
+            } else if (message.type === 'ping') {
+              // Server heartbeat: reply so the backend does not reap this socket as idle
+              ws?.send(JSON.stringify({ type: 'pong' }));
             } else if (message.type === 'acknowledgment') {
               console.log('WebSocket acknowledgment received:', message);
             } else if (message.type === 'error') {
@@ -118,6 +149,7 @@ export default function Home() {
 
         ws.onclose = (event) => {
           console.log('Customer WebSocket disconnected:', event.code, event.reason);
+          socketOpenRef.current = false;
           reconnectTimeout = setTimeout(() => {
             console.log('Attempting WebSocket reconnection...');
             connectWebSocket();
@@ -247,17 +279,32 @@ export default function Home() {
   }, [queueStatus, email]);
 
   const pollQueueStatus = async () => {
+    // Position updates and the assignment arrive over the socket, and reconnects replay what was
+    // missed; poll only while it is closed, or once after a join or a resync
+    if (socketOpenRef.current && !resyncNeededRef.current) {
+      return;
+    }
+    resyncNeededRef.current = false;
+
     try {
+      const version = queueVersionRef.current;
       const resp = await fetch('/api/queue/status', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          ...(version !== null ? { 'If-None-Match': `"${version}"` } : {}),
         },
-        body: JSON.stringify({ email }),
+        body: JSON.stringify({ email, since_version: version }),
       });
 
+      if (resp.status === 304) {
+        // Position and ETA unchanged since the last poll or push
+        return;
+      }
+
       if (resp.ok) {
         const data = await resp.json();
+        queueVersionRef.current = data.version ?? null;
 
         const t = data.token || data.access_token;
         if (t && data.room_name) {
@@ -352,6 +399,8 @@ export default function Home() {
         setQueuePosition(data.queue_position || null);
         setEstimatedWaitTime(data.estimated_wait_time || null);
         console.log('Added to queue, position:', data.queue_position);
+        queueVersionRef.current = null;
+        resyncNeededRef.current = true;
         
         const interval = setInterval(pollQueueStatus, 3000);
         setQueuePollInterval(interval);
@@ -26,6 +26,14 @@ export function Header() {
     ws.onopen = () => setConnected(true);
     ws.onclose = () => setConnected(false);
     ws.onerror = () => setConnected(false);
+    // Answer server heartbeats so the backend does not reap this socket as idle
+    ws.onmessage = (event) => {
+      try {
+        if (JSON.parse(event.data).type === 'ping') ws.send(JSON.stringify({ type: 'pong' }));
+      } catch {
+        // not a heartbeat
+      }
+    };
 
     return () => ws.close();
   }, []);
@@ -1,7 +1,12 @@
 import os
-import requests
 import json
-from typing import Dict, Any, List, Optional
+import hashlib
+from typing import Dict, Any, AsyncIterator, List, Optional
+from groq_client import groq_client
+from single_flight import SingleFlight
+
+# Identical chat requests already in flight share one Groq call
+response_flights = SingleFlight()
 
 def get_groq_client():
     """Get Groq API key from environment"""
@@ -10,7 +15,7 @@ def get_groq_client():
         raise ValueError("groq_key environment variable is required")
     return api_key
 
-def generate_ai_response(
+async def generate_ai_response(
     user_message: str,
     caller_type: str,
     caller_context: Optional[Dict[str, Any]] = None,
@@ -28,47 +33,19 @@ def generate_ai_response(
     Returns:
         AI response text
     """
+    data = build_chat_request(user_message, caller_type, caller_context, conversation_history)
+    # The payload holds everything that shapes the answer (prompt, context, history, model)
+    key = hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    return await response_flights.do(key, lambda: _request_ai_response(data, caller_type, user_message))
+
+async def _request_ai_response(data: Dict[str, Any], caller_type: str, user_message: str) -> str:
     try:
         api_key = get_groq_client()
         
-        # Build conversation context
-        system_prompt = build_system_prompt(caller_type, caller_context)
-        
-        # Prepare messages for the API
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history if available
-        if conversation_history:
-            messages.extend(conversation_history)
-        
-        # Add current user message
-        messages.append({"role": "user", "content": user_message})
-        
-        # Make API request to Groq
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        data = {
-            "messages": messages,
-            "model": "llama-3.1-70b-versatile",
-            "temperature": 0.7,
-            "max_tokens": 500,
-            "stream": False
-        }
-        
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers=headers,
-            json=data,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if "choices" in result and len(result["choices"]) > 0:
-                return result["choices"][0]["message"]["content"].strip()
+        # Non-200 answers raise GroqAPIError and fall back below
+        result = await groq_client.chat_completion(api_key, data, timeout=30)
+        if "choices" in result and len(result["choices"]) > 0:
+            return result["choices"][0]["message"]["content"].strip()
         
         # Fallback response
         return get_fallback_response(caller_type, user_message)
@@ -77,6 +54,58 @@ def generate_ai_response(
         print(f"AI response generation error: {e}")
         return get_fallback_response(caller_type, user_message)
 
+async def stream_ai_response(
+    user_message: str,
+    caller_type: str,
+    caller_context: Optional[Dict[str, Any]] = None,
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> AsyncIterator[str]:
+    """
+    Same as generate_ai_response, but yields the response text in chunks as Groq produces them
+    
+    If the request fails before any text arrived, yields the fallback response
+    instead; if it fails midway, the stream simply ends.
+    """
+    started = False
+    try:
+        api_key = get_groq_client()
+        data = build_chat_request(user_message, caller_type, caller_context, conversation_history)
+        async for chunk in groq_client.stream_chat_completion(api_key, data, timeout=60):
+            started = True
+            yield chunk
+    except Exception as e:
+        print(f"AI response streaming error: {e}")
+        if not started:
+            yield get_fallback_response(caller_type, user_message)
+
+def build_chat_request(
+    user_message: str,
+    caller_type: str,
+    caller_context: Optional[Dict[str, Any]] = None,
+    conversation_history: Optional[List[Dict[str, str]]] = None
+) -> Dict[str, Any]:
+    """Build the Groq chat completion payload for a caller's message"""
+    # Build conversation context
+    system_prompt = build_system_prompt(caller_type, caller_context)
+    
+    # Prepare messages for the API
+    messages = [{"role": "system", "content": system_prompt}]
+    
+    # Add conversation history if available
+    if conversation_history:
+        messages.extend(conversation_history)
+    
+    # Add current user message
+    messages.append({"role": "user", "content": user_message})
+    
+    return {
+        "messages": messages,
+        "model": "llama-3.1-70b-versatile",
+        "temperature": 0.7,
+        "max_tokens": 500,
+        "stream": False
+    }
+
 def build_system_prompt(caller_type: str, caller_context: Optional[Dict[str, Any]]) -> str:
     """Build system prompt based on caller type and context"""
     
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Notification encoding benchmark: cost of one broadcast per 1k recipients.
+
+"before" encodes the message for every recipient with the stdlib json
+module, as WebSocket.send_json does; "after" encodes it once with orjson and
+reuses the frame. Also times ConnectionHub.publish end to end (encode plus
+enqueue on every subscriber) against fake sockets that never drain.
+
+Usage: python benchmarks/notification_encoding.py [--recipients 1000] [--rounds 200]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_hub import ConnectionHub, encode_frame
+
+# Shapes of the messages main.py actually publishes
+MESSAGES = {
+    "queue_update": {"type": "queue_update", "position": 12, "estimated_wait_time": 480},
+    "transfer_ready": {
+        "type": "transfer_ready",
+        "room_name": "support_room_1a2b3c",
+        "agent_b_room": "transfer_room_4d5e6f",
+        "agent_a_identity": "agent_a",
+        "agent_b_identity": "agent_b",
+        "summary": "Customer called about a delayed withdrawal from their brokerage account. " * 6,
+        "caller_context": {"email": "customer@example.com", "caller_type": "investor", "tags": ["vip", "retail"]},
+    },
+}
+
+
+class IdleWebSocket:
+    async def send_text(self, frame):
+        await asyncio.Event().wait()  # never completes: frames stay queued
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def per_recipient_json(message, recipients: int) -> None:
+    for _ in range(recipients):
+        json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def encode_once(message, recipients: int) -> None:
+    frame = encode_frame(message)
+    for _ in range(recipients):
+        frame  # the same str object is handed to every connection
+
+
+def best_of(fn, rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+async def hub_publish(message, recipients: int, rounds: int) -> float:
+    hub = ConnectionHub(max_queue=rounds + 1)
+    for _ in range(recipients):
+        hub.subscribe(hub.connect(IdleWebSocket()), "room:bench")
+    await asyncio.sleep(0)  # let the writer tasks start and block
+    elapsed = best_of(lambda: hub.publish(["room:bench"], message), rounds)
+    for connection in hub.connections():
+        await hub.disconnect(connection)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    scale = 1000 / args.recipients
+    print(f"Recipients: {args.recipients:,}, best of {args.rounds} rounds, microseconds per 1k recipients")
+    for name, message in MESSAGES.items():
+        before = best_of(lambda: per_recipient_json(message, args.recipients), args.rounds)
+        after = best_of(lambda: encode_once(message, args.recipients), args.rounds)
+        publish = asyncio.run(hub_publish(message, args.recipients, args.rounds))
+        print(
+            f"{name:15} json per recipient {before * scale * 1e6:9.1f}   "
+            f"orjson once {after * scale * 1e6:7.1f} ({before / after:5.1f}x)   "
+            f"hub.publish {publish * scale * 1e6:7.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
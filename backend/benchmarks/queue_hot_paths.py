@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the QueueManager hot paths on the in-memory adapter.
+
+Times add_customer, get_customer_position, try_assign_customer,
+get_available_agents_count and _build_status_response across a grid of queue
+depths and agent counts, prints the results as JSON and compares them with a
+stored baseline. Exits non-zero when any case is slower than the baseline by
+more than --threshold, so it can gate CI.
+
+Usage:
+    python benchmarks/queue_hot_paths.py                    # quick grid, compare with baseline.json
+    python benchmarks/queue_hot_paths.py --full             # depths 10..1M, agents 2..10k
+    python benchmarks/queue_hot_paths.py --update-baseline  # record a new baseline
+    python benchmarks/queue_hot_paths.py --output results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_manager import InMemoryQueueAdapter, QueueManager
+
+QUICK_DEPTHS = [10, 1_000, 100_000]
+QUICK_AGENTS = [2, 100, 10_000]
+FULL_DEPTHS = [10, 100, 1_000, 10_000, 100_000, 1_000_000]
+FULL_AGENTS = [2, 10, 100, 1_000, 10_000]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def build_manager(depth: int, agents: int) -> QueueManager:
+    manager = QueueManager(InMemoryQueueAdapter())
+    for i in range(depth):
+        manager.add_customer(f"customer{i}@example.com", "investor" if i % 2 else "prospect")
+    for i in range(agents):
+        manager.set_agent_status(f"agent_{i}", "available")
+    return manager
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    samples.sort()
+    return {
+        "median_ns": samples[len(samples) // 2],
+        "p95_ns": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+    }
+
+
+def bench_case(depth: int, agents: int, ops: int, rng: random.Random) -> List[Dict]:
+    """Per-operation timings for every hot path at one (depth, agents) point."""
+    manager = build_manager(depth, agents)
+    adapter = manager._adapter
+    timer = time.perf_counter_ns
+    results = []
+
+    def record(op: str, samples: List[int]) -> None:
+        results.append({"op": op, "depth": depth, "agents": agents, "ops": len(samples), **summarize(samples)})
+
+    gc.collect()
+    gc.disable()
+    try:
+        samples = []
+        for i in range(ops):
+            email = f"new{i}@example.com"
+            start = timer()
+            manager.add_customer(email, "investor")
+            samples.append(timer() - start)
+            manager.remove_customer(email)  # keep the depth fixed
+        record("add_customer", samples)
+
+        samples = []
+        for _ in range(ops):
+            email = f"customer{rng.randrange(depth)}@example.com"
+            start = timer()
+            adapter.get_customer_position(email)
+            samples.append(timer() - start)
+        record("get_customer_position", samples)
+
+        samples = []
+        for i in range(ops):
+            agent_id = f"agent_{i % agents}"
+            start = timer()
+            customer = manager.try_assign_customer(agent_id)
+            samples.append(timer() - start)
+            # Put both sides back so every iteration sees the same depth and free agents
+            manager.set_agent_status(agent_id, "available")
+            if customer:
+                manager.add_customer(customer["email"], customer["caller_type"])
+        record("try_assign_customer", samples)
+
+        samples = []
+        for _ in range(ops):
+            start = timer()
+            manager.get_available_agents_count()
+            samples.append(timer() - start)
+        record("get_available_agents_count", samples)
+
+        samples = []
+        for _ in range(ops):
+            position = rng.randrange(1, depth + 1)
+            start = timer()
+            manager._build_status_response(position)
+            samples.append(timer() - start)
+        record("_build_status_response", samples)
+    finally:
+        gc.enable()
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, threshold: float) -> List[str]:
+    """Regression messages for cases whose median exceeds baseline * threshold."""
+    expected = {(r["op"], r["depth"], r["agents"]): r["median_ns"] for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = (result["op"], result["depth"], result["agents"])
+        if key not in expected:
+            continue
+        ratio = result["median_ns"] / max(expected[key], 1)
+        result["baseline_median_ns"] = expected[key]
+        result["ratio"] = round(ratio, 2)
+        if ratio > threshold:
+            regressions.append(
+                f"{result['op']} depth={result['depth']} agents={result['agents']}: "
+                f"{result['median_ns']} ns vs baseline {expected[key]} ns ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--full", action="store_true", help="run the full depth/agent grid (slow)")
+    parser.add_argument("--ops", type=int, default=1000, help="timed operations per case")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="allowed slowdown factor vs baseline")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    depths, agent_counts = (FULL_DEPTHS, FULL_AGENTS) if args.full else (QUICK_DEPTHS, QUICK_AGENTS)
+    rng = random.Random(1234)
+    results = []
+    for depth in depths:
+        for agents in agent_counts:
+            print(f"depth={depth:,} agents={agents:,}", file=sys.stderr)
+            results.extend(bench_case(depth, agents, args.ops, rng))
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "ops_per_case": args.ops,
+        "results": results,
+    }
+
+    regressions = []
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        report["regressions"] = regressions
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+    if regressions:
+        print("Regressions against baseline:", file=sys.stderr)
+        for line in regressions:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for InMemoryQueueAdapter: bytes held per waiting customer.
+
+Compares the adapter's slotted records against the previous representation
+(one dict with a `datetime` per entry) at the same queue depth.
+
+Usage: python benchmarks/queue_memory.py [--customers 100000]
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from queue_manager import InMemoryQueueAdapter
+
+
+def measure(build) -> int:
+    """Bytes still allocated by `build()` once it returns (its result kept alive)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def build_adapter(emails):
+    adapter = InMemoryQueueAdapter()
+    for i, email in enumerate(emails):
+        adapter.add_customer(email, "investor" if i % 2 else "prospect")
+    return adapter
+
+
+def build_dict_entries(emails):
+    # The pre-slots layout: a dict per entry holding a full datetime
+    return [
+        {
+            "email": email,
+            "caller_type": "investor" if i % 2 else "prospect",
+            "timestamp": datetime.now(),
+            "status": "waiting"
+        }
+        for i, email in enumerate(emails)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100_000)
+    args = parser.parse_args()
+
+    # Email strings are shared by both layouts, so they are excluded from the numbers
+    emails = [f"customer{i}@example.com" for i in range(args.customers)]
+
+    adapter_bytes = measure(lambda: build_adapter(emails))
+    dict_bytes = measure(lambda: build_dict_entries(emails))
+
+    print(f"Waiting customers:            {args.customers:,}")
+    print(f"InMemoryQueueAdapter:         {adapter_bytes / args.customers:,.1f} bytes/customer "
+          f"(records + email/seq index + Fenwick tree)")
+    print(f"dict+datetime entries alone:  {dict_bytes / args.customers:,.1f} bytes/customer "
+          f"(no index at all)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+WebSocket fan-out benchmark: notification latency with one slow client.
+
+Broadcasts to N in-process fake sockets whose sends take --fast-ms (network
+write latency), one of which takes --slow-ms instead, and reports how long
+the broadcast call blocks the caller and how long until every fast client
+has the message. Compares the per-connection send queues in ConnectionHub
+with awaiting send_json on each socket in turn.
+
+Usage: python benchmarks/websocket_fanout.py [--clients 10000] [--fast-ms 0.2] [--slow-ms 50]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websocket_hub import ConnectionHub
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float, on_receive):
+        self._delay = delay
+        self._on_receive = on_receive
+
+    async def send_text(self, frame):
+        if self._delay:
+            await asyncio.sleep(self._delay)
+        self._on_receive(self)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+async def run(clients: int, fast_delay: float, slow_delay: float, hub_mode: bool):
+    delivered = 0
+    all_fast_delivered = asyncio.Event()
+
+    def on_receive(ws):
+        nonlocal delivered
+        if ws is not slow:
+            delivered += 1
+            if delivered == clients - 1:
+                all_fast_delivered.set()
+
+    slow = FakeWebSocket(slow_delay, on_receive)
+    sockets = [slow] + [FakeWebSocket(fast_delay, on_receive) for _ in range(clients - 1)]
+    message = {"type": "transfer_ready", "room_name": "support_room", "summary": "x" * 200}
+
+    if hub_mode:
+        hub = ConnectionHub()
+        for ws in sockets:
+            hub.connect(ws)
+        start = time.perf_counter()
+        hub.broadcast(message)
+        blocked = time.perf_counter() - start
+        await all_fast_delivered.wait()
+        total = time.perf_counter() - start
+        for connection in hub.connections():
+            await hub.disconnect(connection)
+    else:
+        start = time.perf_counter()
+        for ws in sockets:
+            # What WebSocket.send_json does: encode per recipient, then send text
+            await ws.send_text(json.dumps(message, separators=(",", ":"), ensure_ascii=False))
+        blocked = time.perf_counter() - start
+        total = blocked
+    return blocked, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10_000)
+    parser.add_argument("--fast-ms", type=float, default=0.2, help="send latency of a normal client")
+    parser.add_argument("--slow-ms", type=float, default=50.0, help="send latency of the one slow client")
+    args = parser.parse_args()
+
+    print(f"Clients: {args.clients:,} at {args.fast_ms} ms/send, one slow client at {args.slow_ms:.0f} ms/send")
+    for label, hub_mode in (("sequential send_json", False), ("ConnectionHub queues", True)):
+        blocked, total = asyncio.run(run(args.clients, args.fast_ms / 1000, args.slow_ms / 1000, hub_mode))
+        print(f"{label:22} caller blocked {blocked * 1000:8.2f} ms, all fast clients served in {total * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
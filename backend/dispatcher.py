@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class QueueDispatcher:
+    """
+    Background matcher between waiting customers and available agents.
+
+    Queue and agent-state changes only wake the dispatcher (safe from any
+    thread); wake-ups that arrive while a pass is running collapse into one
+    follow-up pass. A pass walks the available agents longest-idle first and
+    asks the queue manager to assign each one its best waiting customer, so
+    customers are connected as soon as an agent is free instead of on the
+    next client poll. Each assignment is handed to `on_assigned` (room,
+    tokens, notifications) as its own task so slow LiveKit calls never hold
+    up matching; if it fails, the assignment is released: the customer goes
+    back to their place in the queue and the agent becomes available again.
+    Passes then pause for `retry_delay` seconds so a failing LiveKit does not
+    get the same pair retried in a tight loop.
+    """
+    def __init__(self, queue, on_assigned: Callable[[Dict[str, Any]], Awaitable[Any]], retry_delay: float = 1.0):
+        self._queue = queue
+        self._on_assigned = on_assigned
+        self._retry_delay = retry_delay
+        self._retry_at = 0.0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    def start(self) -> None:
+        """Start the dispatch loop on the running event loop; call from app startup."""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()  # match anything already waiting at startup
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self) -> None:
+        """Queue or agent state changed. Safe to call from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def dispatch_once(self) -> List[Dict[str, Any]]:
+        """Match every available agent it can in one pass; returns the new assignments."""
+        waiting = await self._queue.get_queue_length()
+        if not waiting:
+            return []
+        assignments = []
+        for agent_id in await self._queue.get_available_agents():
+            customer = await self._queue.try_assign_customer(agent_id)
+            if customer is None:
+                continue
+            assignments.append(customer)
+            task = asyncio.ensure_future(self._deliver(customer))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+            waiting -= 1
+            if not waiting:
+                break
+        if assignments:
+            logger.info(f"Dispatcher assigned {len(assignments)} customers")
+        return assignments
+
+    async def _deliver(self, customer: Dict[str, Any]) -> None:
+        try:
+            await self._on_assigned(customer)
+        except Exception as e:
+            logger.error(f"Failed to connect {customer['email']} with {customer['agent_id']}: {e}")
+            # Put the customer back in their place and free the agent, so neither is lost
+            self._retry_at = asyncio.get_running_loop().time() + self._retry_delay
+            try:
+                await self._queue.release_assignment(customer)
+            except Exception as e:
+                logger.error(f"Failed to requeue {customer['email']}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            delay = self._retry_at - asyncio.get_running_loop().time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._wakeup.clear()
+            try:
+                await self.dispatch_once()
+            except Exception as e:
+                logger.error(f"Dispatch pass failed: {e}")
@@ -0,0 +1,144 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Set
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+
+
+class GroqAPIError(Exception):
+    """Groq answered with a non-200 status."""
+    def __init__(self, status_code: int, body: str):
+        super().__init__(f"Groq API error {status_code}: {body[:200]}")
+        self.status_code = status_code
+        self.body = body
+
+
+class GroqClient:
+    """
+    Shared async client for the Groq chat completions API.
+
+    One aiohttp session per event loop keeps up to `pool_size` keep-alive
+    connections to Groq, so calls skip the TCP and TLS handshakes and never
+    block the event loop while they wait. aiohttp speaks HTTP/1.1 only;
+    concurrent calls use separate pooled connections instead of HTTP/2
+    streams. Each call has its own total timeout on top of a short connect
+    timeout.
+    """
+    def __init__(self, url: str = GROQ_API_URL, pool_size: int = 20, connect_timeout: float = 5.0,
+                 keepalive_timeout: float = 60.0):
+        self._url = url
+        self._pool_size = pool_size
+        self._connect_timeout = connect_timeout
+        self._keepalive_timeout = keepalive_timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._owner: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # A session is bound to the loop it was created on (tests run several loops)
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._discard_session()
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_size,
+                keepalive_timeout=self._keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._loop = loop
+            # asyncio.run() cancels leftover tasks before closing its loop, so this
+            # closes the pool while its sockets can still be shut down cleanly
+            self._owner = loop.create_task(self._close_with_loop(self._session))
+        return self._session
+
+    @staticmethod
+    async def _close_with_loop(session: aiohttp.ClientSession) -> None:
+        try:
+            await asyncio.Future()
+        finally:
+            await session.close()
+
+    def _discard_session(self) -> None:
+        """Close the session being replaced so its connector and pooled sockets are released."""
+        session, owner, loop = self._session, self._owner, self._loop
+        self._session = self._owner = None
+        if session is None:
+            return
+        if loop is not None and loop.is_running():
+            # Close it on the loop that owns its connections, possibly in another thread
+            loop.call_soon_threadsafe(owner.cancel)
+            return
+        if session.closed:
+            return
+        # Its loop was stopped without cancelling tasks; sockets of a closed loop are
+        # gone with it, but the session and connector still need marking closed
+        task = asyncio.get_running_loop().create_task(session.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def chat_completion(self, api_key: str, payload: Dict[str, Any], timeout: float = 30.0) -> Dict[str, Any]:
+        """
+        POST one chat completion request and return the decoded JSON body.
+
+        Raises GroqAPIError on a non-200 status, asyncio.TimeoutError when
+        `timeout` seconds pass and aiohttp.ClientError on connection failures.
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        client_timeout = aiohttp.ClientTimeout(total=timeout, connect=self._connect_timeout)
+        async with self._get_session().post(self._url, headers=headers, json=payload, timeout=client_timeout) as response:
+            if response.status != 200:
+                raise GroqAPIError(response.status, await response.text())
+            return await response.json()
+
+    async def stream_chat_completion(self, api_key: str, payload: Dict[str, Any],
+                                     timeout: float = 30.0) -> AsyncIterator[str]:
+        """
+        POST a chat completion with stream=True and yield the content deltas as they arrive.
+
+        Groq streams OpenAI-style server-sent events, one `data: {...}` line
+        per chunk and `data: [DONE]` at the end. `timeout` bounds the whole
+        stream; errors are raised as in chat_completion().
+        """
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        client_timeout = aiohttp.ClientTimeout(total=timeout, connect=self._connect_timeout)
+        payload = {**payload, "stream": True}
+        async with self._get_session().post(self._url, headers=headers, json=payload, timeout=client_timeout) as response:
+            if response.status != 200:
+                raise GroqAPIError(response.status, await response.text())
+            async for raw_line in response.content:
+                line = raw_line.decode("utf-8").strip()
+                if not line.startswith("data:"):
+                    continue  # blank separators and SSE comments
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                choices = json.loads(data).get("choices") or []
+                if choices:
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+
+    async def close(self) -> None:
+        session, owner = self._session, self._owner
+        self._session = self._owner = None
+        if owner is not None:
+            owner.cancel()
+        if session is not None and not session.closed:
+            await session.close()
+
+
+# Shared by llm_utils and ai_chat_utils so every Groq call reuses the same pool
+groq_client = GroqClient()
@@ -1,8 +1,12 @@
 import os
-import requests
+import asyncio
+import aiohttp
 import logging
-from typing import Dict
+from typing import Dict, Optional
 from dotenv import load_dotenv
+from groq_client import groq_client, GroqAPIError
+from summary_cache import SummaryCache, summary_cache_key
+from single_flight import SingleFlight
 
 # Load environment variables
 load_dotenv()
@@ -13,10 +17,24 @@ logger = logging.getLogger(__name__)
 
 # Groq configuration
 GROQ_API_KEY = os.getenv("groq_key")
-GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+SUMMARY_MODEL = "llama-3.1-8b-instant"
 
-def generate_call_summary(conversation_text: str, caller_type: str = "customer", context: Dict = None) -> str:
+# Repeated summaries of an unchanged conversation (e.g. a retried transfer) skip the LLM
+summary_cache = SummaryCache(
+    max_entries=int(os.getenv("SUMMARY_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "600"))
+)
+
+# Identical summary requests already in flight (double-clicked transfer, back-to-back endpoints) share one call
+summary_flights = SingleFlight()
+
+async def generate_call_summary(conversation_text: str, caller_type: str = "customer", context: Dict = None) -> str:
     """Generate a conversation summary using Groq LLM for warm transfer"""
+    # Same key as the cache: `context` does not go into the prompt
+    key = summary_cache_key(conversation_text, caller_type, SUMMARY_MODEL)
+    return await summary_flights.do(key, lambda: _generate_call_summary(conversation_text, caller_type))
+
+async def _generate_call_summary(conversation_text: str, caller_type: str) -> str:
     try:
         logger.info(f"🤖 Generating conversation summary with Groq")
         logger.info(f"📝 Input conversation: {conversation_text[:200]}...")
@@ -29,6 +47,13 @@ def generate_call_summary(conversation_text: str, caller_type: str = "customer",
             logger.warning("⚠️ Empty conversation text provided")
             return "No conversation content available for summary"
         
+        # Only real summaries are cached, never the error/fallback texts below
+        cache_key = summary_cache_key(conversation_text, caller_type, SUMMARY_MODEL)
+        cached = summary_cache.get(cache_key)
+        if cached is not None:
+            logger.info("✅ Using cached conversation summary")
+            return cached
+        
         # Simple prompt for conversation summary
         prompt = f"""Please create a brief, professional summary of this customer support conversation for a warm transfer. Focus on the customer's issue and what assistance has been provided so far. Keep it under 2-3 sentences:
 
@@ -37,42 +62,72 @@ Conversation:
 
 Summary:"""
         
-        headers = {
-            "Authorization": f"Bearer {GROQ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "model": "llama-3.1-8b-instant",
-            "messages": [
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": 150,
-            "temperature": 0.3
-        }
-        
         logger.info("📡 Sending request to Groq API...")
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=30)
-        
-        if response.status_code != 200:
-            logger.error(f"❌ Groq API error: {response.status_code} - {response.text}")
-            return f"LLM API error (status {response.status_code}). Using fallback summary."
-        
-        result = response.json()
+        result = await groq_client.chat_completion(GROQ_API_KEY, summary_payload(prompt), timeout=30)
         if "choices" not in result or len(result["choices"]) == 0:
             logger.error(f"❌ Unexpected Groq API response format: {result}")
             return "LLM response format error. Using fallback summary."
             
         summary = result["choices"][0]["message"]["content"].strip()
         logger.info(f"✅ Generated conversation summary: {summary}")
+        summary_cache.put(cache_key, summary)
         return summary
 
-    except requests.exceptions.Timeout:
+    except GroqAPIError as e:
+        logger.error(f"❌ Groq API error: {e.status_code} - {e.body}")
+        return f"LLM API error (status {e.status_code}). Using fallback summary."
+    except asyncio.TimeoutError:
         logger.error("❌ Groq API timeout")
         return "LLM request timeout. Customer needs assistance with their inquiry."
-    except requests.exceptions.RequestException as e:
+    except aiohttp.ClientError as e:
         logger.error(f"❌ Groq API request failed: {str(e)}")
         return "LLM service unavailable. Customer needs assistance with their inquiry."
     except Exception as e:
         logger.error(f"❌ Unexpected error in LLM summary generation: {str(e)}")
         return "Summary generation failed. Customer needs assistance with their inquiry."
+
+
+def summary_payload(prompt: str) -> Dict:
+    """Groq request body for a short, low-temperature summary"""
+    return {
+        "model": SUMMARY_MODEL,
+        "messages": [
+            {"role": "user", "content": prompt}
+        ],
+        "max_tokens": 150,
+        "temperature": 0.3
+    }
+
+async def update_call_summary(previous_summary: str, new_text: str) -> Optional[str]:
+    """Fold new conversation text into a running summary; None if the LLM call failed"""
+    if not GROQ_API_KEY:
+        logger.error("❌ Groq API key not found in environment variables")
+        return None
+    
+    if not previous_summary:
+        prompt = f"""Please create a brief, professional summary of this customer support conversation for a warm transfer. Focus on the customer's issue and what assistance has been provided so far. Keep it under 2-3 sentences:
+
+Conversation:
+{new_text}
+
+Summary:"""
+    else:
+        prompt = f"""Below is the summary of a customer support conversation so far, followed by what was said since. Update the summary for a warm transfer so it also covers the new part. Focus on the customer's issue and what assistance has been provided so far. Keep it under 2-3 sentences:
+
+Summary so far:
+{previous_summary}
+
+New conversation:
+{new_text}
+
+Updated summary:"""
+    
+    try:
+        result = await groq_client.chat_completion(GROQ_API_KEY, summary_payload(prompt), timeout=30)
+        if not result.get("choices"):
+            logger.error(f"❌ Unexpected Groq API response format: {result}")
+            return None
+        return result["choices"][0]["message"]["content"].strip()
+    except Exception as e:
+        logger.error(f"❌ Rolling summary update failed: {str(e)}")
+        return None
@@ -1,6 +1,6 @@
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import Response, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import uvicorn
 from typing import Optional
@@ -15,14 +15,23 @@ logger = logging.getLogger(__name__)
 from livekit_utils import create_room_token, create_room, disconnect_participant, get_room_participants, delete_room, start_room_transcription, stop_room_transcription, is_room_transcription_active
 from twilio_utils import initiate_twilio_call, initiate_warm_transfer_call, get_call_status, handle_call_status_callback, generate_twiml_response
 from twilio.twiml.voice_response import VoiceResponse
-from llm_utils import generate_call_summary
+from llm_utils import generate_call_summary, update_call_summary, summary_cache
+from room_summarizer import RoomSummarizer
 from db_utils import (
     get_caller_context, get_agent_by_role,
     get_room_transcriptions, get_transcription_summary
 )
-from queue_manager import queue_manager
+from queue_manager import async_queue_manager
+from queue_updates import QueuePositionNotifier, position_version
+from queue_presence import PresenceTracker
+from dispatcher import QueueDispatcher
+from websocket_hub import (
+    ConnectionHub, customer_topic, agent_topic, room_topic, transfer_topic, is_client_topic, encode_frame
+)
+from notification_bus import create_notification_bus
 from deepgram_utils import transcribe_base64_audio
-from ai_chat_utils import generate_ai_response, create_conversation_entry
+from ai_chat_utils import generate_ai_response, stream_ai_response, create_conversation_entry
+from groq_client import groq_client
 from models import (
     CreateRoomRequest, CreateRoomResponse,
     TransferInitiateRequest, TransferInitiateResponse,
@@ -31,6 +40,7 @@ from models import (
     ChatRequest, ChatResponse, TranscribeRequest, TranscribeResponse,
     ChatMessage,
     QueueStatusRequest, QueueStatusResponse,
+    BatchQueueStatusRequest, BatchEnqueueRequest, BatchQueueStatusResponse,
     AgentAvailabilityRequest, AgentAvailabilityResponse,
     PickNextCustomerRequest, PickNextCustomerResponse,
     StartTranscriptionRequest, StartTranscriptionResponse,
@@ -40,23 +50,69 @@ from models import (
 )
 import asyncio
 from fastapi import WebSocket
-from typing import List
 import json
 from datetime import datetime
 
-# WebSocket connections for real-time notifications
-websocket_connections: List[WebSocket] = []
+# WebSocket connections for real-time notifications, each with its own bounded send queue
+websocket_hub = ConnectionHub(
+    max_queue=int(os.getenv("WS_SEND_QUEUE_SIZE", "256")),
+    policy=os.getenv("WS_SLOW_CONSUMER_POLICY", "disconnect"),
+    replay_size=int(os.getenv("WS_REPLAY_SIZE", "64")),
+    heartbeat_interval=float(os.getenv("WS_HEARTBEAT_INTERVAL", "20")),
+    idle_timeout=float(os.getenv("WS_IDLE_TIMEOUT", "60"))
+)
+
+# Routes notifications to whichever worker holds the subscribed sockets (NOTIFICATION_BUS)
+notification_bus = create_notification_bus(websocket_hub)
 
 # In-memory storage for pending transfers (in production, use a database)
 pending_transfers = {}
 
-# In-memory storage for customer assignments to ensure HTTP fallback delivery
-# Keyed by customer email → { room_name, customer_token }
-assigned_customers = {}
+async def publish_notification(topics, message: dict):
+    """Send a message to the connections subscribed to any of the given topics, on any worker"""
+    await notification_bus.publish(topics, message)
+
+def connected_customer_emails():
+    """Emails of customers with at least one identified socket"""
+    prefix = customer_topic("")
+    return [topic[len(prefix):] for topic in websocket_hub.topics(prefix)]
+
+async def push_to_customer_socket(email: str, message: dict):
+    """Send to a customer's own sockets only; each worker's notifier serves its own connections"""
+    # Positions are re-pushed on reconnect, so they are not kept for replay
+    websocket_hub.publish([customer_topic(email)], message, replay=False)
+
+def assignment_room_name(agent_id: str, email: str) -> str:
+    return f"support_{agent_id}_{email.replace('@', '_').replace('.', '_')}"
+
+async def find_assignment(email: str) -> Optional[dict]:
+    """
+    The customer's live assignment, from the queue manager's agent state: the same
+    room and a fresh token, on whichever worker the poll lands on and whether or not
+    the customer was ever notified. None once the agent is no longer busy with them.
+    """
+    agent_id = await async_queue_manager.get_assigned_agent(email)
+    if agent_id is None:
+        return None
+    room_name = assignment_room_name(agent_id, email)
+    return {
+        "type": "agent_assigned",
+        "email": email,
+        "agent_id": agent_id,
+        "room_name": room_name,
+        "customer_token": create_room_token(room_name, f"customer_{email}")
+    }
+
+# Pushes coalesced position/ETA changes to waiting customers instead of making them poll
+queue_notifier = QueuePositionNotifier(async_queue_manager, connected_customer_emails, push_to_customer_socket)
 
-# Targeted WebSocket maps for customers and agents
-customer_sockets = {}
-agent_sockets = {}
+# Evicts customers who closed the tab: no open socket and no poll within the TTL
+presence_tracker = PresenceTracker(
+    async_queue_manager,
+    ttl=float(os.getenv("QUEUE_ABANDON_TTL", "60")),
+    grace_period=float(os.getenv("QUEUE_RECONNECT_GRACE", "30")),
+    on_evict=queue_notifier.forget
+)
 
 async def speak_summary(room_name: str, summary: str):
     """Simulate speaking the call summary in the room (in real implementation, use TTS)"""
@@ -64,122 +120,236 @@ async def speak_summary(room_name: str, summary: str):
     # and publish it to the LiveKit room. For this demo, we'll just log it.
     print(f"Speaking summary in room {room_name}: {summary}")
     # You could send a data message to the room participants
-    # For now, we'll broadcast via WebSocket
+    # For now, we'll notify the room's WebSocket subscribers
     message = {
         "type": "summary_speech",
         "room_name": room_name,
         "summary": summary
     }
-    await broadcast_websocket_message(message)
-
-async def broadcast_websocket_message(message: dict):
-    """Broadcast a message to all connected WebSocket clients"""
-    for connection in websocket_connections:
-        try:
-            await connection.send_json(message)
-        except Exception as e:
-            print(f"Failed to send message to WebSocket: {e}")
-            # Remove broken connections
-            websocket_connections.remove(connection)
+    await publish_notification([room_topic(room_name)], message)
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI(title="Warm Transfer API", version="1.0.0")
+app = FastAPI(title="Warm Transfer API", version="1.0.0", default_response_class=ORJSONResponse)
+
+@app.on_event("startup")
+async def start_queue_notifier():
+    await notification_bus.start()
+    websocket_hub.start()
+    room_summarizer.start()
+    queue_notifier.start()
+    async_queue_manager.add_change_listener(queue_notifier.mark_dirty)
+    presence_tracker.start()
+    # Customers recovered from the queue journal get one abandon ttl to poll or reconnect.
+    # Customers left in a shared SQLite/Redis queue are tracked once they poll again: no
+    # single worker's tracker owns them.
+    for email in async_queue_manager.manager.recovered_customers:
+        presence_tracker.seen(email)
+    queue_dispatcher.start()
+    async_queue_manager.add_change_listener(queue_dispatcher.wake)
+
+@app.on_event("shutdown")
+async def close_queue_manager():
+    await queue_dispatcher.stop()
+    await presence_tracker.stop()
+    await notification_bus.stop()
+    await websocket_hub.stop()
+    await room_summarizer.stop()
+    await groq_client.close()
+    # Final journal snapshot so the next start only has to load one file
+    async_queue_manager.manager.close()
 
 @app.websocket("/ws/notifications")
 async def websocket_notifications(websocket: WebSocket):
     """WebSocket endpoint for real-time transfer notifications"""
     logger.info("🔌 New WebSocket connection established")
     await websocket.accept()
-    websocket_connections.append(websocket)
-    logger.info(f"📊 Total WebSocket connections: {len(websocket_connections)}")
-    
-    # Store connection type for targeted messaging
-    connection_info = {
-        "websocket": websocket,
-        "type": "unknown",  # Will be updated when client identifies itself
-        "email": None,
-        "agent_id": None
-    }
+    connection = websocket_hub.connect(websocket)
+    logger.info(f"📊 Total WebSocket connections: {len(websocket_hub)}")
+    # Streamed chat replies in flight on this socket
+    chat_tasks = set()
     
     try:
         while True:
             # Receive and process identification messages
             data = await websocket.receive_text()
             logger.debug(f"📨 WebSocket received: {data}")
+            connection.touch()
             
             try:
                 message = json.loads(data)
+                # Heartbeat reply; touch() above is all it is for
+                if message.get("type") == "pong":
+                    continue
+                # Chat over the socket: the reply streams back as chat_chunk messages, then chat_done
+                if message.get("type") == "chat":
+                    task = asyncio.ensure_future(stream_chat_to_socket(connection, message))
+                    chat_tasks.add(task)
+                    task.add_done_callback(chat_tasks.discard)
+                    continue
                 
-                # Handle client identification
+                # A reconnecting client sends the epoch and last seq it saw to get what it missed
+                epoch = message.get("epoch")
+                last_seq = message.get("last_seq")
+                last_seq = last_seq if isinstance(last_seq, int) else 0
+
+                # Handle client identification; a socket only ever holds its own identity topic
+                if "email" in message or "agent_id" in message:
+                    if connection.email:
+                        websocket_hub.unsubscribe(connection, customer_topic(connection.email))
+                    if connection.agent_id:
+                        websocket_hub.unsubscribe(connection, agent_topic(connection.agent_id))
+                    connection.email = connection.agent_id = None
                 if "email" in message:
-                    connection_info["type"] = "customer"
-                    connection_info["email"] = message["email"]
+                    connection.client_type = "customer"
+                    connection.email = message["email"]
                     logger.info(f"👤 Customer identified: {message['email']}")
-                    customer_sockets[message["email"]] = websocket
+                    websocket_hub.resume(connection, customer_topic(message["email"]), epoch, last_seq)
+                    presence_tracker.connected(message["email"])
+                    # Push their current position right away
+                    queue_notifier.forget(message["email"])
+                    queue_notifier.mark_dirty()
                     
                 elif "agent_id" in message:
-                    connection_info["type"] = "agent"
-                    connection_info["agent_id"] = message["agent_id"]
+                    connection.client_type = "agent"
+                    connection.agent_id = message["agent_id"]
                     logger.info(f"👔 Agent identified: {message['agent_id']}")
-                    agent_sockets[message["agent_id"]] = websocket
+                    websocket_hub.resume(connection, agent_topic(message["agent_id"]), epoch, last_seq)
+
+                # Room and transfer topics carry call summaries, so only the server joins a
+                # socket to them (connect_assignment, transfers); a client may only leave them.
+                rejected = list(message.get("subscribe") or [])
+                for topic in message.get("unsubscribe") or []:
+                    if is_client_topic(topic):
+                        websocket_hub.unsubscribe(connection, topic)
+                if rejected:
+                    connection.send({
+                        "type": "error",
+                        "message": "Topics are joined by the server when you are assigned to a room or transfer",
+                        "topics": rejected
+                    })
                     
                 # Send acknowledgment instead of echo
-                await websocket.send_text(json.dumps({
+                connection.send({
                     "type": "acknowledgment",
                     "message": "Message received",
                     "timestamp": datetime.now().isoformat()
-                }))
+                })
                 
             except json.JSONDecodeError:
                 logger.warning(f"Received non-JSON message: {data}")
                 # Send error response in JSON format
-                await websocket.send_text(json.dumps({
+                connection.send({
                     "type": "error",
                     "message": "Invalid JSON format"
-                }))
+                })
                 
     except WebSocketDisconnect:
         logger.info("🔌 WebSocket client disconnected normally")
     except Exception as e:
         logger.error(f"❌ WebSocket error: {e}")
     finally:
-        if websocket in websocket_connections:
-            websocket_connections.remove(websocket)
-        # Cleanup targeted maps
-        try:
-            if connection_info.get("email") and customer_sockets.get(connection_info["email"]) is websocket:
-                del customer_sockets[connection_info["email"]]
-        except Exception:
-            pass
-        try:
-            if connection_info.get("agent_id") and agent_sockets.get(connection_info["agent_id"]) is websocket:
-                del agent_sockets[connection_info["agent_id"]]
-        except Exception:
-            pass
-        logger.info(f"🔌 WebSocket connection closed. Total connections: {len(websocket_connections)}")
-
-# Targeted send helpers with broadcast fallback
+        for task in chat_tasks:
+            task.cancel()
+        # Drops every topic subscription of this connection
+        await websocket_hub.disconnect(connection)
+        email = connection.email
+        if email and not websocket_hub.subscriber_count(customer_topic(email)):
+            # Last socket for this customer is gone
+            queue_notifier.forget(email)
+            presence_tracker.disconnected(email)
+        logger.info(f"🔌 WebSocket connection closed. Total connections: {len(websocket_hub)}")
+
+# Streamed chat text is batched into one WebSocket message per this many seconds, so a
+# fast token stream does not fill the connection's send queue
+CHAT_CHUNK_INTERVAL = 0.05
+
+async def stream_chat_to_socket(connection, request: dict):
+    """Stream an AI chat reply to one socket; chunks echo the client's request_id"""
+    request_id = request.get("request_id")
+    caller_type = request.get("caller_type", "prospect")
+    email = request.get("email")
+    caller_context = get_caller_context(email, caller_type) if email else None
+    conversation_history = [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in request.get("conversation_history") or []
+        if isinstance(msg, dict) and "role" in msg and "content" in msg
+    ]
+
+    loop = asyncio.get_running_loop()
+    parts, pending = [], []
+    last_sent = float("-inf")  # the first token goes out immediately
+    async for chunk in stream_ai_response(str(request.get("message", "")), caller_type, caller_context, conversation_history):
+        parts.append(chunk)
+        pending.append(chunk)
+        if loop.time() - last_sent >= CHAT_CHUNK_INTERVAL:
+            connection.send({"type": "chat_chunk", "request_id": request_id, "content": "".join(pending)})
+            pending.clear()
+            last_sent = loop.time()
+    if pending:
+        connection.send({"type": "chat_chunk", "request_id": request_id, "content": "".join(pending)})
+    connection.send({"type": "chat_done", "request_id": request_id, "response": "".join(parts).strip()})
+
+# Targeted send helpers; customer and agent events are kept for replay when the socket reconnects
 async def send_to_customer(email: str, message: dict):
-    ws = customer_sockets.get(email)
-    if ws:
-        try:
-            await ws.send_json(message)
-            return
-        except Exception:
-            pass
-    await broadcast_websocket_message(message)
+    await publish_notification([customer_topic(email)], message)
 
 async def send_to_agent(agent_id: str, message: dict):
-    ws = agent_sockets.get(agent_id)
-    if ws:
-        try:
-            await ws.send_json(message)
-            return
-        except Exception:
-            pass
-    await broadcast_websocket_message(message)
+    await publish_notification([agent_topic(agent_id)], message)
+
+async def connect_assignment(customer: dict, notify_customer: bool = True) -> dict:
+    """Create the room for a new customer-agent assignment, mint both tokens and notify both sides"""
+    agent_id = customer["agent_id"]
+    email = customer["email"]
+    room_name = assignment_room_name(agent_id, email)
+    await create_room(room_name)
+
+    agent_token = create_room_token(room_name, f"agent_{agent_id}")
+    customer_token = create_room_token(room_name, f"customer_{email}")
+
+    # Both sides follow the room's events (summary speech, transfers) from here on
+    await notification_bus.join([customer_topic(email), agent_topic(agent_id)], room_topic(room_name))
+
+    # Targeted notify agent for auto-join
+    await send_to_agent(agent_id, {
+        "type": "customer_assigned",
+        "agent_id": agent_id,
+        "customer_email": email,
+        "room_name": room_name,
+        "agent_token": agent_token
+    })
+    if notify_customer:
+        await send_to_customer(email, {
+            "type": "agent_assigned",
+            "email": email,
+            "agent_id": agent_id,
+            "room_name": room_name,
+            "customer_token": customer_token
+        })
+
+    # Out of the queue for good: stop the abandon timer
+    presence_tracker.forget(email)
+    logger.info(f"Assigned {email} to {agent_id} in {room_name}")
+    return {"room_name": room_name, "agent_token": agent_token, "customer_token": customer_token}
+
+async def connect_or_release(customer: dict, notify_customer: bool = True) -> dict:
+    """connect_assignment, putting the customer back in the queue and freeing the agent if it fails"""
+    try:
+        return await connect_assignment(customer, notify_customer)
+    except Exception:
+        await async_queue_manager.release_assignment(customer)
+        raise
+
+# Rolling per-room summary built from transcript segments, so transfers don't wait on the LLM
+room_summarizer = RoomSummarizer(
+    update_call_summary,
+    every_segments=int(os.getenv("SUMMARY_EVERY_SEGMENTS", "5")),
+    every_seconds=float(os.getenv("SUMMARY_EVERY_SECONDS", "30"))
+)
+
+# Connects customers as soon as an agent frees up, independent of client polling
+queue_dispatcher = QueueDispatcher(async_queue_manager, connect_assignment)
 
 # CORS middleware for frontend communication
 app.add_middleware(
@@ -213,11 +383,12 @@ async def create_room_endpoint(request: CreateRoomRequest):
     try:
         # Always add customer to queue first, regardless of agent availability
         # This ensures proper queue management and agent-controlled connections
-        status = queue_manager.add_customer(request.email, request.caller_type)
+        status = await async_queue_manager.add_customer(request.email, request.caller_type)
         position = status["position"]
         estimated_wait = status["estimated_wait_time"]
         
         logger.info(f"Customer {request.email} added to queue at position {position}")
+        presence_tracker.seen(request.email)
 
         return CreateRoomResponse(
             room_name=request.room_name,
@@ -282,42 +453,48 @@ async def initiate_transfer(request: TransferInitiateRequest):
             transcription_status = "active" if transcription_active else "inactive"
             transcription_error = None
 
-            # Error handling for transcription failures
-            if transcription_active and not transcription_segments:
-                logger.warning(f"⚠️  Transcription was active for room {request.original_room_name} but no segments found - possible transcription failure")
-                conversation_context = "Transcription service encountered an issue during the call. Customer conversation context may be incomplete."
-            elif transcription_segments:
-                # Create rich context with timestamps and speakers
-                conversation_context = f"Call transcription with {len(transcription_segments)} segments:\n"
-                for segment in transcription_segments[-10:]:  # Last 10 segments for context
-                    speaker = segment.get('speaker', 'unknown')
-                    text = segment.get('text', '').strip()
-                    timestamp = segment.get('timestamp', 'unknown')
-                    if text:
-                        conversation_context += f"[{timestamp}] {speaker}: {text}\n"
-
-                # Add summary if available
-                if transcription_summary:
-                    conversation_context += f"\nSummary: {transcription_summary}"
-
-                logger.info(f"📝 Using detailed transcription context: {len(transcription_segments)} segments")
-            elif transcription_summary:
-                conversation_context = transcription_summary
-                logger.info(f"📝 Using transcription summary: {transcription_summary[:100]}...")
+            # Rolling summary kept up to date while the call was transcribed: no LLM call on the transfer path
+            rolling_summary = room_summarizer.latest(request.original_room_name)
+            if rolling_summary:
+                summary = rolling_summary["summary"]
+                logger.info(f"📝 Using rolling summary of {rolling_summary['segments']} segments: {summary[:100]}...")
             else:
-                if transcription_active:
-                    conversation_context = "Transcription service failed to capture conversation. Please ask the customer to repeat key details."
-                    logger.error(f"❌ Transcription active but no data captured for room {request.original_room_name}")
+                # Error handling for transcription failures
+                if transcription_active and not transcription_segments:
+                    logger.warning(f"⚠️  Transcription was active for room {request.original_room_name} but no segments found - possible transcription failure")
+                    conversation_context = "Transcription service encountered an issue during the call. Customer conversation context may be incomplete."
+                elif transcription_segments:
+                    # Create rich context with timestamps and speakers
+                    conversation_context = f"Call transcription with {len(transcription_segments)} segments:\n"
+                    for segment in transcription_segments[-10:]:  # Last 10 segments for context
+                        speaker = segment.get('speaker', 'unknown')
+                        text = segment.get('text', '').strip()
+                        timestamp = segment.get('timestamp', 'unknown')
+                        if text:
+                            conversation_context += f"[{timestamp}] {speaker}: {text}\n"
+
+                    # Add summary if available
+                    if transcription_summary:
+                        conversation_context += f"\nSummary: {transcription_summary}"
+
+                    logger.info(f"📝 Using detailed transcription context: {len(transcription_segments)} segments")
+                elif transcription_summary:
+                    conversation_context = transcription_summary
+                    logger.info(f"📝 Using transcription summary: {transcription_summary[:100]}...")
                 else:
-                    conversation_context = "Customer conversation context not available - transcription was not started for this call"
-                    logger.info("📝 No transcription data available, using fallback context")
-
-            summary = generate_call_summary(
-                conversation_context,
-                request.caller_type,
-                caller_context
-            )
-            logger.info(f"📝 Generated fallback summary: {summary[:100]}...")
+                    if transcription_active:
+                        conversation_context = "Transcription service failed to capture conversation. Please ask the customer to repeat key details."
+                        logger.error(f"❌ Transcription active but no data captured for room {request.original_room_name}")
+                    else:
+                        conversation_context = "Customer conversation context not available - transcription was not started for this call"
+                        logger.info("📝 No transcription data available, using fallback context")
+
+                summary = await generate_call_summary(
+                    conversation_context,
+                    request.caller_type,
+                    caller_context
+                )
+                logger.info(f"📝 Generated fallback summary: {summary[:100]}...")
 
         # Use the ORIGINAL room for transfer - no need to create a new room
         # Agent A and caller stay in original room, Agent B joins them
@@ -366,9 +543,18 @@ async def initiate_transfer(request: TransferInitiateRequest):
         }
         pending_transfers['agent_b'] = transfer_data
 
+        # Agent B joins the original room; everyone in it follows the transfer
+        await notification_bus.join([agent_topic("agent_b")], room_topic(request.original_room_name))
+        await notification_bus.join([room_topic(request.original_room_name)], transfer_topic(transfer_room_name))
+
         # No need for room switch notifications - everyone stays in the original room
-        # Just broadcast that transfer is ready for Agent B
-        await broadcast_websocket_message({
+        # Just tell the room, both agents and transfer subscribers that Agent B can join
+        await publish_notification([
+            room_topic(request.original_room_name),
+            transfer_topic(transfer_room_name),
+            agent_topic(request.agent_a_id),
+            agent_topic("agent_b")
+        ], {
             "type": "transfer_ready",
             "original_room": request.original_room_name,
             "transfer_room": transfer_room_name,
@@ -438,14 +624,17 @@ async def twilio_status_callback(request: dict):
     if call_sid and call_status:
         await handle_call_status_callback(call_sid, call_status, room_name)
 
-        # Broadcast status update via WebSocket
+        # Notify the call's transfer and room subscribers via WebSocket
         message = {
             "type": "twilio_call_status",
             "call_sid": call_sid,
             "status": call_status,
             "room_name": room_name
         }
-        await broadcast_websocket_message(message)
+        topics = [transfer_topic(call_sid)]
+        if room_name:
+            topics.append(room_topic(room_name))
+        await publish_notification(topics, message)
 
     return {"status": "ok"}
 
@@ -463,21 +652,28 @@ async def get_caller_context_endpoint(request: CallerContextRequest):
 
 # Queue Management Endpoints
 @app.post("/api/queue/status", response_model=QueueStatusResponse)
-async def get_queue_status(request: QueueStatusRequest):
-    """Get customer's current queue status"""
+async def get_queue_status(request: QueueStatusRequest, http_response: Response, if_none_match: Optional[str] = Header(None)):
+    """Get customer's current queue status.
+
+    Cheap fallback to the WebSocket `queue_position` push: clients that send back the
+    last `version` they saw for themselves (or its ETag via If-None-Match) get a bare
+    304 while their position and ETA are unchanged.
+    """
     try:
-        status = queue_manager.get_customer_status(request.email)
+        # Even a 304 poll proves the customer is still waiting
+        presence_tracker.seen(request.email)
+        status = await async_queue_manager.get_customer_status(request.email)
         if status is None:
-            # If this customer was already assigned via WebSocket flow, return token immediately
-            if request.email in assigned_customers:
-                info = assigned_customers.pop(request.email)
+            # Already assigned in the background: the room the customer's socket was told about
+            assignment = await find_assignment(request.email)
+            if assignment:
                 return QueueStatusResponse(
                     position=0,
                     estimated_wait_time=0,
-                    total_waiting=queue_manager.get_queue_length(),
-                    agents_available=queue_manager.get_available_agents_count(),
-                    access_token=info.get("customer_token", ""),
-                    room_name=info.get("room_name", "support_room")
+                    total_waiting=await async_queue_manager.get_queue_length(),
+                    agents_available=await async_queue_manager.get_available_agents_count(),
+                    access_token=assignment["customer_token"],
+                    room_name=assignment["room_name"]
                 )
             raise HTTPException(status_code=404, detail="Customer not found in queue")
 
@@ -486,111 +682,91 @@ async def get_queue_status(request: QueueStatusRequest):
         total_waiting = status["total_waiting"]
         agents_available = status["agents_available"]
 
-        # If this customer was already assigned via WebSocket flow, return token immediately
-        if request.email in assigned_customers:
-            info = assigned_customers.pop(request.email)
-            return QueueStatusResponse(
-                position=0,
-                estimated_wait_time=0,
-                total_waiting=queue_manager.get_queue_length(),
-                agents_available=queue_manager.get_available_agents_count(),
-                access_token=info.get("customer_token", ""),
-                room_name=info.get("room_name", "support_room")
-            )
-
-        # If position is 1 and agents available, connect immediately
-        access_token = ""
-        room_name = "support_room"  # default
-        if position == 1 and agents_available > 0:
-            # Select agent (demo: agent_a)
-            selected_agent = "agent_a"
-            # Try to assign agent_a to this customer
-            next_customer = queue_manager.try_assign_agent_to_customer(request.email, selected_agent)
+        # If this customer is next to be routed and a skilled agent is free, connect immediately
+        if agents_available > 0:
+            # Routing engine picks the longest-idle agent skilled for this caller type
+            next_customer = await async_queue_manager.try_assign_agent_to_customer(request.email)
             if next_customer:
-                # Create dynamic room
-                room_name = f"support_{selected_agent}_{next_customer['email'].replace('@', '_').replace('.', '_')}"
-                await create_room(room_name)
-
-                # Generate customer token
-                access_token = create_room_token(room_name, f"customer_{next_customer['email']}")
-
-                # Broadcast to agent
-                agent_token = create_room_token(room_name, f"agent_{selected_agent}")
-                agent_notification = {
-                    "type": "customer_assigned",
-                    "agent_id": selected_agent,
-                    "customer_email": next_customer['email'],
-                    "room_name": room_name,
-                    "agent_token": agent_token
-                }
-                await send_to_agent(selected_agent, agent_notification)
-
-                logger.info(f"Queue connect: assigned {request.email} to {selected_agent} in {room_name}")
-
-                # Store assignment for HTTP fallback to the specific customer
-                assigned_customers[next_customer['email']] = {
-                    "room_name": room_name,
-                    "customer_token": access_token
-                }
-
-                # Update position to 0 (connected)
-                position = 0
-                estimated_wait = 0
+                # The token goes back in this response, so no customer push is needed
+                connection = await connect_or_release(next_customer, notify_customer=False)
+                return QueueStatusResponse(
+                    position=0,
+                    estimated_wait_time=0,
+                    total_waiting=total_waiting,
+                    agents_available=agents_available,
+                    access_token=connection["customer_token"],
+                    room_name=connection["room_name"]
+                )
 
+        version = position_version(position, estimated_wait)
+        etag = f'"{version}"'
+        if request.since_version == version or if_none_match == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        http_response.headers["ETag"] = etag
         return QueueStatusResponse(
             position=position,
             estimated_wait_time=estimated_wait,
             total_waiting=total_waiting,
             agents_available=agents_available,
-            access_token=access_token if position == 0 else "",
-            room_name=room_name if position == 0 else "support_room"
+            access_token="",
+            room_name="support_room",
+            version=version
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get queue status: {str(e)}")
 
+@app.post("/api/queue/status/batch", response_model=BatchQueueStatusResponse)
+async def get_queue_status_batch(request: BatchQueueStatusRequest):
+    """Positions and ETAs for many customers at once (wallboards), from one consistent snapshot.
+
+    Read-only: unlike /api/queue/status it never assigns agents or counts as a customer poll.
+    """
+    try:
+        version = async_queue_manager.version
+        snapshot = await async_queue_manager.get_customer_statuses(request.emails)
+        return BatchQueueStatusResponse(version=version, **snapshot)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get queue status: {str(e)}")
+
+@app.post("/api/queue/enqueue/batch", response_model=BatchQueueStatusResponse)
+async def enqueue_batch(request: BatchEnqueueRequest):
+    """Add many customers to the queue in one call (load generators, imports)"""
+    try:
+        snapshot = await async_queue_manager.add_customers(
+            (customer.email, customer.caller_type) for customer in request.customers
+        )
+        for customer in request.customers:
+            presence_tracker.seen(customer.email)
+        logger.info(f"Batch enqueued {len(request.customers)} customers")
+        return BatchQueueStatusResponse(version=async_queue_manager.version, **snapshot)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to enqueue customers: {str(e)}")
+
+@app.get("/api/queue/handle-time")
+async def get_handle_time_stats():
+    """Observed call handle times per caller type (mean, p50, p90, samples) behind the queue ETAs"""
+    return async_queue_manager.get_handle_time_stats()
+
 @app.post("/api/agent/availability", response_model=AgentAvailabilityResponse)
 async def update_agent_availability(request: AgentAvailabilityRequest):
     """Update agent availability status"""
     try:
-        queue_manager.set_agent_status(request.agent_id, request.status)
+        if request.skills is not None:
+            await async_queue_manager.register_agent(request.agent_id, request.skills)
+        await async_queue_manager.set_agent_status(request.agent_id, request.status)
 
         # If agent becomes available, try to connect them with next customer
         if request.status == "available":
-            next_customer = queue_manager.try_assign_customer(request.agent_id)
+            next_customer = await async_queue_manager.try_assign_customer(request.agent_id)
             if next_customer:
                 logger.info(f"Agent {request.agent_id} available, popping customer {next_customer['email']}")
-                # Create room for this customer-agent pair
-                room_name = f"support_{request.agent_id}_{next_customer['email'].replace('@', '_').replace('.', '_')}"
-                await create_room(room_name)
-
-                # Generate tokens
-                agent_token = create_room_token(room_name, f"agent_{request.agent_id}")
-                customer_token = create_room_token(room_name, f"customer_{next_customer['email']}")
-
-                # Targeted notify agent for auto-join
-                notification = {
-                    "type": "customer_assigned",
-                    "agent_id": request.agent_id,
-                    "customer_email": next_customer['email'],
-                    "room_name": room_name,
-                    "agent_token": agent_token
-                }
-                await send_to_agent(request.agent_id, notification)
-
-                # Notify customer with token directly
-                customer_notification = {
-                    "type": "agent_assigned",
-                    "email": next_customer['email'],
-                    "room_name": room_name,
-                    "customer_token": customer_token
-                }
-                await send_to_customer(next_customer['email'], customer_notification)
+                connection = await connect_or_release(next_customer)
 
                 return AgentAvailabilityResponse(
                     success=True,
-                    message=f"Connected to customer {next_customer['email']} in room {room_name}"
+                    message=f"Connected to customer {next_customer['email']} in room {connection['room_name']}"
                 )
 
         return AgentAvailabilityResponse(
@@ -605,10 +781,10 @@ async def pick_next_customer(request: PickNextCustomerRequest):
     """Agent picks next customer from queue"""
     try:
         # Check if agent is available and pop next customer in a unified step
-        next_customer = queue_manager.try_assign_customer(request.agent_id)
+        next_customer = await async_queue_manager.try_assign_customer(request.agent_id)
         if not next_customer:
             # Check status to return specific error message
-            agent_status = queue_manager.get_agent_status(request.agent_id)
+            agent_status = await async_queue_manager.get_agent_status(request.agent_id)
             if not agent_status or agent_status.get("status") != "available":
                 return PickNextCustomerResponse(
                     success=False,
@@ -619,39 +795,14 @@ async def pick_next_customer(request: PickNextCustomerRequest):
                 message="No customers in queue"
             )
 
-        # Create room for this customer-agent pair
-        room_name = f"support_{request.agent_id}_{next_customer['email'].replace('@', '_').replace('.', '_')}"
-        await create_room(room_name)
-        logger.info(f"Pick-next for {request.agent_id}: customer {next_customer['email']}, room: {room_name}")
-
-        # Generate tokens
-        agent_token = create_room_token(room_name, f"agent_{request.agent_id}")
-        customer_token = create_room_token(room_name, f"customer_{next_customer['email']}")
-
-        # Targeted notify agent for auto-join
-        notification = {
-            "type": "customer_assigned",
-            "agent_id": request.agent_id,
-            "customer_email": next_customer['email'],
-            "room_name": room_name,
-            "agent_token": agent_token
-        }
-        await send_to_agent(request.agent_id, notification)
-
-        # Notify customer with token directly
-        customer_notification = {
-            "type": "agent_assigned",
-            "email": next_customer['email'],
-            "room_name": room_name,
-            "customer_token": customer_token
-        }
-        await send_to_customer(next_customer['email'], customer_notification)
+        logger.info(f"Pick-next for {request.agent_id}: customer {next_customer['email']}")
+        connection = await connect_or_release(next_customer)
 
         return PickNextCustomerResponse(
             success=True,
             customer=next_customer,
-            room_name=room_name,
-            access_token=agent_token,
+            room_name=connection["room_name"],
+            access_token=connection["agent_token"],
             message=f"Connected to customer {next_customer['email']}"
         )
     except Exception as e:
@@ -674,7 +825,7 @@ async def chat_endpoint(request: ChatRequest):
                 })
         
         # Generate AI response
-        ai_response = generate_ai_response(
+        ai_response = await generate_ai_response(
             user_message=request.message,
             caller_type=request.caller_type,
             caller_context=caller_context,
@@ -699,6 +850,29 @@ async def chat_endpoint(request: ChatRequest):
             error=str(e)
         )
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Stream the AI response as server-sent events: `chunk` events as tokens arrive, then one `done` event"""
+    caller_context = get_caller_context(request.email, request.caller_type)
+    conversation_history = [
+        {"role": msg.role, "content": msg.content}
+        for msg in request.conversation_history or []
+    ]
+
+    async def events():
+        parts = []
+        async for chunk in stream_ai_response(request.message, request.caller_type, caller_context, conversation_history):
+            parts.append(chunk)
+            yield f"data: {encode_frame({'type': 'chunk', 'content': chunk})}\n\n"
+        yield f"data: {encode_frame({'type': 'done', 'response': ''.join(parts).strip()})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/transcribe", response_model=TranscribeResponse)
 async def transcribe_endpoint(request: TranscribeRequest):
     """Transcribe audio and generate AI response"""
@@ -717,7 +891,7 @@ async def transcribe_endpoint(request: TranscribeRequest):
         caller_context = get_caller_context(request.email, request.caller_type)
         
         # Generate AI response
-        ai_response = generate_ai_response(
+        ai_response = await generate_ai_response(
             user_message=transcript,
             caller_type=request.caller_type,
             caller_context=caller_context
@@ -760,14 +934,18 @@ async def complete_transfer(request: TransferCompleteRequest):
             # For now, we'll delete it after a delay or based on logic
             pass  # Keep room for now
 
-        # Broadcast transfer completion notification
+        # Notify both rooms and Agent A that the transfer completed
         notification = {
             "type": "transfer_completed",
             "original_room": request.original_room_name,
             "transfer_room": transfer_room_name,
             "agent_a": request.agent_a_id
         }
-        await broadcast_websocket_message(notification)
+        await publish_notification([
+            room_topic(request.original_room_name),
+            room_topic(transfer_room_name),
+            agent_topic(request.agent_a_id)
+        ], notification)
 
         return TransferCompleteResponse(status="success")
     except Exception as e:
@@ -783,7 +961,7 @@ async def generate_call_summary_endpoint(request: dict):
         caller_info = request.get("caller_info", {})
 
         # Generate AI summary using Groq
-        summary = generate_call_summary(
+        summary = await generate_call_summary(
             conversation_context,
             caller_type,
             caller_info
@@ -801,6 +979,11 @@ async def generate_call_summary_endpoint(request: dict):
             "error": str(e)
         }
 
+@app.get("/api/summary/cache")
+async def get_summary_cache_stats():
+    """Hit/miss counters and size of the call summary cache"""
+    return summary_cache.stats()
+
 @app.post("/api/chat/summarize")
 async def summarize_chat_history(request: dict):
     """Generate AI summary from chat history for warm transfer"""
@@ -820,7 +1003,7 @@ async def summarize_chat_history(request: dict):
             }
         
         # Generate AI summary using the existing function
-        summary = generate_call_summary(
+        summary = await generate_call_summary(
             conversation_text,
             "investor",  # Default to investor for now
             {"conversation_length": message_count}
@@ -931,7 +1114,10 @@ async def twilio_transfer_endpoint(request: dict):
             )
             
             if result["success"]:
-                # Broadcast enhanced transfer notification
+                # The room's participants follow the transfer room and the phone call
+                await notification_bus.join([room_topic(room_name)], room_topic(result["transfer_room_name"]))
+                await notification_bus.join([room_topic(room_name)], transfer_topic(result["call_sid"]))
+                # Notify the rooms, Agent A and the call's transfer subscribers
                 notification = {
                     "type": "enhanced_phone_transfer_initiated",
                     "transfer_room_name": result["transfer_room_name"],
@@ -941,7 +1127,12 @@ async def twilio_transfer_endpoint(request: dict):
                     "moved_participants": result.get("moved_participants", []),
                     "status": result["status"]
                 }
-                await broadcast_websocket_message(notification)
+                await publish_notification([
+                    room_topic(room_name),
+                    room_topic(result["transfer_room_name"]),
+                    agent_topic(agent_a_id),
+                    transfer_topic(result["call_sid"])
+                ], notification)
                 
                 return {
                     "success": True,
@@ -958,8 +1149,9 @@ async def twilio_transfer_endpoint(request: dict):
             # Use basic Twilio calling
             twilio_call_sid = await initiate_warm_transfer_call(target_phone, room_name, summary)
             call_details = await get_call_status(twilio_call_sid)
+            await notification_bus.join([room_topic(room_name)], transfer_topic(twilio_call_sid))
 
-            # Broadcast basic transfer notification
+            # Notify the room, Agent A and the call's transfer subscribers
             notification = {
                 "type": "twilio_transfer_initiated",
                 "call_sid": twilio_call_sid,
@@ -969,7 +1161,11 @@ async def twilio_transfer_endpoint(request: dict):
                 "method": "basic",
                 "status": call_details.get("status")
             }
-            await broadcast_websocket_message(notification)
+            await publish_notification([
+                room_topic(room_name),
+                agent_topic(agent_a_id),
+                transfer_topic(twilio_call_sid)
+            ], notification)
 
             return {
                 "success": True,
@@ -1025,6 +1221,7 @@ async def cleanup_room(request: dict):
         if len(participants) == 0:
             # Room is empty, delete it
             success = await delete_room(room_name)
+            await room_summarizer.forget(room_name)
             return {"success": success, "message": f"Room {room_name} deleted"}
         else:
             return {"success": True, "message": f"Room {room_name} has {len(participants)} participants, not deleted"}
@@ -1098,24 +1295,28 @@ async def get_transfer_history(agent_id: str = None, limit: int = 20):
 async def start_transcription(request: StartTranscriptionRequest):
     """Start real-time transcription for a room"""
     try:
+        # Rolling summary worker for the room; segments for rooms not started are dropped
+        room_summarizer.start_room(request.room_name)
         if is_room_transcription_active(request.room_name):
             return StartTranscriptionResponse(
                 success=True,
                 message="Transcription already active for this room"
             )
 
-        success = await start_room_transcription(request.room_name)
+        success = await start_room_transcription(request.room_name, room_summarizer.on_segment)
         if success:
             return StartTranscriptionResponse(
                 success=True,
                 message=f"Transcription started for room {request.room_name}"
             )
         else:
+            await room_summarizer.stop_room(request.room_name)
             return StartTranscriptionResponse(
                 success=False,
                 message="Failed to start transcription"
             )
     except Exception as e:
+        await room_summarizer.stop_room(request.room_name)
         return StartTranscriptionResponse(
             success=False,
             message=f"Failed to start transcription: {str(e)}"
@@ -1126,6 +1327,7 @@ async def stop_transcription(request: StopTranscriptionRequest):
     """Stop real-time transcription for a room"""
     try:
         success = await stop_room_transcription(request.room_name)
+        await room_summarizer.stop_room(request.room_name)
         if success:
             return StopTranscriptionResponse(
                 success=True,
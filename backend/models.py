@@ -1,11 +1,14 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
+# Caller types the queue routes (routing_engine.CALLER_TYPE_PRIORITY); anything else is rejected with a 422
+CallerType = Literal["investor", "prospect"]
+
 class CreateRoomRequest(BaseModel):
     room_name: str
     participant_identity: str
-    caller_type: str = "investor"  # "investor" or "prospect"
+    caller_type: CallerType = "investor"
     email: str
 
 class CreateRoomResponse(BaseModel):
@@ -92,6 +95,7 @@ class AgentStatus(BaseModel):
 
 class QueueStatusRequest(BaseModel):
     email: str
+    since_version: Optional[int] = None  # last seen `version` (response or queue_position push); unchanged returns 304
 
 class QueueStatusResponse(BaseModel):
     position: int
@@ -100,10 +104,32 @@ class QueueStatusResponse(BaseModel):
     agents_available: int
     access_token: Optional[str] = None
     room_name: Optional[str] = None
+    version: Optional[int] = None  # this customer's position/ETA version, echo back as since_version / If-None-Match
+
+class BatchQueueStatusRequest(BaseModel):
+    emails: List[str]
+
+class BatchEnqueueCustomer(BaseModel):
+    email: str
+    caller_type: CallerType = "investor"
+
+class BatchEnqueueRequest(BaseModel):
+    customers: List[BatchEnqueueCustomer]
+
+class CustomerQueuePosition(BaseModel):
+    position: int
+    estimated_wait_time: int  # in seconds
+
+class BatchQueueStatusResponse(BaseModel):
+    customers: Dict[str, Optional[CustomerQueuePosition]]  # None when the customer is not waiting
+    total_waiting: int
+    agents_available: int
+    version: int
 
 class AgentAvailabilityRequest(BaseModel):
     agent_id: str
     status: str  # "available", "busy", "offline"
+    skills: Optional[List[str]] = None  # caller types this agent takes, e.g. ["investor"]; "*" for any
 
 class AgentAvailabilityResponse(BaseModel):
     success: bool
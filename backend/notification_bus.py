@@ -0,0 +1,376 @@
+import asyncio
+import glob
+import logging
+import os
+import socket
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import orjson
+
+from websocket_hub import ConnectionHub, encode_frame
+
+logger = logging.getLogger(__name__)
+
+# Envelope ops exchanged between workers
+PUBLISH = "publish"   # deliver an encoded frame to the local subscribers of `topics`
+JOIN = "join"         # subscribe the local subscribers of `topics` to `topic`
+CLAIM = "claim"       # the sender now has local subscribers for `topics`
+RELEASE = "release"   # the sender no longer has local subscribers for `topics`
+HELLO = "hello"       # the sender just started; reply with your claims
+BYE = "bye"           # the sender is shutting down; forget its claims
+
+
+class NotificationBus(ABC):
+    """
+    Routes notifications to the worker process that holds the target sockets.
+
+    Every uvicorn worker has its own ConnectionHub. Publishing through the
+    bus delivers to the local subscribers directly and forwards the message,
+    encoded once, only to the other workers that have a subscriber for one
+    of its topics.
+    """
+    def __init__(self, hub: ConnectionHub):
+        self.hub = hub
+
+    async def start(self) -> None:
+        """Connect to the other workers; call from app startup."""
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def publish(self, topics: Iterable[str], message: Any) -> None:
+        """Send `message` to every subscriber of any of `topics`, whichever worker holds it."""
+        pass
+
+    @abstractmethod
+    async def join(self, topics: Iterable[str], topic: str) -> None:
+        """Subscribe every subscriber of any of `topics`, on any worker, to `topic`."""
+        pass
+
+    def _apply(self, envelope: Dict[str, Any]) -> None:
+        """Run a PUBLISH or JOIN forwarded by another worker against the local hub."""
+        op = envelope.get("op")
+        if op == PUBLISH:
+            self.hub.publish_frame(envelope["topics"], envelope["frame"])
+        elif op == JOIN:
+            self.hub.join(envelope["topics"], envelope["topic"])
+
+
+class InProcessNotificationBus(NotificationBus):
+    """Single worker: every socket is local, so the bus is just the hub."""
+
+    async def publish(self, topics: Iterable[str], message: Any) -> None:
+        self.hub.publish(topics, message)
+
+    async def join(self, topics: Iterable[str], topic: str) -> None:
+        self.hub.join(topics, topic)
+
+
+class UnixSocketNotificationBus(NotificationBus):
+    """
+    Bus between the workers on one host over Unix datagram sockets.
+
+    Each worker binds `<directory>/worker-<id>.sock` (the pid by default)
+    and tells the others (CLAIM/RELEASE) whenever a topic gets its first or
+    loses its last local subscriber, so every worker keeps a topic -> owners
+    map and sends a message only to the workers that own one of its topics. A starting
+    worker says HELLO and the others answer with their current claims.
+    Local datagrams are never reordered; a peer whose socket has gone away
+    is forgotten on the first failed send.
+    """
+    _RECV_SIZE = 1 << 18
+    # Topics per CLAIM datagram, to stay well below the socket buffer size
+    _CLAIM_BATCH = 500
+
+    def __init__(self, hub: ConnectionHub, directory: str, worker_id: Optional[str] = None):
+        super().__init__(hub)
+        self._directory = directory
+        self._path = os.path.join(directory, f"worker-{worker_id or os.getpid()}.sock")
+        self._sock: Optional[socket.socket] = None
+        self._peers: Set[str] = set()
+        # topic -> peer socket paths, and the reverse for forgetting a peer
+        self._owners: Dict[str, Set[str]] = {}
+        self._claims: Dict[str, Set[str]] = {}
+        hub.add_topic_listener(self._on_topic_change)
+
+    async def start(self) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+        try:
+            os.unlink(self._path)  # left behind by a previous process with our pid
+        except FileNotFoundError:
+            pass
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sock.bind(self._path)
+        sock.setblocking(False)
+        self._sock = sock
+        asyncio.get_running_loop().add_reader(sock.fileno(), self._on_readable)
+        pattern = os.path.join(self._directory, "worker-*.sock")
+        self._peers = {path for path in glob.glob(pattern) if path != self._path}
+        self._broadcast({"op": HELLO})
+        logger.info(f"Notification bus listening on {self._path} ({len(self._peers)} peers)")
+
+    async def stop(self) -> None:
+        if self._sock is None:
+            return
+        self._broadcast({"op": BYE})
+        asyncio.get_running_loop().remove_reader(self._sock.fileno())
+        self._sock.close()
+        self._sock = None
+        try:
+            os.unlink(self._path)
+        except FileNotFoundError:
+            pass
+
+    async def publish(self, topics: Iterable[str], message: Any) -> None:
+        topics = list(topics)
+        peers = self._owners_of(topics)
+        if not peers:
+            self.hub.publish(topics, message)
+            return
+        frame = encode_frame(message)
+        self.hub.publish_frame(topics, frame)
+        self._send_to(peers, {"op": PUBLISH, "topics": topics, "frame": frame})
+
+    async def join(self, topics: Iterable[str], topic: str) -> None:
+        topics = list(topics)
+        self.hub.join(topics, topic)
+        self._send_to(self._owners_of(topics), {"op": JOIN, "topics": topics, "topic": topic})
+
+    def _owners_of(self, topics: List[str]) -> Set[str]:
+        peers: Set[str] = set()
+        for topic in topics:
+            owners = self._owners.get(topic)
+            if owners:
+                peers.update(owners)
+        return peers
+
+    def _on_topic_change(self, topic: str, active: bool) -> None:
+        if self._sock is not None:
+            self._broadcast({"op": CLAIM if active else RELEASE, "topics": [topic]})
+
+    def _broadcast(self, envelope: Dict[str, Any]) -> None:
+        self._send_to(set(self._peers), envelope)
+
+    def _send_to(self, peers: Iterable[str], envelope: Dict[str, Any]) -> None:
+        if self._sock is None:
+            return
+        data = orjson.dumps(envelope)
+        for peer in list(peers):
+            try:
+                self._sock.sendto(data, peer)
+            except (FileNotFoundError, ConnectionRefusedError):
+                self._forget(peer)
+            except BlockingIOError:
+                logger.warning(f"Notification bus peer {peer} is not keeping up; dropped a {envelope['op']} message")
+            except OSError as e:
+                logger.error(f"Notification bus send to {peer} failed: {e}")
+
+    def _send_claims(self, peer: str) -> None:
+        topics = self.hub.topics()
+        for start in range(0, len(topics), self._CLAIM_BATCH):
+            self._send_to([peer], {"op": CLAIM, "topics": topics[start:start + self._CLAIM_BATCH]})
+
+    def _forget(self, peer: str) -> None:
+        self._peers.discard(peer)
+        for topic in self._claims.pop(peer, ()):
+            owners = self._owners.get(topic)
+            if owners is not None:
+                owners.discard(peer)
+                if not owners:
+                    del self._owners[topic]
+
+    def _on_readable(self) -> None:
+        while self._sock is not None:
+            try:
+                data, peer = self._sock.recvfrom(self._RECV_SIZE)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                logger.error(f"Notification bus receive failed: {e}")
+                return
+            try:
+                self._handle(peer, orjson.loads(data))
+            except Exception as e:
+                logger.error(f"Bad notification bus message from {peer}: {e}")
+
+    def _handle(self, peer: str, envelope: Dict[str, Any]) -> None:
+        op = envelope.get("op")
+        if op == BYE:
+            self._forget(peer)
+            return
+        self._peers.add(peer)
+        if op == HELLO:
+            self._send_claims(peer)
+        elif op == CLAIM:
+            claims = self._claims.setdefault(peer, set())
+            for topic in envelope["topics"]:
+                self._owners.setdefault(topic, set()).add(peer)
+                claims.add(topic)
+        elif op == RELEASE:
+            claims = self._claims.get(peer, set())
+            for topic in envelope["topics"]:
+                claims.discard(topic)
+                owners = self._owners.get(topic)
+                if owners is not None:
+                    owners.discard(peer)
+                    if not owners:
+                        del self._owners[topic]
+        else:
+            self._apply(envelope)
+
+
+class RedisNotificationBus(NotificationBus):
+    """
+    Bus over Redis pub/sub, for workers spread across hosts.
+
+    Each worker listens on its own channel. Topic ownership lives in Redis as
+    one set of worker ids per topic, updated (in order, off the request path)
+    when a topic gets its first or loses its last local subscriber. Publishing
+    reads the owners of the message's topics in one pipelined round trip and
+    PUBLISHes the envelope to those workers' channels only. A worker that
+    died without cleaning up is pruned from a topic the first time a PUBLISH
+    to it reaches no listener.
+    """
+    def __init__(self, hub: ConnectionHub, redis_url: str = "redis://localhost:6379/0",
+                 key_prefix: str = "warm_transfer", client: Any = None, worker_id: Optional[str] = None):
+        super().__init__(hub)
+        # `client` lets tests pass a fakeredis instance instead of a pooled connection
+        if client is None:
+            try:
+                import redis.asyncio as redis_asyncio
+            except ImportError as e:
+                raise RuntimeError("RedisNotificationBus requires the 'redis' package") from e
+            client = redis_asyncio.from_url(redis_url, decode_responses=True)
+        self._redis = client
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._owners_prefix = f"{key_prefix}:notify:owners:"
+        self._channel_prefix = f"{key_prefix}:notify:worker:"
+        self._ownership_changes: asyncio.Queue = asyncio.Queue()
+        self._pubsub = None
+        self._tasks: List[asyncio.Task] = []
+        hub.add_topic_listener(self._on_topic_change)
+
+    async def start(self) -> None:
+        self._pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self._channel_prefix + self.worker_id)
+        # Topics subscribed before start() still need to be claimed
+        for topic in self.hub.topics():
+            self._ownership_changes.put_nowait((topic, True))
+        self._tasks = [
+            asyncio.ensure_future(self._listen()),
+            asyncio.ensure_future(self._sync_ownership()),
+        ]
+        logger.info(f"Notification bus joined Redis as {self.worker_id}")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        topics = self.hub.topics()
+        if topics:
+            pipe = self._redis.pipeline(transaction=False)
+            for topic in topics:
+                pipe.srem(self._owners_prefix + topic, self.worker_id)
+            await pipe.execute()
+        if self._pubsub is not None:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.close()
+            self._pubsub = None
+
+    async def publish(self, topics: Iterable[str], message: Any) -> None:
+        topics = list(topics)
+        owners = await self._owners_of(topics)
+        if not owners:
+            self.hub.publish(topics, message)
+            return
+        frame = encode_frame(message)
+        self.hub.publish_frame(topics, frame)
+        await self._send_to(owners, topics, {"op": PUBLISH, "topics": topics, "frame": frame})
+
+    async def join(self, topics: Iterable[str], topic: str) -> None:
+        topics = list(topics)
+        self.hub.join(topics, topic)
+        owners = await self._owners_of(topics)
+        if owners:
+            await self._send_to(owners, topics, {"op": JOIN, "topics": topics, "topic": topic})
+
+    async def _owners_of(self, topics: List[str]) -> Set[str]:
+        pipe = self._redis.pipeline(transaction=False)
+        for topic in topics:
+            pipe.smembers(self._owners_prefix + topic)
+        owners: Set[str] = set()
+        for members in await pipe.execute():
+            owners.update(members)
+        owners.discard(self.worker_id)
+        return owners
+
+    async def _send_to(self, owners: Set[str], topics: List[str], envelope: Dict[str, Any]) -> None:
+        data = orjson.dumps(envelope)
+        workers = list(owners)
+        pipe = self._redis.pipeline(transaction=False)
+        for worker in workers:
+            pipe.publish(self._channel_prefix + worker, data)
+        receivers = await pipe.execute()
+        dead = [worker for worker, count in zip(workers, receivers) if not count]
+        if dead:
+            logger.info(f"Pruning {len(dead)} unreachable workers from notification topics")
+            pipe = self._redis.pipeline(transaction=False)
+            for topic in topics:
+                pipe.srem(self._owners_prefix + topic, *dead)
+            await pipe.execute()
+
+    def _on_topic_change(self, topic: str, active: bool) -> None:
+        self._ownership_changes.put_nowait((topic, active))
+
+    async def _sync_ownership(self) -> None:
+        while True:
+            changes = [await self._ownership_changes.get()]
+            while not self._ownership_changes.empty():
+                changes.append(self._ownership_changes.get_nowait())
+            pipe = self._redis.pipeline(transaction=False)
+            for topic, active in changes:
+                if active:
+                    pipe.sadd(self._owners_prefix + topic, self.worker_id)
+                else:
+                    pipe.srem(self._owners_prefix + topic, self.worker_id)
+            try:
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Failed to update notification topic owners: {e}")
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async for message in self._pubsub.listen():
+                    if message["type"] == "message":
+                        self._apply(orjson.loads(message["data"]))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification bus listener failed: {e}")
+                await asyncio.sleep(1)
+
+
+def create_notification_bus(hub: ConnectionHub) -> NotificationBus:
+    """
+    Bus selected by NOTIFICATION_BUS: "redis" (NOTIFICATION_BUS_REDIS_URL, or
+    QUEUE_REDIS_URL), "unix" (sockets in NOTIFICATION_BUS_DIR) or the default
+    in-process bus for a single worker.
+    """
+    backend = os.getenv("NOTIFICATION_BUS", "inprocess")
+    if backend == "redis":
+        redis_url = os.getenv("NOTIFICATION_BUS_REDIS_URL") or os.getenv("QUEUE_REDIS_URL", "redis://localhost:6379/0")
+        return RedisNotificationBus(hub, redis_url)
+    if backend == "unix":
+        return UnixSocketNotificationBus(hub, os.getenv("NOTIFICATION_BUS_DIR", "/tmp/warm_transfer_bus"))
+    if backend != "inprocess":
+        raise ValueError(f"Unknown NOTIFICATION_BUS: {backend}")
+    return InProcessNotificationBus(hub)
@@ -0,0 +1,183 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from bisect import bisect_right
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Journal event tags
+ENQUEUE = "e"        # ["e", email, caller_type, enqueued_at]
+REMOVE = "r"         # ["r", email]  (pops, assignments and removals alike)
+AGENT_STATUS = "a"   # ["a", agent_id, status, current_customer, updated_at]
+REQUEUE = "q"        # ["q", email, caller_type, enqueued_at]  (back in enqueued_at order)
+
+_SEGMENT_RE = re.compile(r"^(journal|snapshot)-(\d+)\.(log|bin)$")
+
+
+class QueueJournal:
+    """
+    Append-only journal plus periodic snapshots for the in-memory queue.
+
+    Events go to `journal-<gen>.log` as JSON lines. Every `snapshot_every`
+    events the journal rotates to generation gen+1 and a background thread
+    writes `snapshot-<gen+1>.bin` (zlib-compressed JSON of the full state at
+    the rotation point), then deletes older snapshots and journal segments.
+    Old files are only removed once the new snapshot is durably in place, so a
+    crash mid-compaction just replays from the previous snapshot.
+
+    Recovery loads the newest snapshot and replays the journal segments from
+    its generation onward, yielding a state dict:
+    {"customers": [[email, caller_type, enqueued_at], ...],
+     "agents": [[agent_id, status, current_customer, updated_at], ...]}
+    """
+    def __init__(self, directory: str, snapshot_every: int = 10_000, fsync: bool = False):
+        self._directory = directory
+        self._snapshot_every = snapshot_every
+        self._fsync = fsync
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._snapshot_source: Optional[Callable[[], Dict[str, Any]]] = None
+        os.makedirs(directory, exist_ok=True)
+        generations = self._generations("journal") + self._generations("snapshot")
+        self._generation = max(generations, default=0)
+        self._events_in_segment = 0
+        self._file = self._open_segment(self._generation)
+
+    # -----------------------------------------------------
+    # Files
+    # -----------------------------------------------------
+    def _path(self, kind: str, generation: int) -> str:
+        extension = "log" if kind == "journal" else "bin"
+        return os.path.join(self._directory, f"{kind}-{generation:012d}.{extension}")
+
+    def _generations(self, kind: str) -> List[int]:
+        generations = []
+        for name in os.listdir(self._directory):
+            match = _SEGMENT_RE.match(name)
+            if match and match.group(1) == kind:
+                generations.append(int(match.group(2)))
+        return sorted(generations)
+
+    def _open_segment(self, generation: int):
+        return open(self._path("journal", generation), "a", encoding="utf-8")
+
+    # -----------------------------------------------------
+    # Writing
+    # -----------------------------------------------------
+    def set_snapshot_source(self, source: Callable[[], Dict[str, Any]]) -> None:
+        """Callable returning the current full state; required for snapshots."""
+        self._snapshot_source = source
+
+    def record(self, *event: Any) -> None:
+        """Append one event. Triggers a rotation + background snapshot when due."""
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self._fsync:
+                os.fsync(self._file.fileno())
+            self._events_in_segment += 1
+            if self._events_in_segment >= self._snapshot_every:
+                self._rotate_locked()
+
+    def snapshot(self) -> None:
+        """Force a rotation and snapshot now (e.g. on shutdown)."""
+        with self._lock:
+            self._rotate_locked()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    def _rotate_locked(self) -> None:
+        if self._snapshot_source is None:
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return  # previous compaction still running; retry on a later event
+        # Capture state and switch segments atomically with respect to record()
+        state = self._snapshot_source()
+        self._file.close()
+        self._generation += 1
+        self._events_in_segment = 0
+        self._file = self._open_segment(self._generation)
+        self._compactor = threading.Thread(
+            target=self._write_snapshot, args=(self._generation, state),
+            name="queue-journal-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def _write_snapshot(self, generation: int, state: Dict[str, Any]) -> None:
+        try:
+            payload = zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"))
+            path = self._path("snapshot", generation)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            for kind in ("snapshot", "journal"):
+                for old in self._generations(kind):
+                    if old < generation:
+                        os.remove(self._path(kind, old))
+        except Exception as e:
+            logger.error(f"Queue journal compaction failed: {e}")
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+        with self._lock:
+            self._file.close()
+
+    # -----------------------------------------------------
+    # Recovery
+    # -----------------------------------------------------
+    def recover(self) -> Optional[Dict[str, Any]]:
+        """Rebuild state from the newest snapshot plus the journal tail; None if empty."""
+        snapshots = self._generations("snapshot")
+        start = snapshots[-1] if snapshots else 0
+        state = None
+        if snapshots:
+            with open(self._path("snapshot", start), "rb") as f:
+                state = json.loads(zlib.decompress(f.read()))
+
+        with self._lock:
+            self._file.flush()
+        events = []
+        for generation in self._generations("journal"):
+            if generation < start:
+                continue
+            with open(self._path("journal", generation), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # torn write at the tail of a crashed segment
+        if not events:
+            return state  # fresh snapshot (or nothing at all): no replay needed
+
+        # email -> [caller_type, enqueued_at]; dict order is queue order
+        customers: Dict[str, List[Any]] = {}
+        agents: Dict[str, List[Any]] = {}
+        if state is not None:
+            customers = {email: [caller_type, enqueued_at] for email, caller_type, enqueued_at in state["customers"]}
+            agents = {agent_id: rest for agent_id, *rest in state["agents"]}
+        for event in events:
+            tag = event[0]
+            if tag == ENQUEUE:
+                customers.setdefault(event[1], [event[2], event[3]])
+            elif tag == REMOVE:
+                customers.pop(event[1], None)
+            elif tag == REQUEUE and event[1] not in customers:
+                entries = list(customers.items())
+                index = bisect_right(entries, event[3], key=lambda entry: entry[1][1])
+                entries.insert(index, (event[1], [event[2], event[3]]))
+                customers = dict(entries)
+            elif tag == AGENT_STATUS:
+                agents[event[1]] = event[2:]
+        return {
+            "customers": [[email, caller_type, enqueued_at] for email, (caller_type, enqueued_at) in customers.items()],
+            "agents": [[agent_id, *rest] for agent_id, rest in agents.items()],
+        }
@@ -1,12 +1,46 @@
-from typing import Dict, List, Optional, Any
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
-from collections import deque
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from bisect import bisect_right
+from itertools import islice
+from operator import attrgetter
+from queue_journal import AGENT_STATUS, ENQUEUE, REMOVE, REQUEUE, QueueJournal
+from routing_engine import CALLER_TYPE_PRIORITY, RoutingEngine, ANY_SKILL
+from wait_time_estimator import HandleTimeEstimator
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------
 # Port: The Seam defining Queue operations
 # ---------------------------------------------------------
 class QueueAdapter(ABC):
+    # True when calls block on I/O (database, network) and should run off the event loop
+    blocking_io = False
+    # True when the adapter routes customers to agents itself, atomically in storage shared
+    # by every worker, instead of QueueManager's process-local RoutingEngine
+    routes_in_storage = False
+    # caller_type -> routing priority (lower is served first) that positions are ranked by.
+    # QueueManager builds its RoutingEngine from this, so reported positions match routing.
+    priorities: Dict[str, int] = CALLER_TYPE_PRIORITY
+
+    def _set_priorities(self, priorities: Optional[Dict[str, int]]) -> None:
+        if priorities is not None:
+            self.priorities = dict(priorities)
+        # Caller types missing from the map share the lowest priority, as in RoutingEngine
+        self._lowest_priority = max(self.priorities.values(), default=0) + 1
+
+    def _priority(self, caller_type: str) -> int:
+        return self.priorities.get(caller_type, self._lowest_priority)
+
     @abstractmethod
     def add_customer(self, email: str, caller_type: str) -> int:
         """Add customer to the queue and return new position."""
@@ -14,7 +48,12 @@ class QueueAdapter(ABC):
 
     @abstractmethod
     def get_customer_position(self, email: str) -> Optional[int]:
-        """Get customer's position in the queue (1-indexed)."""
+        """
+        Get customer's position in routing order (1-indexed): the number of waiting
+        customers with a higher-priority caller type, plus their rank among the
+        waiting customers of equal priority. This is the order an agent who can
+        take any caller type serves the queue in.
+        """
         pass
 
     @abstractmethod
@@ -22,6 +61,11 @@ class QueueAdapter(ABC):
         """Return the next customer in queue without removing them."""
         pass
 
+    @abstractmethod
+    def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        """Remove a customer from anywhere in the queue and return their entry."""
+        pass
+
     @abstractmethod
     def pop_next_customer(self) -> Optional[Dict[str, Any]]:
         """Remove and return the next customer in the queue."""
@@ -37,6 +81,11 @@ class QueueAdapter(ABC):
         """Return count of online agents that are available."""
         pass
 
+    @abstractmethod
+    def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        """Return ids of available agents, longest-idle first (at most `limit`)."""
+        pass
+
     @abstractmethod
     def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
         """Update status and current customer for an agent."""
@@ -47,28 +96,262 @@ class QueueAdapter(ABC):
         """Get current status info for an agent."""
         pass
 
+    @abstractmethod
+    def get_assigned_agent(self, email: str) -> Optional[str]:
+        """Id of the agent currently busy with `email`, or None."""
+        pass
+
+    @abstractmethod
+    def requeue_customer(self, customer: Dict[str, Any]) -> bool:
+        """
+        Undo an assignment that could not be connected: put `customer`, as returned by
+        an assign or route call, back where they were waiting. Returns False if they
+        are already waiting again. The agent's status is left to the caller.
+        """
+        pass
+
+    def add_customers(self, customers: Iterable[Tuple[str, str]]) -> List[int]:
+        """
+        Enqueue several (email, caller_type) pairs in order and return their positions.
+        Adapters override this to batch index updates or round trips.
+        """
+        return [self.add_customer(email, caller_type) for email, caller_type in customers]
+
+    @abstractmethod
+    def get_positions_snapshot(self, emails: Iterable[str]) -> Tuple[Dict[str, Optional[Tuple[int, str]]], int, int]:
+        """
+        (position, caller_type) of several customers, None for those not waiting,
+        plus (total_waiting, agents_available), all read from one consistent view
+        of the queue.
+        """
+        pass
+
+    def assign_customer(self, email: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Compare-and-swap assignment: only if the agent is still available, remove a
+        specific waiting customer and mark the agent busy with them. Returns None
+        when either side was already taken. This default is atomic as long as the
+        adapter is only touched from one thread; adapters backed by shared storage
+        override it to check and update in one transaction.
+        """
+        status_info = self.get_agent_status(agent_id)
+        if not status_info or status_info.get("status") != "available":
+            return None
+        customer = self.remove_customer(email)
+        if customer:
+            self.set_agent_status(agent_id, "busy", customer["email"])
+        return customer
+
+    def assign_next_customer(self, agent_id: str, caller_types: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Pop-and-assign: take the first waiting customer (restricted to `caller_types`
+        if given) and mark the agent busy with them.
+        """
+        head = self.peek_next_customer()
+        if not head or (caller_types is not None and head["caller_type"] not in caller_types):
+            return None
+        return self.assign_customer(head["email"], agent_id)
+
+    # Only used when `routes_in_storage` is True
+    def set_agent_skills(self, agent_id: str, skills: Iterable[str]) -> None:
+        """Store the skill tags routing matches an agent by."""
+        raise NotImplementedError
+
+    def route_next_customer(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Assign the highest-priority, longest-waiting customer the agent is skilled for."""
+        raise NotImplementedError
+
+    def route_customer(self, email: str, agent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Assign the customer if they are next in routing order for `agent_id` (default: the
+        longest-idle agent skilled for them). The agent is returned in "agent_id".
+        """
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------
+# Order-statistics index used by the in-memory adapter
+# ---------------------------------------------------------
+class _FenwickTree:
+    """
+    Binary indexed tree over queue slots.
+    Each slot holds 1 while the customer in it is waiting and 0 once they
+    leave (a tombstone), so the prefix sum up to a slot is the number of
+    customers waiting at or ahead of it.
+    """
+    def __init__(self, capacity: int):
+        self._tree = [0] * (capacity + 1)
+
+    @classmethod
+    def from_slots(cls, slots: Iterable[int], capacity: int) -> "_FenwickTree":
+        """Build a tree with the given slots set, in O(capacity)."""
+        tree = cls(capacity)
+        data = tree._tree
+        for i in slots:
+            data[i] = 1
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                data[parent] += data[i]
+        return tree
+
+    @property
+    def capacity(self) -> int:
+        return len(self._tree) - 1
+
+    def add(self, index: int, delta: int) -> None:
+        data = self._tree
+        size = len(data)
+        while index < size:
+            data[index] += delta
+            index += index & -index
+
+    def prefix_sum(self, index: int) -> int:
+        data = self._tree
+        total = 0
+        while index > 0:
+            total += data[index]
+            index -= index & -index
+        return total
+
+
+# ---------------------------------------------------------
+# Compact records used by the in-memory adapter
+# ---------------------------------------------------------
+class _QueueRecord:
+    """A waiting customer. Converted to the dict API shape only when returned."""
+    __slots__ = ("email", "caller_type", "enqueued_at")
+
+    def __init__(self, email: str, caller_type: str, enqueued_at: float):
+        self.email = email
+        # Interned so every record of a caller type shares one string
+        self.caller_type = sys.intern(caller_type)
+        self.enqueued_at = enqueued_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "email": self.email,
+            "caller_type": self.caller_type,
+            "timestamp": datetime.fromtimestamp(self.enqueued_at),
+            "status": "waiting"
+        }
+
+
+class _AgentRecord:
+    """An agent's status. Converted to the dict API shape only when returned."""
+    __slots__ = ("status", "current_customer", "updated_at")
+
+    def __init__(self, status: str, current_customer: Optional[str], updated_at: float):
+        self.status = sys.intern(status)
+        self.current_customer = current_customer
+        self.updated_at = updated_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "current_customer": self.current_customer,
+            "last_updated": datetime.fromtimestamp(self.updated_at)
+        }
+
 
 # ---------------------------------------------------------
 # Adapter 1: In-Memory Implementation (Active Dev/Test)
 # ---------------------------------------------------------
 class InMemoryQueueAdapter(QueueAdapter):
-    def __init__(self):
-        self._customer_queue = deque()
-        self._agent_status = {}
+    """
+    Customers get a monotonically increasing sequence number on enqueue.
+    `_customer_queue` maps sequence number -> entry. Caller types are grouped
+    into priority levels, and each level owns its own band of slots in one
+    Fenwick tree: a customer's slot is `level * stride + seq`, and
+    `_slot_by_email` maps email -> slot. The prefix sum up to a slot counts
+    every waiting customer of a higher-priority level plus those of the same
+    level enqueued no later, which is the routing-order position, so position
+    lookups, pops and mid-queue removals are a single O(log n) tree walk.
+    Caller types missing from the priority map share the last level, so the
+    tree's size is fixed by the priority map rather than by client input.
+    When sequence numbers run past the capacity the live entries are
+    renumbered from 1 and the tree is rebuilt, which is O(n) but amortized
+    O(1) per enqueue.
+    Customers and agents are held as `__slots__` records with float epoch
+    timestamps; dicts with `datetime` values are only built for callers.
+    Agents are also indexed by status in insertion-ordered dicts that are
+    updated on every status change, so counting agents in a status is O(1)
+    and the first available agent is the one that has been idle longest.
+    """
+    _MIN_CAPACITY = 1024
+
+    def __init__(self, priorities: Optional[Dict[str, int]] = None):
+        self._set_priorities(priorities)
+        self._customer_queue: Dict[int, _QueueRecord] = {}
+        # caller_type -> priority level, 0 served first; unknown types get the last level
+        levels = sorted(set(self.priorities.values()))
+        self._level_of = {caller_type: levels.index(priority) for caller_type, priority in self.priorities.items()}
+        self._default_level = len(levels)
+        self._level_count = len(levels) + 1
+        self._slot_by_email: Dict[str, int] = {}
+        self._capacity = self._MIN_CAPACITY
+        # Slots per level: sequence numbers 1..capacity, so slot % stride is the sequence number
+        self._stride = self._capacity + 1
+        self._positions = _FenwickTree(self._level_count * self._stride)
+        self._next_seq = 1
+        self._head_seq = 1
+        self._agent_status: Dict[str, _AgentRecord] = {}
+        # status -> agent ids in that status, in the order they entered it
+        self._agents_by_status: Dict[str, Dict[str, None]] = {}
         # Prepopulate demo agents
         self._initialize_default_agents()
 
     def _initialize_default_agents(self):
-        self._agent_status["agent_a"] = {
-            "status": "offline",
-            "current_customer": None,
-            "last_updated": datetime.now()
-        }
-        self._agent_status["agent_b"] = {
-            "status": "offline",
-            "current_customer": None,
-            "last_updated": datetime.now()
-        }
+        self._put_agent("agent_a", _AgentRecord("offline", None, time.time()))
+        self._put_agent("agent_b", _AgentRecord("offline", None, time.time()))
+
+    def _put_agent(self, agent_id: str, record: _AgentRecord) -> None:
+        """Store an agent record and move the agent to the back of its status index."""
+        previous = self._agent_status.get(agent_id)
+        if previous is not None:
+            del self._agents_by_status[previous.status][agent_id]
+        self._agent_status[agent_id] = record
+        self._agents_by_status.setdefault(record.status, {})[agent_id] = None
+
+    def _rebuild_index(self, records: List[_QueueRecord], capacity: int) -> None:
+        """Number `records` from 1 in order and rebuild the tree."""
+        self._customer_queue = {}
+        self._slot_by_email = {}
+        self._capacity = capacity
+        self._stride = stride = capacity + 1
+        level_of, default_level = self._level_of, self._default_level
+        for seq, record in enumerate(records, start=1):
+            self._customer_queue[seq] = record
+            self._slot_by_email[record.email] = level_of.get(record.caller_type, default_level) * stride + seq
+        self._positions = _FenwickTree.from_slots(self._slot_by_email.values(), self._level_count * stride)
+        self._next_seq = len(records) + 1
+        self._head_seq = 1
+
+    def _compact(self, incoming: int = 0) -> None:
+        """Renumber waiting customers from 1 and rebuild the index with headroom for `incoming` more."""
+        # Sequence numbers are inserted in increasing order, so dict order is queue order
+        live = list(self._customer_queue.values())
+        self._rebuild_index(live, max(self._MIN_CAPACITY, 2 * (len(live) + incoming)))
+
+    def _advance_head(self) -> Optional[int]:
+        """Skip tombstoned sequence numbers; each one is skipped at most once."""
+        while self._head_seq < self._next_seq:
+            if self._head_seq in self._customer_queue:
+                return self._head_seq
+            self._head_seq += 1
+        return None
+
+    def _insert(self, seq: int, record: _QueueRecord) -> int:
+        self._customer_queue[seq] = record
+        slot = self._level_of.get(record.caller_type, self._default_level) * self._stride + seq
+        self._slot_by_email[record.email] = slot
+        self._positions.add(slot, 1)
+        return slot
+
+    def _remove_seq(self, seq: int) -> Dict[str, Any]:
+        record = self._customer_queue.pop(seq)
+        self._positions.add(self._slot_by_email.pop(record.email), -1)
+        return record.to_dict()
 
     def add_customer(self, email: str, caller_type: str) -> int:
         # Check if already in queue to prevent duplicates
@@ -76,165 +359,1326 @@ class InMemoryQueueAdapter(QueueAdapter):
         if pos is not None:
             return pos
 
-        entry = {
-            "email": email,
-            "caller_type": caller_type,
-            "timestamp": datetime.now(),
-            "status": "waiting"
-        }
-        self._customer_queue.append(entry)
-        return len(self._customer_queue)
+        if self._next_seq > self._capacity:
+            self._compact()
+
+        seq = self._next_seq
+        self._next_seq += 1
+        return self._positions.prefix_sum(self._insert(seq, _QueueRecord(email, caller_type, time.time())))
+
+    def add_customers(self, customers: Iterable[Tuple[str, str]]) -> List[int]:
+        customers = list(customers)
+        # Reserve sequence numbers for the whole batch so the index is rebuilt at most once
+        if self._next_seq + len(customers) - 1 > self._capacity:
+            self._compact(len(customers))
+        now = time.time()
+        slots = []
+        for email, caller_type in customers:
+            slot = self._slot_by_email.get(email)
+            if slot is None:
+                seq = self._next_seq
+                self._next_seq += 1
+                slot = self._insert(seq, _QueueRecord(email, caller_type, now))
+            slots.append(slot)
+        # Later higher-priority arrivals move earlier ones back, so rank after the whole batch
+        return [self._positions.prefix_sum(slot) for slot in slots]
 
     def get_customer_position(self, email: str) -> Optional[int]:
-        for i, customer in enumerate(self._customer_queue):
-            if customer["email"] == email:
-                return i + 1
-        return None
+        slot = self._slot_by_email.get(email)
+        if slot is None:
+            return None
+        return self._positions.prefix_sum(slot)
+
+    def get_positions_snapshot(self, emails: Iterable[str]) -> Tuple[Dict[str, Optional[Tuple[int, str]]], int, int]:
+        entries = {}
+        for email in emails:
+            slot = self._slot_by_email.get(email)
+            entries[email] = None if slot is None else (
+                self._positions.prefix_sum(slot), self._customer_queue[slot % self._stride].caller_type
+            )
+        return entries, len(self._customer_queue), self.get_available_agents_count()
 
     def peek_next_customer(self) -> Optional[Dict[str, Any]]:
-        if self._customer_queue:
-            return self._customer_queue[0]
-        return None
+        seq = self._advance_head()
+        if seq is None:
+            return None
+        return self._customer_queue[seq].to_dict()
 
     def pop_next_customer(self) -> Optional[Dict[str, Any]]:
-        if self._customer_queue:
-            return self._customer_queue.popleft()
+        seq = self._advance_head()
+        if seq is None:
+            return None
+        return self._remove_seq(seq)
+
+    def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        slot = self._slot_by_email.get(email)
+        if slot is None:
+            return None
+        return self._remove_seq(slot % self._stride)
+
+    def get_assigned_agent(self, email: str) -> Optional[str]:
+        for agent_id in self._agents_by_status.get("busy", ()):
+            if self._agent_status[agent_id].current_customer == email:
+                return agent_id
         return None
 
+    def requeue_customer(self, customer: Dict[str, Any]) -> bool:
+        if customer["email"] in self._slot_by_email:
+            return False
+        record = _QueueRecord(customer["email"], customer["caller_type"], customer["timestamp"].timestamp())
+        # Rare (failed deliveries only), so an O(n) renumbering in enqueue order is fine
+        records = list(self._customer_queue.values())
+        records.insert(bisect_right(records, record.enqueued_at, key=attrgetter("enqueued_at")), record)
+        self._rebuild_index(records, max(self._MIN_CAPACITY, 2 * len(records)))
+        return True
+
     def get_queue_length(self) -> int:
         return len(self._customer_queue)
 
     def get_available_agents_count(self) -> int:
-        return sum(1 for status in self._agent_status.values() if status.get("status") == "available")
+        return len(self._agents_by_status.get("available", ()))
+
+    def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        return list(islice(self._agents_by_status.get("available", ()), limit))
 
     def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
-        self._agent_status[agent_id] = {
-            "status": status,
-            "current_customer": current_customer,
-            "last_updated": datetime.now()
-        }
+        self._put_agent(agent_id, _AgentRecord(status, current_customer, time.time()))
 
     def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        if agent_id not in self._agent_status:
-            self._agent_status[agent_id] = {
-                "status": "offline",
-                "current_customer": None,
-                "last_updated": datetime.now()
-            }
-        return self._agent_status.get(agent_id)
+        record = self._agent_status.get(agent_id)
+        if record is None:
+            record = _AgentRecord("offline", None, time.time())
+            self._put_agent(agent_id, record)
+        return record.to_dict()
+
+    def export_state(self) -> Dict[str, Any]:
+        """Plain-list copy of the queue (in order) and agent table, for journal snapshots."""
+        return {
+            "customers": [[r.email, r.caller_type, r.enqueued_at] for r in self._customer_queue.values()],
+            "agents": [[agent_id, r.status, r.current_customer, r.updated_at]
+                       for agent_id, r in self._agent_status.items()],
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        """Replace all queue and agent state with an `export_state()`-shaped dict."""
+        customers = state["customers"]
+        records = [_QueueRecord(email, caller_type, enqueued_at) for email, caller_type, enqueued_at in customers]
+        self._rebuild_index(records, max(self._MIN_CAPACITY, 2 * len(records)))
+        # Oldest change first, so the status index keeps longest-idle order
+        for agent_id, status, current_customer, updated_at in sorted(state["agents"], key=lambda agent: agent[3]):
+            self._put_agent(agent_id, _AgentRecord(status, current_customer, updated_at))
 
 
 # ---------------------------------------------------------
-# Adapter 2: Database/Redis Implementation (Hypothetical Seam Proof)
+# Adapter 2: SQLite Implementation (Persistent, single node)
 # ---------------------------------------------------------
 class DatabaseQueueAdapter(QueueAdapter):
     """
-    Hypothetical adapter connecting to a persistent PostgreSQL/Redis store.
-    This demonstrates that our QueueManager can swap database schemas without affecting FastAPI routes.
+    Persistent adapter on SQLite in WAL mode, so the queue survives restarts.
+
+    Waiting order comes from an AUTOINCREMENT `seq` column with an index on
+    (status, seq); positions rank rows by caller-type priority, then seq.
+    Rows leave the queue by changing status ("assigned" or "removed") rather
+    than being deleted, so nothing needs replaying on startup. Writes are group-committed: they join an open transaction that a
+    background flusher commits `commit_window` seconds after the first
+    uncommitted write, so bursts of enqueues share one fsync. A crash can lose
+    at most that window of acknowledged writes; pass `commit_window=0` to
+    commit every write. Assignments always commit immediately in their own
+    transaction together with the agent's status change.
     """
-    def __init__(self, db_connection_url: str):
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS queue_entries (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            caller_type TEXT NOT NULL,
+            enqueued_at TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'waiting',
+            agent_id TEXT
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_queue_status_seq ON queue_entries (status, seq)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_queue_waiting_email ON queue_entries (email) WHERE status = 'waiting'",
+        """CREATE TABLE IF NOT EXISTS agent_status (
+            agent_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            current_customer TEXT,
+            last_updated TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_agent_status ON agent_status (status)",
+        "CREATE INDEX IF NOT EXISTS idx_agent_status_updated ON agent_status (status, last_updated)",
+    )
+
+    # Statements are kept as constants so sqlite3's statement cache reuses the prepared plans
+    _SELECT_WAITING_SEQ = "SELECT seq, caller_type FROM queue_entries WHERE status = 'waiting' AND email = ?"
+    # Customers ahead in routing order: higher-priority types, then equal priority by seq.
+    # {priority} is a CASE expression over caller_type built from the priority map.
+    _COUNT_AHEAD = (
+        "SELECT COUNT(*) FROM queue_entries WHERE status = 'waiting' "
+        "AND ({priority} < ? OR ({priority} = ? AND seq <= ?))"
+    )
+    _INSERT_ENTRY = "INSERT INTO queue_entries (email, caller_type, enqueued_at) VALUES (?, ?, ?)"
+    _SELECT_HEAD = (
+        "SELECT seq, email, caller_type, enqueued_at FROM queue_entries "
+        "WHERE status = 'waiting' ORDER BY seq LIMIT 1"
+    )
+    _SELECT_BY_EMAIL = (
+        "SELECT seq, email, caller_type, enqueued_at FROM queue_entries "
+        "WHERE status = 'waiting' AND email = ?"
+    )
+    _MARK_ENTRY = "UPDATE queue_entries SET status = ?, agent_id = ? WHERE seq = ? AND status = 'waiting'"
+    # An undelivered assignment goes back to waiting under its original seq
+    _REQUEUE_ENTRY = (
+        "UPDATE queue_entries SET status = 'waiting', agent_id = NULL WHERE seq = ("
+        "SELECT MAX(seq) FROM queue_entries WHERE email = ? AND status = 'assigned')"
+    )
+    _COUNT_WAITING = "SELECT COUNT(*) FROM queue_entries WHERE status = 'waiting'"
+    _COUNT_AVAILABLE = "SELECT COUNT(*) FROM agent_status WHERE status = 'available'"
+    # A negative LIMIT means no limit in SQLite
+    _SELECT_AVAILABLE = (
+        "SELECT agent_id FROM agent_status WHERE status = 'available' ORDER BY last_updated LIMIT ?"
+    )
+    _UPSERT_AGENT = (
+        "INSERT INTO agent_status (agent_id, status, current_customer, last_updated) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT(agent_id) DO UPDATE SET status = excluded.status, "
+        "current_customer = excluded.current_customer, last_updated = excluded.last_updated"
+    )
+    _SELECT_AGENT = "SELECT status, current_customer, last_updated FROM agent_status WHERE agent_id = ?"
+    _SELECT_ASSIGNED_AGENT = "SELECT agent_id FROM agent_status WHERE status = 'busy' AND current_customer = ?"
+    _CLAIM_AGENT = (
+        "UPDATE agent_status SET status = 'busy', current_customer = ?, last_updated = ? "
+        "WHERE agent_id = ? AND status = 'available'"
+    )
+
+    blocking_io = True
+
+    def __init__(self, db_connection_url: str, commit_window: float = 0.005,
+                 priorities: Optional[Dict[str, int]] = None):
+        self._set_priorities(priorities)
+        priority_sql = "CASE caller_type {} ELSE {} END".format(
+            " ".join(f"WHEN ? THEN {int(priority)}" for priority in self.priorities.values()),
+            self._lowest_priority
+        )
+        self._count_ahead_sql = self._COUNT_AHEAD.format(priority=priority_sql)
+        self._priority_params = tuple(self.priorities)
         self.connection_url = db_connection_url
+        self._path = db_connection_url[len("sqlite:///"):] if db_connection_url.startswith("sqlite:///") else db_connection_url
+        self._commit_window = commit_window
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self._SCHEMA:
+            self._conn.execute(statement)
+        self._in_transaction = False
+        self._closed = False
+        self._flush_requested = threading.Condition(self._lock)
+        self._flusher = threading.Thread(target=self._flush_loop, name="queue-db-flusher", daemon=True)
+        self._flusher.start()
+        self._initialize_default_agents()
+
+    def _initialize_default_agents(self):
+        now = datetime.now().isoformat()
+        with self._lock:
+            for agent_id in ("agent_a", "agent_b"):
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO agent_status (agent_id, status, current_customer, last_updated) "
+                    "VALUES (?, 'offline', NULL, ?)",
+                    (agent_id, now)
+                )
+
+    # -----------------------------------------------------
+    # Group commit
+    # -----------------------------------------------------
+    def _begin_write(self) -> None:
+        """Join the open batch transaction, starting one if needed. Caller holds the lock."""
+        if not self._in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._in_transaction = True
+            self._flush_requested.notify()
+
+    def _end_write(self) -> None:
+        if self._commit_window <= 0:
+            self._commit()
+
+    def _commit(self) -> None:
+        if self._in_transaction:
+            self._conn.execute("COMMIT")
+            self._in_transaction = False
+
+    def _flush_loop(self) -> None:
+        with self._lock:
+            while not self._closed:
+                if not self._in_transaction:
+                    self._flush_requested.wait()
+                    continue
+                # Let writes arriving within the window join this batch
+                self._flush_requested.wait(self._commit_window)
+                self._commit()
+
+    def flush(self) -> None:
+        """Commit any batched writes now."""
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._commit()
+            self._closed = True
+            self._flush_requested.notify()
+        self._flusher.join()
+        self._conn.close()
+
+    # -----------------------------------------------------
+    # Queue operations
+    # -----------------------------------------------------
+    @staticmethod
+    def _entry_from_row(row) -> Dict[str, Any]:
+        return {
+            "email": row[1],
+            "caller_type": row[2],
+            "timestamp": datetime.fromisoformat(row[3]),
+            "status": "waiting"
+        }
+
+    def _position_of(self, seq: int, caller_type: str) -> int:
+        priority = self._priority(caller_type)
+        params = self._priority_params + (priority,) + self._priority_params + (priority, seq)
+        return self._conn.execute(self._count_ahead_sql, params).fetchone()[0]
 
     def add_customer(self, email: str, caller_type: str) -> int:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            row = self._conn.execute(self._SELECT_WAITING_SEQ, (email,)).fetchone()
+            if row is not None:
+                return self._position_of(*row)
+            self._begin_write()
+            seq = self._conn.execute(self._INSERT_ENTRY, (email, caller_type, datetime.now().isoformat())).lastrowid
+            self._end_write()
+            return self._position_of(seq, caller_type)
+
+    def add_customers(self, customers: Iterable[Tuple[str, str]]) -> List[int]:
+        with self._lock:
+            # One transaction for the whole batch
+            self._begin_write()
+            rows = []
+            now = datetime.now().isoformat()
+            for email, caller_type in customers:
+                row = self._conn.execute(self._SELECT_WAITING_SEQ, (email,)).fetchone()
+                if row is None:
+                    row = (self._conn.execute(self._INSERT_ENTRY, (email, caller_type, now)).lastrowid, caller_type)
+                rows.append(row)
+            self._end_write()
+            return [self._position_of(*row) for row in rows]
 
     def get_customer_position(self, email: str) -> Optional[int]:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            row = self._conn.execute(self._SELECT_WAITING_SEQ, (email,)).fetchone()
+            if row is None:
+                return None
+            return self._position_of(*row)
+
+    def get_positions_snapshot(self, emails: Iterable[str]) -> Tuple[Dict[str, Optional[Tuple[int, str]]], int, int]:
+        # Every write goes through this connection under the lock, so holding it is a snapshot
+        with self._lock:
+            entries = {}
+            for email in emails:
+                row = self._conn.execute(self._SELECT_WAITING_SEQ, (email,)).fetchone()
+                entries[email] = None if row is None else (self._position_of(*row), row[1])
+            return entries, self.get_queue_length(), self.get_available_agents_count()
 
     def peek_next_customer(self) -> Optional[Dict[str, Any]]:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            row = self._conn.execute(self._SELECT_HEAD).fetchone()
+            return self._entry_from_row(row) if row else None
+
+    def _take(self, select_sql: str, params: tuple, new_status: str) -> Optional[Dict[str, Any]]:
+        """Move the selected waiting row to `new_status` inside the batch transaction."""
+        with self._lock:
+            self._begin_write()
+            row = self._conn.execute(select_sql, params).fetchone()
+            if row is not None:
+                self._conn.execute(self._MARK_ENTRY, (new_status, None, row[0]))
+            self._end_write()
+            return self._entry_from_row(row) if row else None
 
     def pop_next_customer(self) -> Optional[Dict[str, Any]]:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        return self._take(self._SELECT_HEAD, (), "assigned")
+
+    def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._take(self._SELECT_BY_EMAIL, (email,), "removed")
+
+    def assign_customer(self, email: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim a waiting customer for an available agent in one committed transaction."""
+        return self._assign(self._SELECT_BY_EMAIL, (email,), agent_id)
+
+    def assign_next_customer(self, agent_id: str, caller_types: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically pop the first waiting customer (of `caller_types`, if given) for an available agent."""
+        if caller_types is None:
+            return self._assign(self._SELECT_HEAD, (), agent_id)
+        caller_types = tuple(caller_types)
+        if not caller_types:
+            return None
+        select_sql = (
+            "SELECT seq, email, caller_type, enqueued_at FROM queue_entries "
+            f"WHERE status = 'waiting' AND caller_type IN ({', '.join('?' * len(caller_types))}) "
+            "ORDER BY seq LIMIT 1"
+        )
+        return self._assign(select_sql, caller_types, agent_id)
+
+    def _assign(self, select_sql: str, params: tuple, agent_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._begin_write()
+            try:
+                row = self._conn.execute(select_sql, params).fetchone()
+                if row is None:
+                    return None
+                claimed = self._conn.execute(
+                    self._CLAIM_AGENT, (row[1], datetime.now().isoformat(), agent_id)
+                ).rowcount
+                if claimed != 1:
+                    return None
+                self._conn.execute(self._MARK_ENTRY, ("assigned", agent_id, row[0]))
+                return self._entry_from_row(row)
+            finally:
+                # Both updates land in the same commit; earlier batched writes ride along
+                self._commit()
+
+    def get_assigned_agent(self, email: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(self._SELECT_ASSIGNED_AGENT, (email,)).fetchone()
+        return row[0] if row else None
+
+    def requeue_customer(self, customer: Dict[str, Any]) -> bool:
+        with self._lock:
+            if self._conn.execute(self._SELECT_WAITING_SEQ, (customer["email"],)).fetchone() is not None:
+                return False
+            self._begin_write()
+            try:
+                return self._conn.execute(self._REQUEUE_ENTRY, (customer["email"],)).rowcount == 1
+            finally:
+                self._commit()
 
     def get_queue_length(self) -> int:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            return self._conn.execute(self._COUNT_WAITING).fetchone()[0]
 
     def get_available_agents_count(self) -> int:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            return self._conn.execute(self._COUNT_AVAILABLE).fetchone()[0]
+
+    def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(self._SELECT_AVAILABLE, (-1 if limit is None else limit,)).fetchall()
+        return [row[0] for row in rows]
 
     def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            self._begin_write()
+            self._conn.execute(self._UPSERT_AGENT, (agent_id, status, current_customer, datetime.now().isoformat()))
+            self._end_write()
 
     def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
-        raise NotImplementedError("DatabaseQueueAdapter is a hypothetical seam. Use InMemoryQueueAdapter.")
+        with self._lock:
+            row = self._conn.execute(self._SELECT_AGENT, (agent_id,)).fetchone()
+        if row is None:
+            self.set_agent_status(agent_id, "offline")
+            return self.get_agent_status(agent_id)
+        return {
+            "status": row[0],
+            "current_customer": row[1],
+            "last_updated": datetime.fromisoformat(row[2])
+        }
+
+
+# ---------------------------------------------------------
+# Adapter 3: Redis Implementation (Shared across workers/nodes)
+# ---------------------------------------------------------
+class RedisQueueAdapter(QueueAdapter):
+    """
+    Adapter on Redis so several uvicorn workers (or nodes) share one queue.
+
+    Waiting customers are members of a sorted set scored by an INCR sequence,
+    plus one sorted set per caller_type. A routing-order position is one
+    ZCARD or ZCOUNT per caller type seen, computed server-side in a script.
+    Every multi-key mutation runs as a Lua script, which Redis executes
+    atomically: one script checks that an agent is available, pops the
+    customer and marks the agent busy in a single round trip, so two workers
+    can never hand out the same customer (or agent) twice.
+    Routing runs in Lua as well (`routes_in_storage`): agent skills live in
+    Redis and the routing script picks by caller-type priority, then arrival,
+    over the per-type sets and by longest idle time over the idle agents, so
+    every worker routes against the whole queue rather than the customers and
+    agents it happened to see itself.
+    Per-caller-type key names are derived inside the scripts, so this expects
+    a single Redis instance rather than Redis Cluster.
+    """
+    # Routing-order position of a waiting email (0 when not waiting). Priorities arrive
+    # in ARGV as a count, that many caller_type/priority pairs, then the fallback priority.
+    _POSITION_LUA = """
+local function read_priorities(first)
+  local priorities = {}
+  local count = tonumber(ARGV[first])
+  for i = first + 1, first + 2 * count, 2 do
+    priorities[ARGV[i]] = tonumber(ARGV[i + 1])
+  end
+  local last = first + 2 * count + 1
+  return priorities, tonumber(ARGV[last]), last + 1
+end
+
+local function position(email, types_key, caller_types_key, type_prefix, priorities, lowest)
+  local caller_type = redis.call('HGET', types_key, email)
+  if not caller_type then return 0 end
+  local seq = redis.call('ZSCORE', type_prefix .. caller_type, email)
+  if not seq then return 0 end
+  local mine = priorities[caller_type] or lowest
+  local ahead = 0
+  for _, other in ipairs(redis.call('SMEMBERS', caller_types_key)) do
+    local priority = priorities[other] or lowest
+    if priority < mine then
+      ahead = ahead + redis.call('ZCARD', type_prefix .. other)
+    elseif priority == mine then
+      ahead = ahead + redis.call('ZCOUNT', type_prefix .. other, '-inf', seq)
+    end
+  end
+  return ahead
+end
+"""
+
+    _ADD_SCRIPT = _POSITION_LUA + """
+local priorities, lowest = read_priorities(5)
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+  local seq = redis.call('INCR', KEYS[4])
+  redis.call('ZADD', KEYS[1], seq, ARGV[1])
+  redis.call('ZADD', KEYS[5], seq, ARGV[1])
+  redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+  redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+  redis.call('SADD', KEYS[6], ARGV[2])
+end
+return position(ARGV[1], KEYS[3], KEYS[6], ARGV[4], priorities, lowest)
+"""
+
+    # Waiting/available totals, then position and caller_type ('' when not waiting) of
+    # each email, from one atomic read
+    _POSITIONS_SCRIPT = _POSITION_LUA + """
+local priorities, lowest, first_email = read_priorities(2)
+local result = {redis.call('ZCARD', KEYS[1]), redis.call('ZCARD', KEYS[4])}
+for i = first_email, #ARGV do
+  result[#result + 1] = position(ARGV[i], KEYS[2], KEYS[3], ARGV[1], priorities, lowest)
+  result[#result + 1] = redis.call('HGET', KEYS[2], ARGV[i]) or ''
+end
+return result
+"""
+
+    # Shared by remove and assign: drop `email` from every queue structure, return its entry
+    _TAKE_LUA = """
+local function take(email, type_prefix)
+  local caller_type = redis.call('HGET', KEYS[3], email)
+  local seq = redis.call('ZSCORE', KEYS[1], email)
+  redis.call('ZREM', KEYS[1], email)
+  if caller_type then redis.call('ZREM', type_prefix .. caller_type, email) end
+  local entry = redis.call('HGET', KEYS[2], email)
+  redis.call('HDEL', KEYS[2], email)
+  redis.call('HDEL', KEYS[3], email)
+  return {email, entry, seq}
+end
+"""
+
+    _REMOVE_SCRIPT = _TAKE_LUA + """
+local email = ARGV[1]
+if email == '' then
+  email = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+  if not email then return nil end
+elseif not redis.call('ZSCORE', KEYS[1], email) then
+  return nil
+end
+return take(email, ARGV[2])
+"""
+
+    _ASSIGN_SCRIPT = _TAKE_LUA + """
+if redis.call('HGET', KEYS[4], 'status') ~= 'available' then return nil end
+local email = ARGV[1]
+if email == '' then
+  if #KEYS > 5 then
+    local best_score
+    for i = 6, #KEYS do
+      local head = redis.call('ZRANGE', KEYS[i], 0, 0, 'WITHSCORES')
+      if head[1] and (best_score == nil or tonumber(head[2]) < best_score) then
+        email = head[1]
+        best_score = tonumber(head[2])
+      end
+    end
+  else
+    email = redis.call('ZRANGE', KEYS[1], 0, 0)[1]
+  end
+  if not email or email == '' then return nil end
+elseif not redis.call('ZSCORE', KEYS[1], email) then
+  return nil
+end
+redis.call('HSET', KEYS[4], 'status', 'busy', 'current_customer', email, 'last_updated', ARGV[4])
+redis.call('ZREM', KEYS[5], ARGV[3])
+redis.call('SET', ARGV[5] .. email, ARGV[3], 'EX', ARGV[6])
+return take(email, ARGV[2])
+"""
+
+    # KEYS: waiting, entries, types, idle agents, caller types.
+    # ARGV: email ('' = the agent's next customer), agent_id ('' = longest-idle agent skilled
+    # for the customer), type prefix, agent prefix, timestamp, assignment prefix, assignment
+    # ttl, then the priorities.
+    _ROUTE_SCRIPT = _POSITION_LUA + _TAKE_LUA + """
+local priorities, lowest = read_priorities(8)
+local type_prefix, agent_prefix = ARGV[3], ARGV[4]
+
+local function skills_of(agent_id)
+  local skills = {}
+  local members = redis.call('SMEMBERS', agent_prefix .. agent_id .. ':skills')
+  if #members == 0 then skills['*'] = true end
+  for _, skill in ipairs(members) do skills[skill] = true end
+  return skills
+end
+
+local function next_customer(skills)
+  local best, best_priority, best_seq
+  for _, caller_type in ipairs(redis.call('SMEMBERS', KEYS[5])) do
+    if skills['*'] or skills[caller_type] then
+      local head = redis.call('ZRANGE', type_prefix .. caller_type, 0, 0, 'WITHSCORES')
+      if head[1] then
+        local priority, seq = priorities[caller_type] or lowest, tonumber(head[2])
+        if best == nil or priority < best_priority or (priority == best_priority and seq < best_seq) then
+          best, best_priority, best_seq = head[1], priority, seq
+        end
+      end
+    end
+  end
+  return best
+end
+
+local email, agent_id = ARGV[1], ARGV[2]
+if email ~= '' and agent_id == '' then
+  local caller_type = redis.call('HGET', KEYS[3], email)
+  if not caller_type then return nil end
+  for _, idle in ipairs(redis.call('ZRANGE', KEYS[4], 0, -1)) do
+    local skills = skills_of(idle)
+    if skills['*'] or skills[caller_type] then
+      agent_id = idle
+      break
+    end
+  end
+  if agent_id == '' then return nil end
+end
+if redis.call('HGET', agent_prefix .. agent_id, 'status') ~= 'available' then return nil end
+local chosen = next_customer(skills_of(agent_id))
+if not chosen or (email ~= '' and chosen ~= email) then return nil end
+redis.call('HSET', agent_prefix .. agent_id, 'status', 'busy', 'current_customer', chosen, 'last_updated', ARGV[5])
+redis.call('ZREM', KEYS[4], agent_id)
+redis.call('SET', ARGV[6] .. chosen, agent_id, 'EX', ARGV[7])
+local taken = take(chosen, type_prefix)
+taken[4] = agent_id
+return taken
+"""
+
+    # Puts an undelivered assignment back under its original seq. Same KEYS as _ADD_SCRIPT;
+    # ARGV: email, caller_type, entry, seq.
+    _REQUEUE_SCRIPT = """
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then return 0 end
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+redis.call('ZADD', KEYS[5], ARGV[4], ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+redis.call('SADD', KEYS[6], ARGV[2])
+return 1
+"""
+
+    # How long the customer -> agent record of an assignment outlives its call, at most
+    _ASSIGNMENT_TTL = 24 * 60 * 60
+
+    blocking_io = True
+    routes_in_storage = True
+
+    def __init__(self, redis_url: str = "redis://localhost:6379/0", key_prefix: str = "warm_transfer",
+                 max_connections: int = 50, client: Any = None, priorities: Optional[Dict[str, int]] = None):
+        self._set_priorities(priorities)
+        self._priority_args: List[Any] = [len(self.priorities)]
+        for caller_type, priority in self.priorities.items():
+            self._priority_args.extend((caller_type, priority))
+        self._priority_args.append(self._lowest_priority)
+        # `client` lets tests pass a fakeredis instance instead of a pooled connection
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("RedisQueueAdapter requires the 'redis' package") from e
+            pool = redis.ConnectionPool.from_url(redis_url, max_connections=max_connections, decode_responses=True)
+            client = redis.Redis(connection_pool=pool)
+        self._redis = client
+        self._waiting_key = f"{key_prefix}:queue:waiting"
+        self._type_prefix = f"{key_prefix}:queue:waiting:"
+        self._entries_key = f"{key_prefix}:queue:entries"
+        self._types_key = f"{key_prefix}:queue:types"
+        self._seq_key = f"{key_prefix}:queue:seq"
+        # Every caller_type ever enqueued, so scripts can find the per-type sets
+        self._caller_types_key = f"{key_prefix}:queue:caller_types"
+        self._agent_prefix = f"{key_prefix}:agent:"
+        # customer email -> agent of their latest assignment, set atomically with it
+        self._assigned_prefix = f"{key_prefix}:assigned:"
+        # Available agents scored by when they became available (longest-idle first)
+        self._available_key = f"{key_prefix}:agents:idle"
+        self._add = self._redis.register_script(self._ADD_SCRIPT)
+        self._positions = self._redis.register_script(self._POSITIONS_SCRIPT)
+        self._remove = self._redis.register_script(self._REMOVE_SCRIPT)
+        self._assign = self._redis.register_script(self._ASSIGN_SCRIPT)
+        self._route = self._redis.register_script(self._ROUTE_SCRIPT)
+        self._requeue = self._redis.register_script(self._REQUEUE_SCRIPT)
+        self._initialize_default_agents()
+
+    def _initialize_default_agents(self):
+        now = datetime.now().isoformat()
+        for agent_id in ("agent_a", "agent_b"):
+            key = self._agent_prefix + agent_id
+            if self._redis.hsetnx(key, "status", "offline"):
+                self._redis.hset(key, "last_updated", now)
+
+    @staticmethod
+    def _decode_entry(result) -> Optional[Dict[str, Any]]:
+        if not result or result[1] is None:
+            return None
+        entry = json.loads(result[1])
+        customer = {
+            "email": result[0],
+            "caller_type": entry["caller_type"],
+            "timestamp": datetime.fromisoformat(entry["timestamp"]),
+            "status": "waiting"
+        }
+        if len(result) > 2 and result[2] is not None:
+            # Queue seq of a taken customer, so requeue_customer can restore their place
+            customer["seq"] = float(result[2])
+        return customer
+
+    def _add_keys(self, caller_type: str) -> List[str]:
+        return [self._waiting_key, self._entries_key, self._types_key, self._seq_key,
+                self._type_prefix + caller_type, self._caller_types_key]
+
+    def add_customer(self, email: str, caller_type: str) -> int:
+        entry = json.dumps({"caller_type": caller_type, "timestamp": datetime.now().isoformat()})
+        return int(self._add(
+            keys=self._add_keys(caller_type),
+            args=[email, caller_type, entry, self._type_prefix, *self._priority_args]
+        ))
+
+    def add_customers(self, customers: Iterable[Tuple[str, str]]) -> List[int]:
+        # One pipelined round trip; each script call is still atomic on its own
+        customers = list(customers)
+        now = datetime.now().isoformat()
+        pipe = self._redis.pipeline(transaction=False)
+        for email, caller_type in customers:
+            entry = json.dumps({"caller_type": caller_type, "timestamp": now})
+            self._add(
+                keys=self._add_keys(caller_type),
+                args=[email, caller_type, entry, self._type_prefix, *self._priority_args],
+                client=pipe
+            )
+        pipe.execute()
+        # Later higher-priority arrivals move earlier ones back, so rank after the whole batch
+        entries, _, _ = self.get_positions_snapshot(email for email, _ in customers)
+        return [entries[email][0] for email, _ in customers]
+
+    def get_customer_position(self, email: str) -> Optional[int]:
+        entries, _, _ = self.get_positions_snapshot([email])
+        entry = entries[email]
+        return entry[0] if entry else None
+
+    def get_positions_snapshot(self, emails: Iterable[str]) -> Tuple[Dict[str, Optional[Tuple[int, str]]], int, int]:
+        emails = list(emails)
+        # One script: every read sees the same state, in one round trip
+        total_waiting, agents_available, *ranks = self._positions(
+            keys=[self._waiting_key, self._types_key, self._caller_types_key, self._available_key],
+            args=[self._type_prefix, *self._priority_args, *emails]
+        )
+        entries = {
+            email: (int(ranks[i]), ranks[i + 1]) if int(ranks[i]) else None
+            for email, i in zip(emails, range(0, len(ranks), 2))
+        }
+        return entries, int(total_waiting), int(agents_available)
+
+    def peek_next_customer(self) -> Optional[Dict[str, Any]]:
+        head = self._redis.zrange(self._waiting_key, 0, 0)
+        if not head:
+            return None
+        return self._decode_entry([head[0], self._redis.hget(self._entries_key, head[0])])
+
+    def pop_next_customer(self) -> Optional[Dict[str, Any]]:
+        return self.remove_customer("")
+
+    def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        return self._decode_entry(self._remove(
+            keys=[self._waiting_key, self._entries_key, self._types_key],
+            args=[email, self._type_prefix]
+        ))
+
+    def _run_assign(self, agent_id: str, email: str, caller_types: Iterable[str] = ()) -> Optional[Dict[str, Any]]:
+        keys = [self._waiting_key, self._entries_key, self._types_key,
+                self._agent_prefix + agent_id, self._available_key]
+        keys.extend(self._type_prefix + caller_type for caller_type in caller_types)
+        return self._decode_entry(self._assign(
+            keys=keys,
+            args=[email, self._type_prefix, agent_id, datetime.now().isoformat(),
+                  self._assigned_prefix, self._ASSIGNMENT_TTL]
+        ))
+
+    def assign_customer(self, email: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically claim a waiting customer for an available agent (one Lua call)."""
+        return self._run_assign(agent_id, email)
+
+    def assign_next_customer(self, agent_id: str, caller_types: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """Atomically pop the first waiting customer (of `caller_types`, if given) for an available agent."""
+        if caller_types is None:
+            return self._run_assign(agent_id, "")
+        caller_types = list(caller_types)
+        if not caller_types:
+            return None
+        return self._run_assign(agent_id, "", caller_types)
+
+    def set_agent_skills(self, agent_id: str, skills: Iterable[str]) -> None:
+        # An empty set means any caller type, like RoutingEngine's default
+        key = self._agent_prefix + agent_id + ":skills"
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.delete(key)
+        skills = [skill for skill in skills if skill != ANY_SKILL]
+        if skills:
+            pipe.sadd(key, *skills)
+        pipe.execute()
+
+    def _run_route(self, email: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        result = self._route(
+            keys=[self._waiting_key, self._entries_key, self._types_key, self._available_key, self._caller_types_key],
+            args=[email, agent_id, self._type_prefix, self._agent_prefix, datetime.now().isoformat(),
+                  self._assigned_prefix, self._ASSIGNMENT_TTL, *self._priority_args]
+        )
+        customer = self._decode_entry(result[:3]) if result else None
+        if customer:
+            customer["agent_id"] = result[3]
+        return customer
+
+    def route_next_customer(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically assign the agent their next customer in routing order (one Lua call)."""
+        return self._run_route("", agent_id)
+
+    def route_customer(self, email: str, agent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Atomically assign the customer if routing would hand them to the agent next (one Lua call)."""
+        return self._run_route(email, agent_id or "")
+
+    def get_assigned_agent(self, email: str) -> Optional[str]:
+        agent_id = self._redis.get(self._assigned_prefix + email)
+        if agent_id is None:
+            return None
+        # The record outlives the call; only trust it while the agent is still with them
+        status, current_customer = self._redis.hmget(self._agent_prefix + agent_id, "status", "current_customer")
+        return agent_id if status == "busy" and current_customer == email else None
+
+    def requeue_customer(self, customer: Dict[str, Any]) -> bool:
+        caller_type = customer["caller_type"]
+        entry = json.dumps({"caller_type": caller_type, "timestamp": customer["timestamp"].isoformat()})
+        return bool(self._requeue(
+            keys=self._add_keys(caller_type),
+            args=[customer["email"], caller_type, entry, customer["seq"]]
+        ))
+
+    def get_queue_length(self) -> int:
+        return self._redis.zcard(self._waiting_key)
+
+    def get_available_agents_count(self) -> int:
+        return self._redis.zcard(self._available_key)
+
+    def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        return self._redis.zrange(self._available_key, 0, -1 if limit is None else limit - 1)
+
+    def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.hset(self._agent_prefix + agent_id, mapping={
+            "status": status,
+            "current_customer": current_customer or "",
+            "last_updated": datetime.now().isoformat()
+        })
+        if status == "available":
+            pipe.zadd(self._available_key, {agent_id: time.time()})
+        else:
+            pipe.zrem(self._available_key, agent_id)
+        pipe.execute()
+
+    def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        fields = self._redis.hgetall(self._agent_prefix + agent_id)
+        if not fields:
+            self.set_agent_status(agent_id, "offline")
+            fields = self._redis.hgetall(self._agent_prefix + agent_id)
+        return {
+            "status": fields.get("status", "offline"),
+            "current_customer": fields.get("current_customer") or None,
+            "last_updated": datetime.fromisoformat(fields["last_updated"])
+        }
 
 
 # ---------------------------------------------------------
 # Deep Module: Coordinates Queue & Assignment Logic
 # ---------------------------------------------------------
 class QueueManager:
-    def __init__(self, adapter: QueueAdapter):
+    def __init__(self, adapter: QueueAdapter, router: Optional[RoutingEngine] = None,
+                 wait_estimator: Optional[HandleTimeEstimator] = None,
+                 journal: Optional[QueueJournal] = None):
         self._adapter = adapter
+        # Route by the same priorities the adapter ranks positions by. Adapters that route
+        # in shared storage leave the local engine idle.
+        self._router = router or RoutingEngine(adapter.priorities)
+        self._routes_in_storage = adapter.routes_in_storage
+        self._wait_estimator = wait_estimator or HandleTimeEstimator()
+        # agent_id -> (monotonic call start, caller_type) for calls in progress
+        self._active_calls: Dict[str, Tuple[float, Optional[str]]] = {}
+        # agent_id -> (email, router arrival seq) of the latest assignment, until the agent's
+        # status next changes, so an undelivered assignment can be requeued in place
+        self._assigned_seqs: Dict[str, Tuple[str, Optional[int]]] = {}
+        # Bumped on every queue or agent change; lets pollers skip unchanged state
+        self._version = 0
+        self._change_listeners: List[Callable[[], None]] = []
+        # Emails of the waiting customers recovered from the journal on startup, in queue order
+        self.recovered_customers: List[str] = []
+        self._journal = journal
+        if journal is not None:
+            if not isinstance(adapter, InMemoryQueueAdapter):
+                raise ValueError("A queue journal is only supported with InMemoryQueueAdapter")
+            state = journal.recover()
+            if state is not None:
+                self._restore(state)
+            journal.set_snapshot_source(adapter.export_state)
+
+    @property
+    def version(self) -> int:
+        """Monotonic counter of queue/agent state changes."""
+        return self._version
+
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        """Call `listener` after every state change. It may run on a worker thread."""
+        self._change_listeners.append(listener)
+
+    def _changed(self) -> None:
+        self._version += 1
+        for listener in self._change_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Queue change listener failed: {e}")
+
+    def _restore(self, state: Dict[str, Any]) -> None:
+        """Load journal-recovered state into the adapter and rebuild routing/estimator state."""
+        self._adapter.load_state(state)
+        self._router.enqueue_customers((email, caller_type) for email, caller_type, _ in state["customers"])
+        self.recovered_customers = [email for email, _, _ in state["customers"]]
+        for agent_id, status, _, _ in state["agents"]:
+            if status == "busy":
+                # Call length before the restart is unknown; time it from now
+                self._active_calls[agent_id] = (time.monotonic(), None)
+            self._wait_estimator.set_agent_online(agent_id, status in ("available", "busy"))
+            if status == "available":
+                self._router.mark_agent_idle(agent_id)
+        logger.info(f"Restored {len(state['customers'])} waiting customers from the queue journal")
+
+    def _record(self, *event: Any) -> None:
+        if self._journal is not None:
+            self._journal.record(*event)
+
+    def close(self) -> None:
+        """Snapshot and close the journal, if any. Call on shutdown."""
+        if self._journal is not None:
+            self._journal.snapshot()
+            self._journal.close()
 
     def add_customer(self, email: str, caller_type: str) -> Dict[str, Any]:
         """Enqueues a customer and returns their position status."""
         position = self._adapter.add_customer(email, caller_type)
-        return self._build_status_response(position)
+        self._record(ENQUEUE, email, caller_type, time.time())
+        if not self._routes_in_storage:
+            self._router.enqueue_customer(email, caller_type)
+        self._changed()
+        return self._build_status_response(position, caller_type)
+
+    def add_customers(self, customers: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        """Enqueue many (email, caller_type) pairs in one adapter call; returns batch status."""
+        customers = list(customers)
+        self._adapter.add_customers(customers)
+        now = time.time()
+        for email, caller_type in customers:
+            self._record(ENQUEUE, email, caller_type, now)
+        if not self._routes_in_storage:
+            self._router.enqueue_customers(customers)
+        self._changed()
+        return self.get_customer_statuses([email for email, _ in customers])
 
     def get_customer_status(self, email: str) -> Optional[Dict[str, Any]]:
         """Get queue metrics for a specific customer."""
-        position = self._adapter.get_customer_position(email)
-        if position is None:
+        snapshot = self.get_customer_statuses([email])
+        status = snapshot["customers"][email]
+        if status is None:
             return None
-        return self._build_status_response(position)
+        return {
+            **status,
+            "total_waiting": snapshot["total_waiting"],
+            "agents_available": snapshot["agents_available"]
+        }
+
+    def get_customer_statuses(self, emails: Iterable[str]) -> Dict[str, Any]:
+        """
+        Positions and ETAs for many customers from one consistent snapshot.
+        "customers" maps each email to {"position", "estimated_wait_time"}, or
+        None if that customer is not waiting.
+        """
+        entries, total_waiting, agents_available = self._adapter.get_positions_snapshot(emails)
+        estimate = self._wait_estimator.estimate_wait
+        return {
+            "customers": {
+                email: None if entry is None else {
+                    "position": entry[0],
+                    "estimated_wait_time": estimate(entry[0], agents_available, entry[1])
+                }
+                for email, entry in entries.items()
+            },
+            "total_waiting": total_waiting,
+            "agents_available": agents_available
+        }
+
+    def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        """Drop a customer from the queue, wherever they are waiting."""
+        self._router.discard_customer(email)
+        customer = self._adapter.remove_customer(email)
+        if customer:
+            self._record(REMOVE, email)
+            self._changed()
+        return customer
+
+    @property
+    def blocking_io(self) -> bool:
+        """Whether the underlying adapter blocks on I/O."""
+        return self._adapter.blocking_io
+
+    def get_queue_length(self) -> int:
+        """Total count of waiting customers."""
+        return self._adapter.get_queue_length()
+
+    def get_available_agents_count(self) -> int:
+        """Count of agents currently available for calls."""
+        return self._adapter.get_available_agents_count()
+
+    def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        """Ids of available agents, longest-idle first."""
+        return self._adapter.get_available_agents(limit)
+
+    def register_agent(self, agent_id: str, skills: Iterable[str]) -> None:
+        """Set the skill tags (caller types, or "*" for any) an agent can be routed."""
+        skills = list(skills)
+        self._router.register_agent(agent_id, skills)
+        if self._routes_in_storage:
+            self._adapter.set_agent_skills(agent_id, skills)
 
     def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
         """Update availability status of an agent."""
         self._adapter.set_agent_status(agent_id, status, current_customer)
+        self._record(AGENT_STATUS, agent_id, status, current_customer, time.time())
+        self._assigned_seqs.pop(agent_id, None)
+        if status == "busy":
+            self._active_calls.setdefault(agent_id, (time.monotonic(), None))
+        else:
+            call = self._active_calls.pop(agent_id, None)
+            if call is not None:
+                self._wait_estimator.record_handle_time(agent_id, call[1], time.monotonic() - call[0])
+        self._wait_estimator.set_agent_online(agent_id, status in ("available", "busy"))
+        if status == "available":
+            self._router.mark_agent_idle(agent_id)
+        else:
+            self._router.mark_agent_unavailable(agent_id)
+        self._changed()
 
     def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """Retrieve current status of an agent."""
         return self._adapter.get_agent_status(agent_id)
 
+    def get_assigned_agent(self, email: str) -> Optional[str]:
+        """Agent currently busy with the customer, from the shared queue state."""
+        return self._adapter.get_assigned_agent(email)
+
+    def _is_agent_available(self, agent_id: str) -> bool:
+        status_info = self._adapter.get_agent_status(agent_id)
+        return bool(status_info) and status_info.get("status") == "available"
+
+    def _on_assigned(self, agent_id: str, customer: Dict[str, Any]) -> None:
+        self._record(REMOVE, customer["email"])
+        self._record(AGENT_STATUS, agent_id, "busy", customer["email"], time.time())
+        self._assigned_seqs[agent_id] = (customer["email"], self._router.discard_customer(customer["email"]))
+        self._router.mark_agent_unavailable(agent_id)
+        self._active_calls[agent_id] = (time.monotonic(), customer["caller_type"])
+        self._wait_estimator.set_agent_online(agent_id, True)
+        customer["agent_id"] = agent_id
+        self._changed()
+
+    def _assign(self, email: str, agent_id: str) -> Optional[Dict[str, Any]]:
+        """Claim a routed customer for an agent and keep the router in sync."""
+        customer = self._adapter.assign_customer(email, agent_id)
+        if customer:
+            self._on_assigned(agent_id, customer)
+        elif self._adapter.get_customer_position(email) is None:
+            # Already gone (removed or assigned elsewhere); drop the stale routing entry
+            self._router.discard_customer(email)
+        return customer
+
     def try_assign_customer(self, agent_id: str) -> Optional[Dict[str, Any]]:
         """
-        Check if an agent is available and there's a waiting customer.
-        If yes, pops the customer, sets agent status to busy, and returns the customer.
+        Check if an agent is available and there's a waiting customer they are skilled for.
+        If yes, takes the highest-priority, longest-waiting such customer, sets agent
+        status to busy, and returns the customer.
         """
-        status_info = self._adapter.get_agent_status(agent_id)
-        if not status_info or status_info.get("status") != "available":
+        if self._routes_in_storage:
+            customer = self._adapter.route_next_customer(agent_id)
+            if customer:
+                self._on_assigned(agent_id, customer)
+            return customer
+
+        if not self._is_agent_available(agent_id):
             return None
 
-        customer = self._adapter.pop_next_customer()
+        skills = self._router.get_agent_skills(agent_id)
+        while True:
+            email = self._router.next_customer_for(skills)
+            if email is None:
+                break
+            customer = self._assign(email, agent_id)
+            if customer:
+                return customer
+            if self._router.get_customer_caller_type(email) is not None:
+                # Customer is still waiting, so the agent is the one that is no longer free
+                return None
+
+        # Customers the router has not seen (e.g. enqueued before a restart on a
+        # persistent adapter) are still served in plain FIFO order.
+        customer = self._adapter.assign_next_customer(agent_id, None if ANY_SKILL in skills else skills)
         if customer:
-            self._adapter.set_agent_status(agent_id, "busy", customer["email"])
+            self._on_assigned(agent_id, customer)
+        return customer
+
+    def try_assign_agent_to_customer(self, email: str, agent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        If the customer is the next one to route and a skilled agent is available,
+        assign them and set the agent status to busy. Without an explicit `agent_id`
+        the longest-idle agent skilled for the customer's caller type is chosen.
+        The assigned agent is returned in the customer's "agent_id" field.
+        """
+        if self._routes_in_storage:
+            customer = self._adapter.route_customer(email, agent_id)
+            if customer:
+                self._on_assigned(customer["agent_id"], customer)
             return customer
-        return None
 
-    def try_assign_agent_to_customer(self, email: str, agent_id: str = "agent_a") -> Optional[Dict[str, Any]]:
-        """
-        If a customer is first in queue and the specified agent is available,
-        assign them and set the agent status to busy.
-        """
-        position = self._adapter.get_customer_position(email)
-        if position == 1:
-            status_info = self._adapter.get_agent_status(agent_id)
-            if status_info and status_info.get("status") == "available":
-                peek_customer = self._adapter.peek_next_customer()
-                if peek_customer and peek_customer["email"] == email:
-                    customer = self._adapter.pop_next_customer()
-                    if customer:
-                        self._adapter.set_agent_status(agent_id, "busy", customer["email"])
-                        return customer
-        return None
+        caller_type = self._router.get_customer_caller_type(email)
+        routed = caller_type is not None
+        if not routed:
+            # Not seen by the router: only the FIFO head may be assigned
+            head = self._adapter.peek_next_customer()
+            if not head or head["email"] != email:
+                return None
+            caller_type = head["caller_type"]
+
+        if agent_id is None:
+            agent_id = self._router.best_agent_for(caller_type)
+            if agent_id is None:
+                return None
+        elif not self._is_agent_available(agent_id):
+            return None
+
+        skills = self._router.get_agent_skills(agent_id)
+        if ANY_SKILL not in skills and caller_type not in skills:
+            return None
+        if routed and self._router.next_customer_for(skills) != email:
+            return None
+        return self._assign(email, agent_id)
+
+    def release_assignment(self, customer: Dict[str, Any]) -> bool:
+        """
+        Undo an assignment whose room could not be set up: put the customer back where
+        they were waiting and, if the agent is still busy with them, make the agent
+        available again without recording a handle time. Returns whether the customer
+        was requeued (False if they had already joined the queue again).
+        """
+        email, agent_id = customer["email"], customer["agent_id"]
+        assigned = self._assigned_seqs.get(agent_id)
+        requeued = self._adapter.requeue_customer(customer)
+        if requeued:
+            self._record(REQUEUE, email, customer["caller_type"], customer["timestamp"].timestamp())
+            if not self._routes_in_storage and assigned and assigned[0] == email and assigned[1] is not None:
+                self._router.requeue_customer(email, customer["caller_type"], assigned[1])
+        status = self._adapter.get_agent_status(agent_id)
+        if status and status["status"] == "busy" and status["current_customer"] == email:
+            self._active_calls.pop(agent_id, None)
+            self.set_agent_status(agent_id, "available")
+        elif requeued:
+            self._changed()
+        return requeued
+
+    def calculate_wait_time(self, position: int, caller_type: Optional[str] = None) -> int:
+        """Estimate wait time from queue position and observed handle times for the caller type."""
+        return self._wait_estimator.estimate_wait(position, self._adapter.get_available_agents_count(), caller_type)
 
-    def calculate_wait_time(self, position: int) -> int:
-        """Calculate wait time estimation based on queue position."""
-        agents = self._adapter.get_available_agents_count()
-        if agents == 0:
-            return 300  # Default 5 minutes
-        return (position * 300) // max(agents, 1)
+    def get_handle_time_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Observed handle times (mean, p50, p90) per caller type."""
+        return self._wait_estimator.get_stats()
 
-    def _build_status_response(self, position: int) -> Dict[str, Any]:
+    def _build_status_response(self, position: int, caller_type: Optional[str] = None) -> Dict[str, Any]:
         """Utility to format customer queue state."""
         return {
             "position": position,
-            "estimated_wait_time": self.calculate_wait_time(position),
+            "estimated_wait_time": self.calculate_wait_time(position, caller_type),
             "total_waiting": self._adapter.get_queue_length(),
             "agents_available": self._adapter.get_available_agents_count()
         }
 
 
-# Global instantiation with the primary InMemory adapter
-queue_manager = QueueManager(InMemoryQueueAdapter())
+# ---------------------------------------------------------
+# asyncio front-end: per-key locking around the deep module
+# ---------------------------------------------------------
+class _KeyedLocks:
+    """asyncio.Lock per key, created on demand and dropped once nobody holds or awaits it."""
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str):
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                del self._users[key]
+                del self._locks[key]
+
+
+class AsyncQueueManager:
+    """
+    asyncio-native variant of QueueManager for FastAPI handlers.
+
+    Correctness comes from the adapter's compare-and-swap `assign_customer`:
+    a customer is only handed out while the agent is still available, so
+    interleaved requests can never double-assign. On top of that, calls for the
+    same agent (or the same customer) are serialized with per-key locks so they
+    don't race each other into wasted CAS failures, while calls for different
+    agents and customers proceed concurrently; there is no global lock.
+    Adapters that block on I/O are run in worker threads.
+    """
+    def __init__(self, manager: QueueManager, offload: Optional[bool] = None):
+        self._manager = manager
+        self._offload = manager.blocking_io if offload is None else offload
+        self._agent_locks = _KeyedLocks()
+        self._customer_locks = _KeyedLocks()
+
+    @property
+    def manager(self) -> QueueManager:
+        return self._manager
+
+    @property
+    def version(self) -> int:
+        return self._manager.version
+
+    def add_change_listener(self, listener: Callable[[], None]) -> None:
+        self._manager.add_change_listener(listener)
+
+    async def _run(self, func, *args):
+        if self._offload:
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def add_customer(self, email: str, caller_type: str) -> Dict[str, Any]:
+        async with self._customer_locks.hold(email):
+            return await self._run(self._manager.add_customer, email, caller_type)
+
+    async def get_customer_status(self, email: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._manager.get_customer_status, email)
+
+    async def add_customers(self, customers: Iterable[Tuple[str, str]]) -> Dict[str, Any]:
+        # No per-customer locks: enqueueing a waiting customer again is a no-op
+        return await self._run(self._manager.add_customers, list(customers))
+
+    async def get_customer_statuses(self, emails: Iterable[str]) -> Dict[str, Any]:
+        return await self._run(self._manager.get_customer_statuses, list(emails))
+
+    async def remove_customer(self, email: str) -> Optional[Dict[str, Any]]:
+        async with self._customer_locks.hold(email):
+            return await self._run(self._manager.remove_customer, email)
+
+    async def get_queue_length(self) -> int:
+        return await self._run(self._manager.get_queue_length)
+
+    async def get_available_agents_count(self) -> int:
+        return await self._run(self._manager.get_available_agents_count)
+
+    async def get_available_agents(self, limit: Optional[int] = None) -> List[str]:
+        return await self._run(self._manager.get_available_agents, limit)
+
+    async def register_agent(self, agent_id: str, skills: Iterable[str]) -> None:
+        await self._run(self._manager.register_agent, agent_id, list(skills))
+
+    def get_handle_time_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        # In-process counters only, nothing to offload
+        return self._manager.get_handle_time_stats()
+
+    async def set_agent_status(self, agent_id: str, status: str, current_customer: Optional[str] = None) -> None:
+        async with self._agent_locks.hold(agent_id):
+            await self._run(self._manager.set_agent_status, agent_id, status, current_customer)
+
+    async def get_agent_status(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        return await self._run(self._manager.get_agent_status, agent_id)
+
+    async def get_assigned_agent(self, email: str) -> Optional[str]:
+        return await self._run(self._manager.get_assigned_agent, email)
+
+    async def try_assign_customer(self, agent_id: str) -> Optional[Dict[str, Any]]:
+        async with self._agent_locks.hold(agent_id):
+            return await self._run(self._manager.try_assign_customer, agent_id)
+
+    async def try_assign_agent_to_customer(self, email: str, agent_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        async with self._customer_locks.hold(email):
+            if agent_id is None:
+                return await self._run(self._manager.try_assign_agent_to_customer, email)
+            async with self._agent_locks.hold(agent_id):
+                return await self._run(self._manager.try_assign_agent_to_customer, email, agent_id)
+
+    async def release_assignment(self, customer: Dict[str, Any]) -> bool:
+        async with self._customer_locks.hold(customer["email"]):
+            async with self._agent_locks.hold(customer["agent_id"]):
+                return await self._run(self._manager.release_assignment, customer)
+
+
+def _create_default_adapter() -> QueueAdapter:
+    """
+    Redis adapter when QUEUE_REDIS_URL is set (shared by all workers), persistent
+    SQLite adapter when QUEUE_DATABASE_URL is set, otherwise the InMemory adapter.
+    """
+    redis_url = os.getenv("QUEUE_REDIS_URL")
+    if redis_url:
+        return RedisQueueAdapter(redis_url)
+    database_url = os.getenv("QUEUE_DATABASE_URL")
+    if database_url:
+        return DatabaseQueueAdapter(database_url)
+    return InMemoryQueueAdapter()
+
+
+def _create_default_manager() -> QueueManager:
+    """
+    QueueManager over the configured adapter. With the in-memory adapter and
+    QUEUE_JOURNAL_DIR set, queue state is journaled there and recovered on start.
+    """
+    adapter = _create_default_adapter()
+    journal_dir = os.getenv("QUEUE_JOURNAL_DIR")
+    if journal_dir and isinstance(adapter, InMemoryQueueAdapter):
+        return QueueManager(adapter, journal=QueueJournal(journal_dir))
+    return QueueManager(adapter)
+
+
+# Global instantiation with the configured adapter
+queue_manager = _create_default_manager()
+async_queue_manager = AsyncQueueManager(queue_manager)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel keyed by string ids.
+
+    Deadlines are rounded up to whole ticks and stored in slot
+    `deadline % slots`. Scheduling, rescheduling and cancelling are O(1);
+    advancing visits only the slots for the ticks that elapsed, and an entry
+    whose deadline is more than one revolution away is simply left in place
+    until a later pass, so expiry is O(1) amortized per timer.
+    Not thread-safe; drive it from a single event loop.
+    """
+    def __init__(self, tick: float = 1.0, slots: int = 512, clock: Callable[[], float] = time.monotonic):
+        self._tick = tick
+        self._clock = clock
+        self._slots: List[Set[str]] = [set() for _ in range(slots)]
+        # key -> deadline, in ticks
+        self._deadlines: Dict[str, int] = {}
+        self._current = int(clock() / tick)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._deadlines
+
+    def schedule(self, key: str, delay: float) -> None:
+        """(Re)arm `key` to expire `delay` seconds from now."""
+        deadline = max(self._current + 1, math.ceil((self._clock() + delay) / self._tick))
+        self.cancel(key)
+        self._deadlines[key] = deadline
+        self._slots[deadline % len(self._slots)].add(key)
+
+    def cancel(self, key: str) -> None:
+        deadline = self._deadlines.pop(key, None)
+        if deadline is not None:
+            self._slots[deadline % len(self._slots)].discard(key)
+
+    def advance(self) -> List[str]:
+        """Move to the current time and return the keys whose deadline has passed."""
+        target = int(self._clock() / self._tick)
+        expired = []
+        # After a full revolution every slot has been visited once; no need to go round again
+        for tick in range(self._current + 1, self._current + 1 + min(target - self._current, len(self._slots))):
+            slot = self._slots[tick % len(self._slots)]
+            for key in [key for key in slot if self._deadlines[key] <= target]:
+                slot.discard(key)
+                del self._deadlines[key]
+                expired.append(key)
+        self._current = max(self._current, target)
+        return expired
+
+
+class PresenceTracker:
+    """
+    Evicts waiting customers who have gone away.
+
+    A customer with an open WebSocket is present and has no timer. Without
+    one, every queue poll (or the initial join) re-arms a `ttl` timer; closing
+    the socket arms a shorter `grace_period` timer so a page reload can
+    reconnect without losing its place. When a timer fires the customer is
+    removed from the queue, so agents never pop abandoned entries and
+    positions/ETAs stop counting them. A ttl of 0 disables eviction.
+    """
+    def __init__(
+        self,
+        queue,
+        ttl: float = 60.0,
+        grace_period: float = 30.0,
+        tick: float = 1.0,
+        on_evict: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._queue = queue
+        self._ttl = ttl
+        self._grace_period = grace_period
+        self._tick = tick
+        self._on_evict = on_evict
+        self._wheel = TimerWheel(tick, clock=clock)
+        self._connected: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._ttl > 0
+
+    def start(self) -> None:
+        """Start the eviction loop on the running event loop; call from app startup."""
+        if self.enabled and self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def seen(self, email: str) -> None:
+        """The customer joined or polled over HTTP."""
+        if self.enabled and email not in self._connected:
+            self._wheel.schedule(email, self._ttl)
+
+    def connected(self, email: str) -> None:
+        """The customer's WebSocket identified itself; they stay queued while it is open."""
+        self._connected.add(email)
+        self._wheel.cancel(email)
+
+    def disconnected(self, email: str) -> None:
+        """The customer's WebSocket closed; give them `grace_period` to come back."""
+        self._connected.discard(email)
+        if self.enabled:
+            self._wheel.schedule(email, min(self._grace_period, self._ttl))
+
+    def forget(self, email: str) -> None:
+        """The customer left the queue (assigned or removed); stop tracking them."""
+        self._connected.discard(email)
+        self._wheel.cancel(email)
+
+    async def evict_expired(self) -> List[str]:
+        """Remove every customer whose timer has fired; returns the evicted emails."""
+        evicted = []
+        for email in self._wheel.advance():
+            if email in self._connected:
+                continue
+            if await self._queue.remove_customer(email):
+                evicted.append(email)
+                if self._on_evict:
+                    self._on_evict(email)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} abandoned customers from the queue")
+        return evicted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._tick)
+            try:
+                await self.evict_expired()
+            except Exception as e:
+                logger.error(f"Queue eviction pass failed: {e}")
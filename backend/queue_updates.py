@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import zlib
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def position_version(position: int, estimated_wait_time: int) -> int:
+    """
+    Version of one customer's queue status, derived from their position and ETA only.
+    Pushes carry it and /api/queue/status uses it as the ETag, so a poller gets a
+    304 until something it would actually display has changed.
+    """
+    return zlib.crc32(f"{position}:{estimated_wait_time}".encode())
+
+
+class QueuePositionNotifier:
+    """
+    Pushes queue position/ETA updates to waiting customers over their WebSocket.
+
+    Queue changes only mark the notifier dirty; one flush runs per `coalesce_delay`
+    window no matter how many dequeues happened in it. A flush reads the
+    positions of every customer with an open socket in one batch and sends a
+    `queue_position` message only to those whose position or ETA actually
+    changed since the last push, all in one concurrent batch.
+    """
+    def __init__(
+        self,
+        queue,
+        get_customer_emails: Callable[[], Iterable[str]],
+        send: Callable[[str, dict], Awaitable[None]],
+        coalesce_delay: float = 0.2,
+    ):
+        self._queue = queue
+        self._get_customer_emails = get_customer_emails
+        self._send = send
+        self._coalesce_delay = coalesce_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flush_pending = False
+        # email -> (position, estimated_wait_time) last pushed
+        self._last_sent: Dict[str, Tuple[int, int]] = {}
+
+    def start(self) -> None:
+        """Bind to the running event loop; call from app startup."""
+        self._loop = asyncio.get_running_loop()
+
+    def mark_dirty(self) -> None:
+        """Queue state changed. Safe to call from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._schedule_flush)
+
+    def forget(self, email: str) -> None:
+        """Drop push state for a customer who left the queue or disconnected."""
+        self._last_sent.pop(email, None)
+
+    def _schedule_flush(self) -> None:
+        if self._flush_pending:
+            return
+        self._flush_pending = True
+        self._loop.call_later(self._coalesce_delay, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self) -> None:
+        self._flush_pending = False
+        emails = list(self._get_customer_emails())
+        if not emails:
+            return
+        # One snapshot read for every connected customer, not a round trip each
+        snapshot = await self._queue.get_customer_statuses(emails)
+        shared = {
+            "total_waiting": snapshot["total_waiting"],
+            "agents_available": snapshot["agents_available"]
+        }
+        sends = []
+        for email, status in snapshot["customers"].items():
+            if status is None:
+                self.forget(email)
+                continue
+            position = (status["position"], status["estimated_wait_time"])
+            if self._last_sent.get(email) == position:
+                continue
+            self._last_sent[email] = position
+            sends.append(self._send(email, {
+                "type": "queue_position",
+                "email": email,
+                "version": position_version(*position),
+                **status,
+                **shared
+            }))
+        if sends:
+            results = await asyncio.gather(*sends, return_exceptions=True)
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            if failed:
+                logger.warning(f"Queue position push failed for {failed}/{len(sends)} customers")
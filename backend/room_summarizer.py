@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _RoomSummary:
+    def __init__(self):
+        self.summary = ""
+        self.pending: List[str] = []
+        self.segments = 0
+        self.updated_at: Optional[str] = None
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+
+class RoomSummarizer:
+    """
+    Keeps a rolling summary of every room being transcribed.
+
+    Final transcript segments are buffered per room. Once `every_segments`
+    of them are waiting, or `every_seconds` have passed with any waiting,
+    the room's worker task folds only the new text into the previous summary
+    with one `summarize(previous_summary, new_text)` call. Refreshes of one
+    room never overlap; rooms refresh independently. A failed call keeps the
+    segments buffered for the next attempt. Transfers read the latest
+    summary with `latest()` instead of waiting on the LLM.
+    Only rooms between `start_room()` and `stop_room()` are summarized;
+    segments for any other room, such as late transcript callbacks after
+    transcription stopped, are dropped.
+    """
+    def __init__(
+        self,
+        summarize: Callable[[str, str], Awaitable[Optional[str]]],
+        every_segments: int = 5,
+        every_seconds: float = 30.0
+    ):
+        self._summarize = summarize
+        self._every_segments = every_segments
+        self._every_seconds = every_seconds
+        self._rooms: Dict[str, _RoomSummary] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Bind to the running event loop; call from app startup."""
+        self._loop = asyncio.get_running_loop()
+
+    async def stop(self) -> None:
+        for room_name in list(self._rooms):
+            await self.stop_room(room_name)
+
+    def on_segment(self, segment: Dict[str, Any]) -> None:
+        """Transcript callback for RoomTranscriptionManager. Safe to call from any thread."""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._add_segment, segment)
+
+    def _add_segment(self, segment: Dict[str, Any]) -> None:
+        text = (segment.get("text") or "").strip()
+        if not text or not segment.get("is_final", True):
+            return
+        room = self._rooms.get(segment["room_name"])
+        if room is None or room.task is None:
+            return  # transcription was never started for this room, or has stopped
+        room.pending.append(f"{segment.get('speaker', 'unknown')}: {text}")
+        if len(room.pending) >= self._every_segments:
+            room.wakeup.set()
+
+    async def refresh(self, room_name: str) -> Optional[str]:
+        """Fold the room's buffered segments into its summary now; returns the summary."""
+        room = self._rooms.get(room_name)
+        if room is None:
+            return None
+        if room.pending:
+            # Segments that arrive during the call stay buffered for the next refresh
+            count = len(room.pending)
+            summary = await self._summarize(room.summary, "\n".join(room.pending[:count]))
+            if summary:
+                room.summary = summary
+                room.segments += count
+                room.updated_at = datetime.now().isoformat()
+                del room.pending[:count]
+        return room.summary or None
+
+    def latest(self, room_name: str) -> Optional[Dict[str, Any]]:
+        """The room's current summary, how many segments it covers and how many are still pending."""
+        room = self._rooms.get(room_name)
+        if room is None or not room.summary:
+            return None
+        return {
+            "summary": room.summary,
+            "segments": room.segments,
+            "pending_segments": len(room.pending),
+            "updated_at": room.updated_at
+        }
+
+    def start_room(self, room_name: str) -> None:
+        """Start refreshing a room (transcription started); an earlier summary is kept and extended."""
+        room = self._rooms.get(room_name)
+        if room is None:
+            room = self._rooms[room_name] = _RoomSummary()
+        if room.task is None:
+            room.task = asyncio.ensure_future(self._run(room_name, room))
+
+    async def stop_room(self, room_name: str) -> None:
+        """Stop refreshing a room (transcription stopped); its last summary stays readable."""
+        room = self._rooms.get(room_name)
+        if room is None or room.task is None:
+            return
+        room.task.cancel()
+        try:
+            await room.task
+        except asyncio.CancelledError:
+            pass
+        room.task = None
+
+    async def forget(self, room_name: str) -> None:
+        """Drop everything about a room (the room was cleaned up)."""
+        await self.stop_room(room_name)
+        self._rooms.pop(room_name, None)
+
+    async def _run(self, room_name: str, room: _RoomSummary) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(self._every_seconds):
+                    await room.wakeup.wait()
+            except TimeoutError:
+                pass
+            room.wakeup.clear()
+            try:
+                await self.refresh(room_name)
+            except Exception as e:
+                logger.error(f"Rolling summary refresh failed for room {room_name}: {e}")
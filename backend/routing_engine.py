@@ -0,0 +1,170 @@
+import heapq
+import threading
+import time
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Lower value is served first. Caller types missing from this map are served last.
+CALLER_TYPE_PRIORITY = {
+    "investor": 0,
+    "prospect": 1,
+}
+
+# Skill tag that lets an agent take any caller type
+ANY_SKILL = "*"
+DEFAULT_AGENT_SKILLS = frozenset({ANY_SKILL})
+
+
+class RoutingEngine:
+    """
+    Skills- and priority-based matcher between waiting customers and idle agents.
+
+    Waiting customers live in one FIFO heap per `caller_type`, keyed by an
+    arrival sequence number. Idle agents live in one heap per skill tag, keyed
+    by the moment they became available, so the head of a heap is the
+    longest-idle agent with that skill. Both sides use lazy deletion: a
+    heap entry is only valid while it matches the live record for that
+    customer/agent, and stale heads are discarded on the next lookup. With a
+    fixed number of caller types and skills every lookup is O(log n) amortized.
+    Public methods take a short internal lock so QueueManager may be driven
+    from worker threads; the lock never covers adapter I/O.
+    """
+
+    def __init__(self, priorities: Optional[Dict[str, int]] = None):
+        self._priorities = dict(priorities or CALLER_TYPE_PRIORITY)
+        self._lowest_priority = max(self._priorities.values(), default=0) + 1
+        # caller_type -> heap of (seq, email)
+        self._customer_heaps: Dict[str, List[Tuple[int, str]]] = {}
+        # email -> (seq, caller_type) of the live heap entry
+        self._customers: Dict[str, Tuple[int, str]] = {}
+        self._next_customer_seq = 0
+        # agent_id -> skill tags
+        self._agent_skills: Dict[str, FrozenSet[str]] = {}
+        # skill -> heap of (idle_since, token, agent_id)
+        self._idle_heaps: Dict[str, List[Tuple[float, int, str]]] = {}
+        # agent_id -> (token, idle_since) of the agent's live idle entries
+        self._idle_agents: Dict[str, Tuple[int, float]] = {}
+        self._next_idle_token = 0
+        self._lock = threading.RLock()
+
+    # -----------------------------------------------------
+    # Customers
+    # -----------------------------------------------------
+    def enqueue_customer(self, email: str, caller_type: str) -> None:
+        """Track a waiting customer. Re-enqueueing a waiting customer is a no-op."""
+        with self._lock:
+            if email in self._customers:
+                return
+            self._next_customer_seq += 1
+            seq = self._next_customer_seq
+            self._customers[email] = (seq, caller_type)
+            heapq.heappush(self._customer_heaps.setdefault(caller_type, []), (seq, email))
+
+    def enqueue_customers(self, customers: Iterable[Tuple[str, str]]) -> None:
+        """Track many (email, caller_type) pairs in arrival order under one lock."""
+        with self._lock:
+            for email, caller_type in customers:
+                if email in self._customers:
+                    continue
+                self._next_customer_seq += 1
+                seq = self._next_customer_seq
+                self._customers[email] = (seq, caller_type)
+                # seq exceeds every queued seq, so appending keeps the heap invariant
+                self._customer_heaps.setdefault(caller_type, []).append((seq, email))
+
+    def discard_customer(self, email: str) -> Optional[int]:
+        """
+        Forget a customer that left the queue; their heap entry is dropped lazily.
+        Returns the arrival sequence number they had, for `requeue_customer`.
+        """
+        with self._lock:
+            record = self._customers.pop(email, None)
+            return record[0] if record else None
+
+    def requeue_customer(self, email: str, caller_type: str, seq: int) -> None:
+        """Track a customer again at the arrival sequence number `discard_customer` returned."""
+        with self._lock:
+            if email in self._customers:
+                return
+            self._customers[email] = (seq, caller_type)
+            heapq.heappush(self._customer_heaps.setdefault(caller_type, []), (seq, email))
+
+    def get_customer_caller_type(self, email: str) -> Optional[str]:
+        record = self._customers.get(email)
+        return record[1] if record else None
+
+    def _customer_head(self, caller_type: str) -> Optional[Tuple[int, str]]:
+        heap = self._customer_heaps.get(caller_type)
+        while heap:
+            seq, email = heap[0]
+            record = self._customers.get(email)
+            if record is not None and record[0] == seq:
+                return seq, email
+            heapq.heappop(heap)
+        return None
+
+    def next_customer_for(self, skills: Iterable[str]) -> Optional[str]:
+        """Highest-priority, longest-waiting customer an agent with `skills` can serve."""
+        with self._lock:
+            skills = frozenset(skills)
+            caller_types = self._customer_heaps.keys() if ANY_SKILL in skills else skills
+            best = None
+            for caller_type in list(caller_types):
+                head = self._customer_head(caller_type)
+                if head is None:
+                    continue
+                rank = (self._priorities.get(caller_type, self._lowest_priority), head[0])
+                if best is None or rank < best[0]:
+                    best = (rank, head[1])
+            return best[1] if best else None
+
+    # -----------------------------------------------------
+    # Agents
+    # -----------------------------------------------------
+    def register_agent(self, agent_id: str, skills: Iterable[str]) -> None:
+        """Set an agent's skill tags. An idle agent keeps their idle-since time."""
+        with self._lock:
+            self._agent_skills[agent_id] = frozenset(skills) or DEFAULT_AGENT_SKILLS
+            idle = self._idle_agents.pop(agent_id, None)
+            if idle is not None:
+                self.mark_agent_idle(agent_id, idle[1])
+
+    def get_agent_skills(self, agent_id: str) -> FrozenSet[str]:
+        return self._agent_skills.get(agent_id, DEFAULT_AGENT_SKILLS)
+
+    def mark_agent_idle(self, agent_id: str, idle_since: Optional[float] = None) -> None:
+        """Record that an agent became available. Already-idle agents keep their place."""
+        with self._lock:
+            if agent_id in self._idle_agents:
+                return
+            if idle_since is None:
+                idle_since = time.monotonic()
+            self._next_idle_token += 1
+            token = self._next_idle_token
+            self._idle_agents[agent_id] = (token, idle_since)
+            for skill in self.get_agent_skills(agent_id):
+                heapq.heappush(self._idle_heaps.setdefault(skill, []), (idle_since, token, agent_id))
+
+    def mark_agent_unavailable(self, agent_id: str) -> None:
+        """Record that an agent went busy or offline; their idle entries are dropped lazily."""
+        with self._lock:
+            self._idle_agents.pop(agent_id, None)
+
+    def _idle_head(self, skill: str) -> Optional[Tuple[float, int, str]]:
+        heap = self._idle_heaps.get(skill)
+        while heap:
+            idle_since, token, agent_id = heap[0]
+            idle = self._idle_agents.get(agent_id)
+            if idle is not None and idle[0] == token:
+                return heap[0]
+            heapq.heappop(heap)
+        return None
+
+    def best_agent_for(self, caller_type: str) -> Optional[str]:
+        """Longest-idle agent skilled for `caller_type`, or None if nobody can take it."""
+        with self._lock:
+            best = None
+            for skill in (caller_type, ANY_SKILL):
+                head = self._idle_head(skill)
+                if head is not None and (best is None or head < best):
+                    best = head
+            return best[2] if best else None
@@ -0,0 +1,81 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+
+def summary_cache_key(conversation_text: str, caller_type: str, model: str) -> str:
+    """
+    Hash of the inputs that decide a summary's content.
+
+    Whitespace is collapsed first, so the same conversation re-joined with
+    different line breaks or padding still hits.
+    """
+    normalized = " ".join(conversation_text.split())
+    digest = hashlib.sha256()
+    for part in (model, caller_type, normalized):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Size-bounded LRU cache of generated summaries with a per-entry TTL.
+
+    Lookups and inserts are O(1); expired entries are dropped when they are
+    read, and the least recently used entry is evicted when the cache is
+    full. Counts hits, misses, evictions and expirations for `stats()`.
+    Not thread-safe; use it from the event loop.
+    """
+    def __init__(self, max_entries: int = 1024, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._clock = clock
+        # key -> (expires_at, summary)
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: str, summary: str) -> None:
+        if self._max_entries <= 0 or self._ttl <= 0:
+            return
+        self._entries[key] = (self._clock() + self._ttl, summary)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self._max_entries,
+            "ttl_seconds": self._ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Checks that the multi-worker notification buses deliver a message only to
+the worker holding a subscriber for its topic, and that a server-side join
+reaches sockets held by another worker. The Redis bus runs on fakeredis
+(skipped when it is not installed); the Unix socket bus binds in a temp
+directory.
+"""
+import asyncio
+import os
+import sys
+
+import orjson
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from notification_bus import RedisNotificationBus, UnixSocketNotificationBus
+from websocket_hub import ConnectionHub, customer_topic, room_topic
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, frame):
+        self.frames.append(orjson.loads(frame))
+
+    async def close(self, code=1000):
+        pass
+
+    def received(self, message_type):
+        return [frame for frame in self.frames if frame.get("type") == message_type]
+
+
+async def eventually(predicate, timeout=2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached in time"
+        await asyncio.sleep(0.01)
+
+
+def open_socket(hub, topic):
+    websocket = FakeWebSocket()
+    hub.subscribe(hub.connect(websocket), topic)
+    return websocket
+
+
+def record_applied(bus):
+    applied = []
+    apply = bus._apply
+
+    def spy(envelope):
+        applied.append(envelope["op"])
+        apply(envelope)
+
+    bus._apply = spy
+    return applied
+
+
+async def check_delivery_and_join(make_bus, owners_synced):
+    hubs = [ConnectionHub(heartbeat_interval=0) for _ in range(3)]
+    publisher, owner, bystander = buses = [make_bus(hub, worker_id) for hub, worker_id in zip(hubs, "abc")]
+    for bus in buses:
+        await bus.start()
+    try:
+        customer = open_socket(owner.hub, customer_topic("c@x"))
+        open_socket(bystander.hub, customer_topic("other@x"))
+        await owners_synced(buses, customer_topic("c@x"))
+        applied = record_applied(bystander)
+
+        await publisher.publish([customer_topic("c@x")], {"type": "queue_position", "position": 1})
+        await eventually(lambda: customer.received("queue_position"))
+        assert customer.received("queue_position")[0]["position"] == 1
+
+        # The server joins the customer, held by another worker, to their room
+        await publisher.join([customer_topic("c@x")], room_topic("room1"))
+        await eventually(lambda: owner.hub.subscriber_count(room_topic("room1")) == 1)
+        await owners_synced(buses, room_topic("room1"))
+        await publisher.publish([room_topic("room1")], {"type": "call_summary"})
+        await eventually(lambda: customer.received("call_summary"))
+
+        # Nothing was forwarded to the worker without a subscriber
+        assert applied == []
+        assert publisher.hub.subscriber_count(room_topic("room1")) == 0
+    finally:
+        for bus in buses:
+            await bus.stop()
+        for hub in hubs:
+            for connection in hub.connections():
+                await hub.disconnect(connection)
+
+
+def test_redis_bus_delivers_to_owning_worker_and_joins_across_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+
+    def make_bus(hub, worker_id):
+        client = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+        return RedisNotificationBus(hub, client=client, worker_id=worker_id)
+
+    async def owners_synced(buses, topic):
+        deadline = asyncio.get_running_loop().time() + 2.0
+        while await redis.smembers(f"warm_transfer:notify:owners:{topic}") != {"b"}:
+            assert asyncio.get_running_loop().time() < deadline, f"{topic} never claimed"
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await check_delivery_and_join(make_bus, owners_synced)
+        # Stopped workers give up their topics
+        assert await redis.keys("warm_transfer:notify:owners:*") == []
+
+    asyncio.run(scenario())
+
+
+def test_redis_bus_prunes_workers_that_died_without_cleanup():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    owners_key = "warm_transfer:notify:owners:" + customer_topic("c@x")
+
+    async def scenario():
+        bus = RedisNotificationBus(ConnectionHub(heartbeat_interval=0),
+                                   client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+                                   worker_id="a")
+        await bus.start()
+        await redis.sadd(owners_key, "crashed")
+        await bus.publish([customer_topic("c@x")], {"type": "queue_position"})
+        assert await redis.smembers(owners_key) == set()
+        await bus.stop()
+
+    asyncio.run(scenario())
+
+
+def test_unix_socket_bus_delivers_to_owning_worker_and_joins_across_workers(tmp_path):
+    directory = str(tmp_path)
+
+    def make_bus(hub, worker_id):
+        return UnixSocketNotificationBus(hub, directory, worker_id=worker_id)
+
+    async def owners_synced(buses, topic):
+        # Every other worker has heard worker b claim the topic
+        owner_path = os.path.join(directory, "worker-b.sock")
+        await eventually(lambda: all(owner_path in bus._owners.get(topic, ()) for bus in buses if bus is not buses[1]))
+
+    async def scenario():
+        await check_delivery_and_join(make_bus, owners_synced)
+        # Stopped workers remove their sockets
+        assert os.listdir(directory) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Checks that a notification socket cannot subscribe itself to another
+customer's or agent's topic, which carries their room tokens, nor to a room
+topic, which carries call summaries: only the server joins it to those. Runs
+the FastAPI app in process; LiveKit settings only need to be present, not
+valid.
+"""
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+for name in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET"):
+    os.environ.setdefault(name, "test")
+
+from fastapi.testclient import TestClient
+
+import main
+from websocket_hub import agent_topic, customer_topic, room_topic
+
+
+def receive_until_ack(ws):
+    messages = []
+    while True:
+        message = ws.receive_json()
+        if message["type"] == "acknowledgment":
+            return messages
+        messages.append(message)
+
+
+def test_client_subscriptions_are_rejected():
+    with TestClient(main.app) as client, client.websocket_connect("/ws/notifications") as ws:
+        topics = [customer_topic("victim@example.com"), agent_topic("agent_a"), room_topic("support_room")]
+        ws.send_json({"email": "me@example.com", "subscribe": topics})
+        errors = [message for message in receive_until_ack(ws) if message["type"] == "error"]
+        assert errors and errors[0]["topics"] == topics
+
+        assert main.websocket_hub.subscriber_count(customer_topic("victim@example.com")) == 0
+        assert main.websocket_hub.subscriber_count(agent_topic("agent_a")) == 0
+        assert main.websocket_hub.subscriber_count(room_topic("support_room")) == 0
+        assert main.websocket_hub.subscriber_count(customer_topic("me@example.com")) == 1
+
+        # The server joins participants to their room, as connect_assignment does
+        client.portal.call(main.notification_bus.join, [customer_topic("me@example.com")], room_topic("support_room"))
+        assert main.websocket_hub.subscriber_count(room_topic("support_room")) == 1
+        ws.send_json({"unsubscribe": [room_topic("support_room")]})
+        receive_until_ack(ws)
+        assert main.websocket_hub.subscriber_count(room_topic("support_room")) == 0
+
+        # Re-identifying moves the socket off its previous identity topic
+        ws.send_json({"email": "other@example.com"})
+        receive_until_ack(ws)
+        assert main.websocket_hub.subscriber_count(customer_topic("me@example.com")) == 0
+        assert main.websocket_hub.subscriber_count(customer_topic("other@example.com")) == 1
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Stress test for race-free assignment in AsyncQueueManager.
+Fires 10k concurrent agent pick / customer poll calls and checks that no customer
+is assigned twice, no agent is handed a second customer mid-call, and no
+customer is lost. Runs standalone or under pytest; needs no external services.
+"""
+import asyncio
+import functools
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queue_manager import AsyncQueueManager, DatabaseQueueAdapter, InMemoryQueueAdapter, QueueManager
+
+CUSTOMERS = 3000
+AGENTS = 40
+ASSIGN_CALLS = 10_000
+
+
+class InterleavingInMemoryAdapter(InMemoryQueueAdapter):
+    """
+    InMemoryQueueAdapter made safe for worker threads the way the SQLite adapter is:
+    every call runs under one lock, so each call (the assign CAS included) is atomic.
+    After each call the thread yields, so other threads run between the manager's
+    availability/routing reads and its CAS, as they would against shared storage.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        super().__init__()
+
+
+def _interleaved(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            result = method(self, *args, **kwargs)
+        time.sleep(0)
+        return result
+    return wrapper
+
+
+for _name in ("add_customer", "add_customers", "get_customer_position", "get_positions_snapshot",
+              "peek_next_customer", "pop_next_customer", "remove_customer", "get_queue_length",
+              "get_available_agents_count", "get_available_agents", "set_agent_status",
+              "get_agent_status", "assign_customer", "assign_next_customer"):
+    setattr(InterleavingInMemoryAdapter, _name, _interleaved(getattr(InMemoryQueueAdapter, _name)))
+
+
+async def run_assignment_stress(adapter, offload: bool) -> float:
+    """Run the stress scenario against `adapter` and return calls per second."""
+    manager = AsyncQueueManager(QueueManager(adapter), offload=offload)
+    emails = [f"customer{i}@example.com" for i in range(CUSTOMERS)]
+    agents = [f"agent_{i}" for i in range(AGENTS)]
+
+    for i, email in enumerate(emails):
+        await manager.add_customer(email, "investor" if i % 3 else "prospect")
+    for agent_id in agents:
+        await manager.set_agent_status(agent_id, "available")
+
+    assigned = {}  # email -> agent_id
+    on_call = {}   # agent_id -> email currently being served
+    violations = []
+
+    async def serve(customer):
+        email, agent_id = customer["email"], customer["agent_id"]
+        if email in assigned:
+            violations.append(f"{email} assigned to {assigned[email]} and {agent_id}")
+        assigned[email] = agent_id
+        if on_call.get(agent_id):
+            violations.append(f"{agent_id} got {email} while serving {on_call[agent_id]}")
+        on_call[agent_id] = email
+        await asyncio.sleep(0)  # let other calls interleave while the "call" is in progress
+        on_call[agent_id] = None
+        await manager.set_agent_status(agent_id, "available")
+
+    async def agent_pick(agent_id):
+        customer = await manager.try_assign_customer(agent_id)
+        if customer:
+            await serve(customer)
+
+    async def customer_poll(email):
+        customer = await manager.try_assign_agent_to_customer(email)
+        if customer:
+            await serve(customer)
+
+    rng = random.Random(42)
+    calls = [
+        agent_pick(rng.choice(agents)) if rng.random() < 0.5 else customer_poll(rng.choice(emails))
+        for _ in range(ASSIGN_CALLS)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - start
+
+    waiting = [email for email in emails if await manager.get_customer_status(email) is not None]
+    assert not violations, violations[:5]
+    assert assigned, "stress run made no assignments"
+    assert not set(waiting) & set(assigned), "assigned customers are still waiting"
+    assert len(waiting) + len(assigned) == CUSTOMERS, "customers were lost"
+    assert await manager.get_queue_length() == len(waiting)
+    return ASSIGN_CALLS / elapsed
+
+
+def test_in_memory_assignment_is_race_free():
+    # offload=True: calls run in worker threads and interleave between read and CAS
+    rate = asyncio.run(run_assignment_stress(InterleavingInMemoryAdapter(), offload=True))
+    print(f"in-memory (threaded): {rate:,.0f} calls/s")
+
+
+def test_sqlite_assignment_is_race_free_across_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        adapter = DatabaseQueueAdapter(os.path.join(tmp, "queue.db"))
+        try:
+            rate = asyncio.run(run_assignment_stress(adapter, offload=True))
+        finally:
+            adapter.close()
+    print(f"sqlite (threaded): {rate:,.0f} calls/s")
+
+
+if __name__ == "__main__":
+    test_in_memory_assignment_is_race_free()
+    test_sqlite_assignment_is_race_free_across_threads()
+    print("✅ No double assignments and no lost customers")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Checks that when the dispatcher cannot connect an assignment (e.g. room
+creation fails), the customer goes back to their place in the queue and the
+agent becomes available again, on every adapter. Redis tests use fakeredis
+and are skipped when fakeredis or lupa (needed for its Lua scripts) is not
+installed.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dispatcher import QueueDispatcher
+from queue_manager import AsyncQueueManager, DatabaseQueueAdapter, InMemoryQueueAdapter, QueueManager, RedisQueueAdapter
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def adapter(request):
+    if request.param == "memory":
+        yield InMemoryQueueAdapter()
+    elif request.param == "sqlite":
+        with tempfile.TemporaryDirectory() as tmp:
+            adapter = DatabaseQueueAdapter(os.path.join(tmp, "queue.db"))
+            yield adapter
+            adapter.close()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        yield RedisQueueAdapter(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+async def dispatch_and_deliver(dispatcher):
+    assignments = await dispatcher.dispatch_once()
+    await asyncio.gather(*list(dispatcher._pending))
+    return assignments
+
+
+def test_failed_delivery_requeues_customer_and_frees_agent(adapter):
+    manager = QueueManager(adapter)
+    queue = AsyncQueueManager(manager, offload=False)
+    delivered = []
+
+    async def create_room_fails(customer):
+        raise RuntimeError("LiveKit unavailable")
+
+    async def connect(customer):
+        delivered.append((customer["email"], customer["agent_id"]))
+
+    async def scenario():
+        manager.add_customer("p1@x", "prospect")
+        manager.add_customer("i1@x", "investor")
+        manager.add_customer("i2@x", "investor")
+        manager.set_agent_status("agent_a", "available")
+
+        failing = QueueDispatcher(queue, create_room_fails, retry_delay=0)
+        assignments = await dispatch_and_deliver(failing)
+        assert [customer["email"] for customer in assignments] == ["i1@x"]
+
+        # Back at the front, ahead of the investor who arrived later, and the agent is free
+        assert manager.get_queue_length() == 3
+        assert [manager.get_customer_status(email)["position"] for email in ("i1@x", "i2@x", "p1@x")] == [1, 2, 3]
+        agent = manager.get_agent_status("agent_a")
+        assert agent["status"] == "available" and agent["current_customer"] is None
+        assert manager.get_handle_time_stats() == {}
+
+        # The next pass routes the same customer again and this time connects them
+        working = QueueDispatcher(queue, connect)
+        await dispatch_and_deliver(working)
+        assert delivered == [("i1@x", "agent_a")]
+        assert manager.get_customer_status("i1@x") is None
+        assert manager.get_agent_status("agent_a")["current_customer"] == "i1@x"
+
+    asyncio.run(scenario())
+
+
+def test_release_leaves_agent_that_moved_on():
+    manager = QueueManager(InMemoryQueueAdapter())
+    manager.add_customer("i1@x", "investor")
+    manager.set_agent_status("agent_a", "available")
+    customer = manager.try_assign_customer("agent_a")
+    # The agent was taken offline before the failure was handled
+    manager.set_agent_status("agent_a", "offline")
+
+    assert manager.release_assignment(customer)
+    assert manager.get_customer_status("i1@x")["position"] == 1
+    assert manager.get_agent_status("agent_a")["status"] == "offline"
+    # Requeueing twice is a no-op
+    assert not manager.release_assignment(customer)
+    assert manager.get_queue_length() == 1
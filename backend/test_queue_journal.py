@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Checks that the in-memory queue comes back after a crash with the same
+positions and agent states: from the journal alone, from a snapshot plus the
+journal written after it, and after compaction has rotated segments away.
+A crash is simulated by closing the journal's file without the shutdown
+snapshot and building a fresh manager on the same directory.
+"""
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queue_journal import QueueJournal
+from queue_manager import InMemoryQueueAdapter, QueueManager
+
+
+def crash(manager):
+    # Drop the manager without QueueManager.close(), so no shutdown snapshot is taken
+    manager._journal.close()
+
+
+def recover(directory, snapshot_every=10_000):
+    return QueueManager(InMemoryQueueAdapter(), journal=QueueJournal(directory, snapshot_every=snapshot_every))
+
+
+def positions(manager, emails):
+    return [manager.get_customer_status(email)["position"] for email in emails]
+
+
+def journal_files(directory):
+    return sorted(name for name in os.listdir(directory) if not name.endswith(".tmp"))
+
+
+def fill(manager):
+    manager.add_customer("p1@x", "prospect")
+    manager.add_customer("i1@x", "investor")
+    manager.add_customer("p2@x", "prospect")
+    manager.add_customer("i2@x", "investor")
+    manager.set_agent_status("agent_a", "available")
+    manager.set_agent_status("agent_b", "offline")
+    assert manager.try_assign_customer("agent_a")["email"] == "i1@x"
+    manager.remove_customer("p2@x")
+
+
+def assert_recovered(manager):
+    assert manager.get_queue_length() == 2
+    assert manager.recovered_customers == ["p1@x", "i2@x"]
+    # Investors still route first after a restart
+    assert positions(manager, ["i2@x", "p1@x"]) == [1, 2]
+    agent_a = manager.get_agent_status("agent_a")
+    assert agent_a["status"] == "busy" and agent_a["current_customer"] == "i1@x"
+    assert manager.get_agent_status("agent_b")["status"] == "offline"
+    assert manager.get_customer_status("i1@x") is None
+    assert manager.get_customer_status("p2@x") is None
+
+
+def test_crash_recovery_replays_the_journal(tmp_path):
+    directory = str(tmp_path)
+    manager = recover(directory)
+    fill(manager)
+    crash(manager)
+
+    assert journal_files(directory) == ["journal-000000000000.log"]
+    restored = recover(directory)
+    assert_recovered(restored)
+
+    # The restored routing state serves the next agent in priority order
+    restored.set_agent_status("agent_b", "available")
+    assert restored.try_assign_customer("agent_b")["email"] == "i2@x"
+    assert positions(restored, ["p1@x"]) == [1]
+    restored.close()
+
+
+def test_recovery_from_snapshot_plus_journal_tail(tmp_path):
+    directory = str(tmp_path)
+    manager = recover(directory)
+    manager.add_customer("p1@x", "prospect")
+    manager.add_customer("i1@x", "investor")
+    manager._journal.snapshot()
+    # Written after the snapshot, so only the journal tail has these
+    manager.add_customer("p2@x", "prospect")
+    manager.add_customer("i2@x", "investor")
+    manager.set_agent_status("agent_a", "available")
+    manager.set_agent_status("agent_b", "offline")
+    manager.try_assign_customer("agent_a")
+    manager.remove_customer("p2@x")
+    crash(manager)
+
+    assert journal_files(directory) == ["journal-000000000001.log", "snapshot-000000000001.bin"]
+    assert_recovered(recover(directory))
+
+
+def test_compaction_rotates_and_drops_old_segments(tmp_path, monkeypatch):
+    directory = str(tmp_path)
+    manager = recover(directory, snapshot_every=3)
+    journal = manager._journal
+    record = journal.record
+
+    def record_and_compact(*event):
+        # A rotation is skipped while the previous compaction runs; wait so every one happens
+        record(*event)
+        if journal._compactor is not None:
+            journal._compactor.join()
+
+    monkeypatch.setattr(journal, "record", record_and_compact)
+    fill(manager)
+    crash(manager)
+
+    files = journal_files(directory)
+    snapshots = [name for name in files if name.startswith("snapshot-")]
+    assert len(snapshots) == 1
+    generation = snapshots[0][len("snapshot-"):-len(".bin")]
+    # Everything older than the newest snapshot was deleted; only its tail segment remains
+    assert [name for name in files if name.startswith("journal-")] == [f"journal-{generation}.log"]
+    assert int(generation) >= 2
+
+    restored = recover(directory, snapshot_every=3)
+    assert_recovered(restored)
+    restored.close()
+    # A clean shutdown leaves one fresh snapshot and nothing to replay
+    assert_recovered(recover(directory))
+
+
+def test_torn_tail_write_is_ignored(tmp_path):
+    directory = str(tmp_path)
+    manager = recover(directory)
+    fill(manager)
+    crash(manager)
+    with open(os.path.join(directory, "journal-000000000000.log"), "a", encoding="utf-8") as f:
+        f.write('["e","late@x","inves')
+
+    assert_recovered(recover(directory))
+
+
+def test_requeued_assignment_recovers_in_place(tmp_path):
+    directory = str(tmp_path)
+    manager = recover(directory)
+    manager.add_customer("i1@x", "investor")
+    manager.add_customer("p1@x", "prospect")
+    manager.add_customer("i2@x", "investor")
+    manager.set_agent_status("agent_a", "available")
+    customer = manager.try_assign_customer("agent_a")
+    # The call never connected, so the customer went back ahead of later arrivals
+    assert manager.release_assignment(customer)
+    crash(manager)
+
+    restored = recover(directory)
+    assert restored.recovered_customers == ["i1@x", "p1@x", "i2@x"]
+    assert positions(restored, ["i1@x", "i2@x", "p1@x"]) == [1, 2, 3]
+    agent_a = restored.get_agent_status("agent_a")
+    assert agent_a["status"] == "available" and agent_a["current_customer"] is None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Checks the presence timer wheel and eviction of customers who went away:
+timers that wrap past one revolution of the wheel, cancelling and re-arming,
+and eviction removing the customer from the queue and calling `on_evict`.
+All timing runs on a fake clock.
+"""
+import asyncio
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queue_manager import AsyncQueueManager, InMemoryQueueAdapter, QueueManager
+from queue_presence import PresenceTracker, TimerWheel
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_longer_than_one_revolution_waits_for_its_deadline():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=1.0, slots=8, clock=clock)
+    wheel.schedule("soon", 3)
+    wheel.schedule("later", 20)  # same slot as tick 4 and 12, two turns out
+
+    clock.now = 5
+    assert wheel.advance() == ["soon"]
+    clock.now = 12
+    assert wheel.advance() == []
+    assert "later" in wheel
+    clock.now = 20
+    assert wheel.advance() == ["later"]
+    assert len(wheel) == 0
+
+
+def test_advance_after_several_idle_revolutions_expires_everything_due():
+    clock = FakeClock(100.0)
+    wheel = TimerWheel(tick=1.0, slots=8, clock=clock)
+    for i, delay in enumerate([1, 4, 7, 9, 15, 30]):
+        wheel.schedule(f"k{i}", delay)
+
+    # Nothing advanced the wheel for almost three full turns
+    clock.now = 122
+    assert sorted(wheel.advance()) == ["k0", "k1", "k2", "k3", "k4"]
+    assert "k5" in wheel
+    clock.now = 129
+    assert wheel.advance() == []
+    clock.now = 130
+    assert wheel.advance() == ["k5"]
+
+
+def test_cancel_and_reschedule():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=1.0, slots=8, clock=clock)
+    wheel.schedule("moved", 2)
+    wheel.schedule("cancelled", 2)
+    wheel.schedule("moved", 10)
+    wheel.cancel("cancelled")
+    wheel.cancel("never-scheduled")
+    assert len(wheel) == 1
+
+    clock.now = 9
+    assert wheel.advance() == []
+    clock.now = 10
+    assert wheel.advance() == ["moved"]
+
+    # Deadlines round up to the next whole tick and never land on the current one
+    wheel.schedule("sub-tick", 0.1)
+    assert wheel.advance() == []
+    clock.now = 11
+    assert wheel.advance() == ["sub-tick"]
+
+
+def test_eviction_removes_absent_customers_and_calls_on_evict():
+    clock = FakeClock()
+    manager = QueueManager(InMemoryQueueAdapter())
+    evicted = []
+    tracker = PresenceTracker(AsyncQueueManager(manager, offload=False), ttl=60, grace_period=30,
+                              on_evict=evicted.append, clock=clock)
+
+    async def scenario():
+        for email in ("polling@x", "socket@x", "assigned@x"):
+            manager.add_customer(email, "investor")
+            tracker.seen(email)
+        tracker.connected("socket@x")
+        clock.now = 40
+        tracker.seen("polling@x")  # a poll re-arms the ttl
+        # Left the queue without the tracker hearing about it
+        manager.remove_customer("assigned@x")
+
+        clock.now = 70
+        assert await tracker.evict_expired() == []
+        assert evicted == []
+
+        tracker.disconnected("socket@x")
+        clock.now = 100
+        assert sorted(await tracker.evict_expired()) == ["polling@x", "socket@x"]
+        assert sorted(evicted) == ["polling@x", "socket@x"]
+        assert manager.get_queue_length() == 0
+
+    asyncio.run(scenario())
+
+
+def test_reconnect_within_grace_period_keeps_place():
+    clock = FakeClock()
+    manager = QueueManager(InMemoryQueueAdapter())
+    evicted = []
+    tracker = PresenceTracker(AsyncQueueManager(manager, offload=False), ttl=60, grace_period=30,
+                              on_evict=evicted.append, clock=clock)
+
+    async def scenario():
+        manager.add_customer("reload@x", "prospect")
+        tracker.connected("reload@x")
+        tracker.disconnected("reload@x")
+        clock.now = 10
+        tracker.connected("reload@x")
+        clock.now = 500
+        assert await tracker.evict_expired() == []
+        assert evicted == []
+        assert manager.get_customer_status("reload@x")["position"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Checks that reported queue positions follow the routing order: investors are
+served before prospects, so a prospect waiting first is still reported behind
+them. Runs against every adapter, and checks that Redis workers route against
+the shared queue rather than only what they saw themselves. Redis tests use
+fakeredis and are skipped when fakeredis or lupa (needed for its Lua scripts)
+is not installed.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queue_manager import DatabaseQueueAdapter, InMemoryQueueAdapter, QueueManager, RedisQueueAdapter
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def adapter(request):
+    if request.param == "memory":
+        yield InMemoryQueueAdapter()
+    elif request.param == "sqlite":
+        with tempfile.TemporaryDirectory() as tmp:
+            adapter = DatabaseQueueAdapter(os.path.join(tmp, "queue.db"))
+            yield adapter
+            adapter.close()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        yield RedisQueueAdapter(client=fakeredis.FakeRedis(decode_responses=True))
+
+
+def test_positions_follow_caller_type_priority(adapter):
+    manager = QueueManager(adapter)
+    manager.set_agent_status("agent_a", "available")
+    manager.add_customer("p1@x", "prospect")
+    manager.add_customer("p2@x", "prospect")
+    status = manager.add_customer("i1@x", "investor")
+    assert status["position"] == 1
+    assert status["estimated_wait_time"] == 0
+
+    assert manager.get_customer_status("p1@x")["position"] == 2
+    assert manager.get_customer_status("p2@x")["position"] == 3
+    assert manager.get_customer_status("p1@x")["estimated_wait_time"] > 0
+
+    batch = manager.add_customers([("p3@x", "prospect"), ("i2@x", "investor")])
+    assert {email: entry["position"] for email, entry in batch["customers"].items()} == {"p3@x": 5, "i2@x": 2}
+    snapshot = manager.get_customer_statuses(["i1@x", "i2@x", "p1@x", "p2@x", "p3@x", "gone@x"])
+    assert [entry and entry["position"] for entry in snapshot["customers"].values()] == [1, 2, 3, 4, 5, None]
+    assert snapshot["total_waiting"] == 5
+
+    # The customer reported at position 1 is the one routing serves
+    assert manager.try_assign_agent_to_customer("p1@x") is None
+    assert manager.try_assign_agent_to_customer("i1@x")["agent_id"] == "agent_a"
+    assert manager.get_customer_status("i2@x")["position"] == 1
+    assert manager.get_customer_status("p1@x")["position"] == 2
+
+    manager.remove_customer("i2@x")
+    assert manager.get_customer_status("p1@x")["position"] == 1
+    assert manager.get_customer_status("p3@x")["position"] == 3
+
+
+def test_redis_workers_route_against_the_shared_queue():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    server = fakeredis.FakeServer()
+    # Two workers: each has its own QueueManager and client on the same Redis
+    worker_1, worker_2 = (
+        QueueManager(RedisQueueAdapter(client=fakeredis.FakeRedis(server=server, decode_responses=True)))
+        for _ in range(2)
+    )
+    worker_1.add_customer("p1@x", "prospect")
+    worker_1.add_customer("i1@x", "investor")
+    worker_2.add_customer("i2@x", "investor")
+    worker_2.register_agent("agent_a", ["prospect"])
+    worker_2.set_agent_status("agent_a", "available")
+    worker_1.set_agent_status("agent_b", "available")
+
+    # agent_b takes any caller type: the investor enqueued first, on the other worker
+    assert worker_2.try_assign_customer("agent_b")["email"] == "i1@x"
+    # i2 is next for an any-skill agent, but the only idle agent takes prospects only
+    assert worker_1.try_assign_agent_to_customer("i2@x") is None
+    customer = worker_1.try_assign_agent_to_customer("p1@x")
+    assert customer["email"] == "p1@x" and customer["agent_id"] == "agent_a"
+    assert worker_1.get_agent_status("agent_a")["current_customer"] == "p1@x"
+    assert worker_2.get_customer_status("i2@x")["position"] == 1
+    assert worker_1.get_queue_length() == 1
+
+
+def test_assigned_agent_is_read_from_queue_state(adapter):
+    manager = QueueManager(adapter)
+    manager.add_customer("i1@x", "investor")
+    manager.set_agent_status("agent_a", "available")
+    assert manager.get_assigned_agent("i1@x") is None
+
+    assert manager.try_assign_customer("agent_a")["email"] == "i1@x"
+    assert manager.get_assigned_agent("i1@x") == "agent_a"
+    # Once the call ends the assignment is no longer live
+    manager.set_agent_status("agent_a", "available")
+    assert manager.get_assigned_agent("i1@x") is None
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Checks that queue ETAs use the handle times observed for the customer's own
+caller type instead of one figure for every call.
+"""
+import os
+import sys
+
+# Add current directory to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from queue_manager import InMemoryQueueAdapter, QueueManager
+from wait_time_estimator import HandleTimeEstimator
+
+
+def make_estimator() -> HandleTimeEstimator:
+    estimator = HandleTimeEstimator()
+    # Investor calls run 10 minutes, prospect calls 2 minutes
+    for agent_id in ("agent_a", "agent_b"):
+        estimator.set_agent_online(agent_id, True)
+        for _ in range(20):
+            estimator.record_handle_time(agent_id, "investor", 600)
+            estimator.record_handle_time(agent_id, "prospect", 120)
+    return estimator
+
+
+def test_caller_types_get_their_own_service_rate():
+    estimator = make_estimator()
+    investor = estimator.estimate_wait(5, 0, "investor")
+    prospect = estimator.estimate_wait(5, 0, "prospect")
+    overall = estimator.estimate_wait(5, 0)
+    assert prospect < overall < investor
+    # Unknown types fall back to the overall estimate; free agents still mean no wait
+    assert estimator.estimate_wait(5, 0, "partner") == overall
+    assert estimator.estimate_wait(2, 2, "investor") == 0
+
+
+def test_queue_status_uses_the_customers_caller_type():
+    manager = QueueManager(InMemoryQueueAdapter(), wait_estimator=make_estimator())
+    manager.add_customers([("i1@x", "investor"), ("p1@x", "prospect"), ("i2@x", "investor")])
+    status = manager.get_customer_status("p1@x")
+    assert status["position"] == 3
+    assert status["estimated_wait_time"] == manager.calculate_wait_time(3, "prospect")
+    assert status["estimated_wait_time"] < manager.calculate_wait_time(3, "investor")
+    snapshot = manager.get_customer_statuses(["p1@x"])
+    assert snapshot["customers"]["p1@x"]["estimated_wait_time"] == status["estimated_wait_time"]
+    assert manager.get_handle_time_stats()["investor"]["samples"] == 40
@@ -0,0 +1,152 @@
+import bisect
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+# Prior used until real handle times have been observed (5 minutes)
+DEFAULT_HANDLE_TIME = 300.0
+
+
+class EWMA:
+    """Exponentially weighted moving average, O(1) per update."""
+    def __init__(self, alpha: float = 0.1, initial: Optional[float] = None):
+        self.alpha = alpha
+        self.value = initial
+        self.count = 0
+
+    def update(self, sample: float) -> float:
+        self.count += 1
+        if self.value is None:
+            self.value = sample
+        else:
+            self.value += self.alpha * (sample - self.value)
+        return self.value
+
+
+class SlidingQuantile:
+    """
+    Quantiles over the last `window` samples. The window is a fixed size, so each
+    update costs O(window) = O(1) in the number of samples ever seen.
+    """
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._sorted = []
+
+    def update(self, sample: float) -> None:
+        if len(self._samples) == self._samples.maxlen:
+            evicted = self._samples[0]
+            del self._sorted[bisect.bisect_left(self._sorted, evicted)]
+        self._samples.append(sample)
+        bisect.insort(self._sorted, sample)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._sorted:
+            return None
+        index = min(len(self._sorted) - 1, int(q * len(self._sorted)))
+        return self._sorted[index]
+
+
+class HandleTimeEstimator:
+    """
+    Streaming handle-time statistics and an M/M/N queue wait model.
+
+    Handle times are recorded when an agent finishes a call, into EWMAs per
+    agent, per caller_type and overall, plus sliding quantiles per caller_type.
+    The estimator also keeps the combined service rate of online agents
+    (sum of 1 / handle time) up to date incrementally, so a wait estimate is
+    O(1) regardless of how many agents are registered.
+    """
+    def __init__(self, alpha: float = 0.1, default_handle_time: float = DEFAULT_HANDLE_TIME):
+        self._alpha = alpha
+        self._default_handle_time = default_handle_time
+        self._overall = EWMA(alpha)
+        self._by_agent: Dict[str, EWMA] = {}
+        self._by_caller_type: Dict[str, EWMA] = {}
+        self._quantiles: Dict[str, SlidingQuantile] = {}
+        # agent_id -> service rate (calls/second) currently counted in _service_rate
+        self._online_rates: Dict[str, float] = {}
+        self._service_rate = 0.0
+        self._lock = threading.Lock()
+
+    def mean_handle_time(self, caller_type: Optional[str] = None) -> float:
+        """Smoothed handle time for a caller type, falling back to overall, then the prior."""
+        estimator = self._by_caller_type.get(caller_type) if caller_type else None
+        if estimator is not None and estimator.value is not None:
+            return estimator.value
+        if self._overall.value is not None:
+            return self._overall.value
+        return self._default_handle_time
+
+    def handle_time_quantile(self, caller_type: str, q: float) -> Optional[float]:
+        quantile = self._quantiles.get(caller_type)
+        return quantile.quantile(q) if quantile else None
+
+    def _agent_rate(self, agent_id: str) -> float:
+        estimator = self._by_agent.get(agent_id)
+        handle_time = estimator.value if estimator is not None and estimator.value else self.mean_handle_time()
+        return 1.0 / max(handle_time, 1.0)
+
+    def _set_online_rate(self, agent_id: str, rate: Optional[float]) -> None:
+        previous = self._online_rates.pop(agent_id, None)
+        if previous is not None:
+            self._service_rate -= previous
+        if rate is not None:
+            self._online_rates[agent_id] = rate
+            self._service_rate += rate
+        if not self._online_rates:
+            self._service_rate = 0.0  # drop accumulated float drift
+
+    def set_agent_online(self, agent_id: str, online: bool) -> None:
+        with self._lock:
+            if not online:
+                self._set_online_rate(agent_id, None)
+            elif agent_id not in self._online_rates:
+                self._set_online_rate(agent_id, self._agent_rate(agent_id))
+
+    def record_handle_time(self, agent_id: str, caller_type: Optional[str], seconds: float) -> None:
+        """Fold one finished call into the per-agent, per-caller-type and overall estimators."""
+        with self._lock:
+            self._overall.update(seconds)
+            self._by_agent.setdefault(agent_id, EWMA(self._alpha)).update(seconds)
+            if caller_type:
+                self._by_caller_type.setdefault(caller_type, EWMA(self._alpha)).update(seconds)
+                self._quantiles.setdefault(caller_type, SlidingQuantile()).update(seconds)
+            if agent_id in self._online_rates:
+                self._set_online_rate(agent_id, self._agent_rate(agent_id))
+
+    @property
+    def online_agents(self) -> int:
+        return len(self._online_rates)
+
+    def estimate_wait(self, position: int, agents_available: int, caller_type: Optional[str] = None) -> int:
+        """
+        Expected seconds until the customer at `position` reaches an agent.
+
+        Customers within the number of free agents are served immediately. Beyond
+        that every online agent is busy, and under the M/M/N (Erlang C) model the
+        customer waits for (position - free agents) completions that arrive at the
+        combined service rate of the online agents. That rate is measured over all
+        calls, so it is scaled by how the smoothed handle time of `caller_type`
+        compares with the overall one: slow call types are served at a lower rate.
+        """
+        if position <= agents_available:
+            return 0
+        rate = self._service_rate
+        if rate <= 0:
+            # Nobody online to model: assume one agent at the smoothed handle time
+            return int(position * self.mean_handle_time(caller_type))
+        if caller_type is not None:
+            rate *= self.mean_handle_time() / max(self.mean_handle_time(caller_type), 1.0)
+        return int(round((position - agents_available) / rate))
+
+    def get_stats(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Handle-time summary per caller type, for dashboards."""
+        return {
+            caller_type: {
+                "mean": estimator.value,
+                "p50": self.handle_time_quantile(caller_type, 0.5),
+                "p90": self.handle_time_quantile(caller_type, 0.9),
+                "samples": estimator.count,
+            }
+            for caller_type, estimator in self._by_caller_type.items()
+        }
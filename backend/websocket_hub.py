@@ -0,0 +1,425 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+import orjson
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# What to do when a client's outbound queue is full
+DROP_OLDEST = "drop_oldest"    # discard the oldest queued message to make room
+DROP_NEWEST = "drop_newest"    # discard the message being sent
+DISCONNECT = "disconnect"      # close the socket; the client reconnects and resyncs
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, DROP_NEWEST, DISCONNECT)
+
+# Close codes (RFC 6455 registry): "going away" for idle peers, "try again later" for slow ones
+_CLOSE_GOING_AWAY = 1001
+_CLOSE_TRY_AGAIN_LATER = 1013
+
+# Topic namespaces
+TOPIC_PREFIXES = ("customer:", "agent:", "room:", "transfer:")
+# A customer's or agent's own topic: its events are numbered and kept for replay on reconnect.
+# They carry room tokens, so only the server binds them, to the socket's own identity.
+REPLAY_PREFIXES = ("customer:", "agent:")
+# Room and transfer topics carry call summaries: the server joins participants to them
+# (ConnectionHub.join), and a client may only leave them by name
+CLIENT_TOPIC_PREFIXES = ("room:", "transfer:")
+
+
+def customer_topic(email: str) -> str:
+    return f"customer:{email}"
+
+
+def agent_topic(agent_id: str) -> str:
+    return f"agent:{agent_id}"
+
+
+def room_topic(room_name: str) -> str:
+    return f"room:{room_name}"
+
+
+def transfer_topic(transfer_id: str) -> str:
+    return f"transfer:{transfer_id}"
+
+
+def encode_frame(message: Any) -> str:
+    """Encode a notification once into the text frame sent to every recipient."""
+    return orjson.dumps(message).decode()
+
+
+def is_valid_topic(topic: Any) -> bool:
+    return isinstance(topic, str) and topic.startswith(TOPIC_PREFIXES) and not topic.endswith(":")
+
+
+def is_client_topic(topic: Any) -> bool:
+    """Whether a client may unsubscribe from `topic` itself (not its own customer:/agent: topic)."""
+    return is_valid_topic(topic) and topic.startswith(CLIENT_TOPIC_PREFIXES)
+
+
+def _stamp_frame(frame: str, topic: str, seq: int) -> str:
+    """Add "topic" and "seq" to an encoded JSON object without re-encoding it."""
+    fields = f'"topic":{orjson.dumps(topic).decode()},"seq":{seq}}}'
+    return frame[:-1] + ("," if frame != "{}" else "") + fields
+
+
+class ReplayBuffer:
+    """
+    The last few frames of every customer and agent topic, for clients that reconnect.
+
+    Every recorded frame is stamped with a sequence number from one counter
+    per process, so a topic's numbers only grow, and `epoch` changes on
+    restart. A client that comes back with the epoch and the last sequence it
+    saw gets exactly the frames it missed, or None when some of them have
+    been dropped (ring overflow, topic evicted, different process), in which
+    case it has to resync over HTTP. Memory is bounded by `size` frames per
+    topic and `max_topics` topics, least recently written evicted first.
+    """
+    def __init__(self, size: int = 64, max_topics: int = 10_000):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._size = size
+        self._max_topics = max_topics
+        self._seq = 0
+        # Highest sequence number that may have been lost with an evicted topic
+        self._evicted_through = 0
+        # topic -> (sequence numbers <= floor are not held, (seq, frame) ring)
+        self._topics: "OrderedDict[str, Tuple[List[int], Deque[Tuple[int, str]]]]" = OrderedDict()
+
+    @property
+    def seq(self) -> int:
+        """The latest sequence number handed out."""
+        return self._seq
+
+    def record(self, topic: str, frame: str) -> str:
+        """Number `frame` for `topic`, keep it, and return the stamped frame to send."""
+        self._seq += 1
+        entry = self._topics.get(topic)
+        if entry is None:
+            entry = self._topics[topic] = ([self._evicted_through], deque())
+            if len(self._topics) > self._max_topics:
+                self._topics.popitem(last=False)
+                self._evicted_through = self._seq
+        else:
+            self._topics.move_to_end(topic)
+        floor, ring = entry
+        if len(ring) >= self._size:
+            floor[0] = ring.popleft()[0]
+        stamped = _stamp_frame(frame, topic, self._seq)
+        ring.append((self._seq, stamped))
+        return stamped
+
+    def since(self, topic: str, epoch: Optional[str], last_seq: int) -> Optional[List[str]]:
+        """Frames for `topic` after `last_seq`, or None if they can no longer all be replayed."""
+        if epoch != self.epoch or last_seq > self._seq:
+            return None
+        entry = self._topics.get(topic)
+        if entry is None:
+            return [] if last_seq >= self._evicted_through else None
+        floor, ring = entry
+        if last_seq < floor[0]:
+            return None
+        return [frame for seq, frame in ring if seq > last_seq]
+
+    def history(self, topic: str) -> List[str]:
+        """Every frame still held for `topic`, oldest first."""
+        entry = self._topics.get(topic)
+        return [frame for _, frame in entry[1]] if entry else []
+
+
+class ClientConnection:
+    """
+    One WebSocket plus a bounded outbound queue drained by its own writer task.
+
+    `send()` only enqueues, so callers never wait on a client's network; the
+    writer task is the only coroutine that writes to the socket, which also
+    keeps frames from different senders from interleaving. The queue holds
+    pre-encoded text frames, so a message published to many connections is
+    serialized once. When the queue is full the slow-consumer policy decides
+    whether to drop a message or disconnect the client.
+
+    Also carries who is on the other end (`client_type`, `email`,
+    `agent_id`, set when the client identifies itself) and when it last sent
+    anything, which the hub's heartbeat uses to reap dead peers.
+    """
+    def __init__(self, websocket: WebSocket, max_queue: int = 256, policy: str = DISCONNECT,
+                 send_timeout: float = 10.0):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self.topics: Set[str] = set()
+        self.client_type = "unknown"
+        self.email: Optional[str] = None
+        self.agent_id: Optional[str] = None
+        self.connected_at = datetime.now()
+        self.last_seen = time.monotonic()
+        self._send_timeout = send_timeout
+        self._queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self._writer = asyncio.ensure_future(self._write_loop())
+
+    def touch(self) -> None:
+        """The client sent something (a message or a pong), so it is still there."""
+        self.last_seen = time.monotonic()
+
+    def send(self, message: Any) -> bool:
+        """Encode and queue a message for this client. Returns False if it was not queued."""
+        return self.send_frame(encode_frame(message))
+
+    def send_frame(self, frame: str) -> bool:
+        """Queue an already encoded frame for this client. Returns False if it was not queued."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            pass
+        self.dropped += 1
+        if self.policy == DROP_OLDEST:
+            self._queue.get_nowait()
+            self._queue.put_nowait(frame)
+            return True
+        if self.policy == DISCONNECT:
+            logger.warning(f"Disconnecting slow WebSocket consumer ({self._queue.qsize()} messages queued)")
+            self._abort()
+        return False
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                frame = await self._queue.get()
+                # asyncio.timeout, unlike wait_for, does not spawn a task per send
+                async with asyncio.timeout(self._send_timeout):
+                    await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info(f"WebSocket writer stopped: {e}")
+            self._abort()
+
+    def _abort(self, code: int = _CLOSE_TRY_AGAIN_LATER) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._writer.cancel()
+        asyncio.ensure_future(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass  # already closed by the peer
+
+    async def close(self) -> None:
+        """Stop the writer; queued messages are discarded. The socket itself is left to its handler."""
+        self.closed = True
+        self._writer.cancel()
+        try:
+            await self._writer
+        except (asyncio.CancelledError, Exception):
+            pass
+
+
+class ConnectionHub:
+    """
+    All open notification sockets plus a topic subscription registry.
+
+    Events are published to topics (a customer, an agent, a room, a
+    transfer) and reach only the connections subscribed to them: one dict
+    lookup per topic and one O(1) enqueue per subscriber, so a slow or
+    stalled client never delays anyone else and nobody receives another
+    customer's events. Events on customer and agent topics are also kept in
+    a ReplayBuffer, even with no subscriber, so a reconnecting client can
+    catch up with `resume()`.
+
+    Once started, a heartbeat pings every connection each
+    `heartbeat_interval` seconds and closes those that have sent nothing,
+    not even a pong, for `idle_timeout` seconds: half-open TCP connections
+    never fail a send on their own, so without this they would stay
+    registered, subscribed and written to forever.
+    """
+    def __init__(self, max_queue: int = 256, policy: str = DISCONNECT,
+                 replay_size: int = 64, max_replay_topics: int = 10_000,
+                 heartbeat_interval: float = 20.0, idle_timeout: float = 60.0):
+        self._max_queue = max_queue
+        self._policy = policy
+        self._heartbeat_interval = heartbeat_interval
+        self._idle_timeout = idle_timeout
+        self._heartbeat: Optional[asyncio.Task] = None
+        self.replay = ReplayBuffer(replay_size, max_replay_topics)
+        self._connections: Dict[WebSocket, ClientConnection] = {}
+        # topic -> subscribed connections (dict used as an ordered set)
+        self._subscribers: Dict[str, Dict[ClientConnection, None]] = {}
+        self._topic_listeners: List[Callable[[str, bool], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+    def connect(self, websocket: WebSocket) -> ClientConnection:
+        connection = ClientConnection(websocket, self._max_queue, self._policy)
+        self._connections[websocket] = connection
+        return connection
+
+    async def disconnect(self, connection: ClientConnection) -> None:
+        self._unregister(connection)
+        await connection.close()
+
+    def _unregister(self, connection: ClientConnection) -> None:
+        self._connections.pop(connection.websocket, None)
+        for topic in list(connection.topics):
+            self.unsubscribe(connection, topic)
+
+    def start(self) -> None:
+        """Start the heartbeat on the running event loop; call from app startup."""
+        if self._heartbeat_interval > 0 and self._heartbeat is None:
+            self._heartbeat = asyncio.ensure_future(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+
+    def reap_idle(self) -> int:
+        """Close and unregister every connection silent for longer than idle_timeout."""
+        if self._idle_timeout <= 0:
+            return 0
+        deadline = time.monotonic() - self._idle_timeout
+        idle = [connection for connection in self._connections.values() if connection.last_seen < deadline]
+        for connection in idle:
+            # Unregister now so nothing more is queued for it; the handler's disconnect() is a no-op after this
+            self._unregister(connection)
+            connection._abort(_CLOSE_GOING_AWAY)
+        if idle:
+            logger.info(f"Reaped {len(idle)} idle WebSocket connections")
+        return len(idle)
+
+    async def _heartbeat_loop(self) -> None:
+        ping = {"type": "ping"}
+        while True:
+            await asyncio.sleep(self._heartbeat_interval)
+            try:
+                self.reap_idle()
+                self.broadcast(ping)
+            except Exception as e:
+                logger.error(f"WebSocket heartbeat failed: {e}")
+
+    def add_topic_listener(self, callback: Callable[[str, bool], None]) -> None:
+        """`callback(topic, active)` runs when a topic gets its first subscriber (True) or loses its last (False)."""
+        self._topic_listeners.append(callback)
+
+    def _notify_topic(self, topic: str, active: bool) -> None:
+        for callback in self._topic_listeners:
+            try:
+                callback(topic, active)
+            except Exception as e:
+                logger.error(f"Topic listener failed for {topic}: {e}")
+
+    def subscribe(self, connection: ClientConnection, topic: str) -> None:
+        subscribers = self._subscribers.get(topic)
+        if subscribers is None:
+            subscribers = self._subscribers[topic] = {}
+            self._notify_topic(topic, True)
+        subscribers[connection] = None
+        connection.topics.add(topic)
+
+    def unsubscribe(self, connection: ClientConnection, topic: str) -> None:
+        connection.topics.discard(topic)
+        subscribers = self._subscribers.get(topic)
+        if subscribers is not None:
+            subscribers.pop(connection, None)
+            if not subscribers:
+                del self._subscribers[topic]
+                self._notify_topic(topic, False)
+
+    def subscribers(self, topic: str) -> List[ClientConnection]:
+        return list(self._subscribers.get(topic, ()))
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self._subscribers.get(topic, ()))
+
+    def topics(self, prefix: str = "") -> List[str]:
+        """Topics that currently have subscribers, optionally filtered by prefix."""
+        return [topic for topic in self._subscribers if topic.startswith(prefix)]
+
+    def resume(self, connection: ClientConnection, topic: str, epoch: Optional[str] = None,
+               last_seq: int = 0) -> None:
+        """
+        Subscribe `connection` to `topic` and replay what it missed since `last_seq`.
+
+        Ends with a "subscribed" message carrying the epoch and sequence to
+        resume from next time; a "resync" message first means the gap could
+        not be replayed.
+        """
+        self.subscribe(connection, topic)
+        if epoch is not None:
+            missed = self.replay.since(topic, epoch, last_seq)
+            if missed is None:
+                connection.send({"type": "resync", "topic": topic})
+            else:
+                for frame in missed:
+                    connection.send_frame(frame)
+        connection.send({"type": "subscribed", "topic": topic, "epoch": self.replay.epoch, "seq": self.replay.seq})
+
+    def _recipients(self, topics: Iterable[str]) -> Dict[ClientConnection, None]:
+        recipients: Dict[ClientConnection, None] = {}
+        for topic in topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers:
+                recipients.update(subscribers)
+        return recipients
+
+    def publish(self, topics: Iterable[str], message: Any, replay: bool = True) -> int:
+        """
+        Queue `message` once for every connection subscribed to any of `topics`.
+
+        Pass replay=False for state snapshots (e.g. queue positions) that are
+        re-sent on reconnect anyway and should not be numbered or kept.
+        """
+        topics = list(topics)
+        if not (replay and any(topic.startswith(REPLAY_PREFIXES) for topic in topics)) and not self._recipients(topics):
+            return 0
+        return self.publish_frame(topics, encode_frame(message), replay)
+
+    def publish_frame(self, topics: Iterable[str], frame: str, replay: bool = True) -> int:
+        """Like publish() for a message that is already encoded (e.g. by another worker)."""
+        # Replayed topics first, so a connection on both a room and its own
+        # topic gets the numbered copy and never sees it again on resume
+        topics = sorted(dict.fromkeys(topics), key=lambda topic: not topic.startswith(REPLAY_PREFIXES))
+        served: Set[ClientConnection] = set()
+        sent = 0
+        for topic in topics:
+            if replay and topic.startswith(REPLAY_PREFIXES):
+                topic_frame = self.replay.record(topic, frame)
+            else:
+                topic_frame = frame
+            for connection in self._subscribers.get(topic, ()):
+                if connection not in served:
+                    served.add(connection)
+                    sent += connection.send_frame(topic_frame)
+        return sent
+
+    def join(self, topics: Iterable[str], topic: str) -> int:
+        """Subscribe every connection subscribed to any of `topics` to `topic` as well."""
+        recipients = self._recipients(topics)
+        for connection in recipients:
+            self.subscribe(connection, topic)
+        return len(recipients)
+
+    def connections(self) -> List[ClientConnection]:
+        return list(self._connections.values())
+
+    def broadcast(self, message: Any) -> int:
+        """Queue `message` for every connection (system-wide notices only); returns how many accepted it."""
+        frame = encode_frame(message)
+        # Iterate a snapshot: connections may come and go while we enqueue
+        return sum(1 for connection in self.connections() if connection.send_frame(frame))